@@ -0,0 +1,120 @@
+"""ASR backend interface and implementations.
+
+Every backend follows the same lifecycle: construct (cheap, config only) →
+``load()`` → ``warmup()`` → ``transcribe()`` / ``transcribe_batch()`` →
+``close()``.
+"""
+
+from __future__ import annotations
+
+from typing import Protocol
+
+from . import plugins
+
+
+class ASRBackend(Protocol):
+    name: str
+    batched: bool  # True if transcribe_batch runs one batched inference
+
+    def load(self) -> None: ...
+
+    def warmup(self) -> None: ...
+
+    def transcribe(self, audio, prompt: str | None = None) -> dict: ...
+
+    def transcribe_batch(self, audios: list, prompt: str | None = None) -> list[dict]: ...
+
+    def close(self) -> None: ...
+
+
+class _WhisperBackendBase:
+    """Shared config / warmup / batch fallback for the non-batched backends."""
+
+    name = ""
+    batched = False
+
+    def __init__(self, model_name: str, language: str = "ja"):
+        self.model_name = model_name
+        self.language = language
+        self.model = None
+
+    def _language_kwargs(self) -> dict:
+        return {} if self.language == "auto" else {"language": self.language}
+
+    @staticmethod
+    def _prompt_kwargs(prompt: str | None) -> dict:
+        return {"initial_prompt": prompt} if prompt else {}
+
+    def warmup(self) -> None:
+        import numpy as np
+        self.transcribe(np.zeros(16000, dtype=np.float32))
+
+    def transcribe_batch(self, audios: list, prompt: str | None = None) -> list[dict]:
+        return [self.transcribe(audio, prompt=prompt) for audio in audios]
+
+    def close(self) -> None:
+        self.model = None
+
+
+class MLXBackend(_WhisperBackendBase):
+    """mlx-whisper (Apple Silicon). mlx_whisper keeps its own model holder."""
+
+    name = "mlx"
+
+    def load(self) -> None:
+        self._mlx_whisper = plugins.import_module("mlx_whisper")
+        self.model = self.model_name
+        print(f"[MLX] モデル: {self.model_name}")
+
+    def transcribe(self, audio, prompt: str | None = None) -> dict:
+        return self._mlx_whisper.transcribe(
+            audio, path_or_hf_repo=self.model_name, **self._language_kwargs(), **self._prompt_kwargs(prompt)
+        )
+
+
+class OpenAIWhisperBackend(_WhisperBackendBase):
+    """openai-whisper (PyTorch)."""
+
+    name = "openai"
+
+    def load(self) -> None:
+        whisper = plugins.import_module("whisper")
+        print(f"[PyTorch Whisper] モデルをロード中: {self.model_name}")
+        self.model = whisper.load_model(self.model_name)
+        print("[PyTorch Whisper] モデルのロードが完了しました")
+
+    def transcribe(self, audio, prompt: str | None = None) -> dict:
+        return self.model.transcribe(audio, **self._language_kwargs(), **self._prompt_kwargs(prompt))
+
+
+class StableTSBackend(_WhisperBackendBase):
+    """stable-ts (Whisper + Silero VAD)."""
+
+    name = "stable-ts"
+
+    def load(self) -> None:
+        stable_whisper = plugins.import_module("stable_whisper")
+        print(f"[Stable-TS] モデルをロード中: {self.model_name}")
+        self.model = stable_whisper.load_model(self.model_name)
+        print("[Stable-TS] モデルのロードが完了しました")
+
+    def transcribe(self, audio, prompt: str | None = None) -> dict:
+        # stable-ts: VAD有効化、condition_on_previous_text=False でハルシネーション軽減
+        result = self.model.transcribe(
+            audio,
+            vad="silero",
+            condition_on_previous_text=False,
+            word_timestamps=False,
+            verbose=False,
+            **self._language_kwargs(),
+            **self._prompt_kwargs(prompt),
+        )
+        # stable-ts の結果を Whisper 互換形式に変換
+        return {
+            "text": result.text if hasattr(result, "text") else str(result),
+            "language": result.language if hasattr(result, "language") else self.language,
+            "segments": [
+                {"start": seg.start, "end": seg.end, "text": seg.text}
+                for seg in getattr(result, "segments", None) or []
+            ],
+        }
@@ -2,13 +2,175 @@
 
 from __future__ import annotations
 
+import contextlib
+import inspect
+import math
 import os
 import re
+import time
+from collections import deque
 import numpy as np
 import torch
 from transformers import WhisperProcessor, WhisperForConditionalGeneration
+from transformers.modeling_outputs import BaseModelOutput
 
-from .biasing import WordRegistry, PrefixTree, HotwordLogitsProcessor
+from .biasing import WordRegistry, PrefixTree, TokenCache, HotwordLogitsProcessor
+from .features import LogMelFrontend
+
+
+class TokenPieces:
+    """Token id -> text of that single token, decoded once per id.
+
+    Shared across utterances so OOV extraction does not call the tokenizer
+    for tokens it has already seen.
+    """
+
+    def __init__(self, tokenizer):
+        self.tokenizer = tokenizer
+        self._pieces: dict[int, str] = {}
+
+    def __getitem__(self, token_id: int) -> str:
+        piece = self._pieces.get(token_id)
+        if piece is None:
+            piece = self.tokenizer.decode([token_id])
+            self._pieces[token_id] = piece
+        return piece
+
+
+class ChosenTokenLogProbs:
+    """Records the log-prob of every generated token during ``generate``.
+
+    A lightweight replacement for ``output_logits=True``, attached as a
+    forward hook on the Whisper model (`attach`). Each decoder forward
+    predicts the positions after its input tokens; only the latest forward's
+    log-softmax is kept, and a position's entry is gathered once a later
+    input (or the final sequence) shows which token was committed there.
+    This also covers assisted generation, where one verification forward
+    scores several draft tokens and rejected ones are re-scored later (the
+    latest score of a position wins). The draft model is not hooked, and
+    the scores are the model's own (before hotword boosts). Rows must keep
+    their order across steps (greedy or sampling, not beam search).
+
+    It is also passed to ``generate`` as a (pass-through) logits processor:
+    the shortest ``input_ids`` it sees is the decoder prompt, which the
+    forward hook cannot tell apart from draft tokens.
+    """
+
+    def __init__(self):
+        self._pending: dict[int, torch.Tensor] = {}  # position -> (rows, vocab) log-probs
+        self._chosen: dict[int, torch.Tensor] = {}   # position -> (rows,) chosen-token log-prob
+        self._prompt_len: int | None = None
+        self._first_input_len: int | None = None
+        self._end = 0
+
+    def __call__(self, input_ids: torch.LongTensor, scores: torch.FloatTensor) -> torch.FloatTensor:
+        if self._prompt_len is None or input_ids.shape[1] < self._prompt_len:
+            self._prompt_len = input_ids.shape[1]
+        return scores
+
+    @contextlib.contextmanager
+    def attach(self, model):
+        handle = model.register_forward_hook(self._hook, with_kwargs=True)
+        try:
+            yield self
+        finally:
+            handle.remove()
+
+    def _hook(self, module, args, kwargs, output) -> None:
+        input_ids = kwargs.get("decoder_input_ids")
+        if input_ids is None or getattr(output, "logits", None) is None:
+            return
+        n = input_ids.shape[1]
+        cache = kwargs.get("past_key_values")
+        # キャッシュは forward 後の長さ = 入力末尾の次の位置
+        end = cache.get_seq_length() if cache is not None else n
+        start = end - n
+        if self._first_input_len is None:
+            self._first_input_len = n
+        log_probs = torch.log_softmax(output.logits.float(), dim=-1)
+        previous = self._pending
+        for j in range(n):
+            dist = log_probs[:, j - 1] if j > 0 else previous.get(start)
+            if dist is not None:
+                self._chosen[start + j] = dist.gather(1, input_ids[:, j:j + 1])[:, 0]
+        self._pending = {start + j + 1: log_probs[:, j] for j in range(n)}
+        self._end = end + 1
+
+    def result(self, sequences: torch.LongTensor) -> tuple[list[list[int]], list[list[float]]]:
+        """(generated token ids, their log-probs) per row, given generate()'s output."""
+        prompt_len = self._prompt_len or self._first_input_len
+        if prompt_len is None:
+            return [], []
+        # 出力系列の末尾 = 最後に予測された位置(先頭の強制トークンは省かれることがある)
+        offset = self._end - sequences.shape[1]
+        last = self._end - 1
+        dist = self._pending.get(last)
+        if dist is not None:
+            tokens = sequences[:, last - offset: last - offset + 1].to(dist.device)
+            self._chosen[last] = dist.gather(1, tokens)[:, 0]
+        self._pending = {}
+        positions = [p for p in range(prompt_len, self._end) if p in self._chosen]
+        if not positions:
+            return [], []
+        generated = sequences[:, positions[0] - offset: positions[-1] - offset + 1]
+        log_probs = torch.stack([self._chosen[p] for p in positions], dim=1)
+        return generated.tolist(), log_probs.tolist()
+
+
+def encode_window(encoder, input_features: torch.Tensor) -> BaseModelOutput:
+    """Run the Whisper encoder over a window shorter than 30 s.
+
+    Same computation as ``WhisperEncoder.forward`` (which only accepts the
+    full 3000-frame window), with the positional embedding sliced to the
+    window's length. ``input_features`` must have an even frame count.
+    """
+    hidden = torch.nn.functional.gelu(encoder.conv1(input_features))
+    hidden = torch.nn.functional.gelu(encoder.conv2(hidden)).permute(0, 2, 1)
+    hidden = hidden + encoder.embed_positions.weight[: hidden.shape[1]]
+    # transformers 4.x のエンコーダ層は layer_head_mask を必須引数に取る(5.x では廃止)
+    kwargs = {"layer_head_mask": None} if encoder.layers and \
+        "layer_head_mask" in inspect.signature(encoder.layers[0].forward).parameters else {}
+    for layer in encoder.layers:
+        out = layer(hidden, None, **kwargs)
+        hidden = out[0] if isinstance(out, tuple) else out
+    return BaseModelOutput(last_hidden_state=encoder.layer_norm(hidden))
+
+
+def _trim_cached_decoder_inputs(module, args, kwargs):
+    """Forward pre-hook for the draft model: feed only the uncached tail.
+
+    Each assisted round re-enters the draft's ``generate`` with the whole
+    sequence and its cropped cache. Some transformers versions (5.x) only
+    slice off the cached part when a decoder attention mask is given, which
+    Whisper does not have here, so the draft would re-read the sequence on
+    top of its cache (wrong positions, and an index error near
+    ``max_target_positions``). A correctly sliced round feeds at most two
+    tokens to a cache already holding the prompt, so this is a no-op there.
+    """
+    input_ids = kwargs.get("decoder_input_ids")
+    cache = kwargs.get("past_key_values")
+    if input_ids is None or cache is None:
+        return None
+    past = cache.get_seq_length()
+    if 0 < past < input_ids.shape[1]:
+        kwargs["decoder_input_ids"] = input_ids[:, past:]
+        return args, kwargs
+    return None
+
+
+class _ForwardCounter:
+    """Counts forward calls of modules."""
+
+    def __init__(self, *modules):
+        self.calls = 0
+        self._handles = [module.register_forward_hook(self._post) for module in modules]
+
+    def _post(self, module, args, output):
+        self.calls += 1
+
+    def remove(self) -> None:
+        for handle in self._handles:
+            handle.remove()
 
 
 def extract_low_confidence_words(
@@ -16,16 +178,23 @@ def extract_low_confidence_words(
     log_probs: list[float],
     tokenizer,
     threshold: float = -2.0,
+    pieces: TokenPieces | None = None,
 ) -> list[str]:
     """Extract words with low confidence scores as OOV candidates.
 
     Returns words that look like proper nouns (katakana, short length)
-    and have low log probability.
+    and have low log probability. ``pieces`` (id -> token text) avoids
+    decoding the same token again across calls.
     """
     candidates = []
+    # A word can only average below the threshold if one of its tokens is.
+    if not log_probs or min(log_probs) >= threshold:
+        return candidates
 
     # Decode individual tokens and find low-confidence spans
-    decoded_tokens = [tokenizer.decode([tid]) for tid in token_ids]
+    if pieces is None:
+        pieces = TokenPieces(tokenizer)
+    decoded_tokens = [pieces[tid] for tid in token_ids]
     current_word = ""
     current_log_probs: list[float] = []
 
@@ -69,17 +238,34 @@ def _looks_like_proper_noun(word: str) -> bool:
 
 
 class BiasingWhisperBackend:
-    """HuggingFace Whisper with hotword boosting."""
+    """HuggingFace Whisper with hotword boosting (ASRBackend "hf")."""
+
+    name = "hf"
+    batched = True
+
+    # Short windows are rounded up to whole seconds (fewer distinct shapes)
+    WINDOW_STEP_SECONDS = 1.0
 
     def __init__(
         self,
         model_name: str = "openai/whisper-large-v3-turbo",
         language: str = "ja",
         registry_path: str = "words.json",
+        token_cache_path: str | None = None,
+        draft_model: str | None = None,
+        short_window_pad: float | None = None,
     ):
         self.model_name = model_name
+        # Small Whisper proposing tokens for the main model to verify
+        # (assisted generation; must share the main model's vocab and mels)
+        self.draft_model = draft_model
+        # Encode only segment + this many seconds of padding instead of the
+        # 30 s window (None: always the full window)
+        self.short_window_pad = short_window_pad
         self.language = language
         self.registry_path = registry_path
+        # Tokenized word variants, kept across runs (default: next to the registry)
+        self.token_cache_path = token_cache_path or os.path.splitext(registry_path)[0] + ".tokens.json"
 
         # Device setup (MPS for Apple Silicon)
         if torch.backends.mps.is_available():
@@ -89,62 +275,184 @@ class BiasingWhisperBackend:
             self.device = torch.device("cpu")
             self.dtype = torch.float32
 
-        print(f"[HF Whisper] モデルをロード中: {model_name} (device={self.device})")
-        self.processor = WhisperProcessor.from_pretrained(model_name)
+        self.processor = None
+        self.model = None
+        self.draft = None
+        self.assist_stats: deque[dict] = deque(maxlen=1000)  # per assisted utterance, newest last
+
+        # OOV candidate queue (filled during transcribe, consumed by UI).
+        # Token confidences are only collected while collect_oov is set
+        # (main.py turns it on while the dictionary window listens).
+        self.oov_candidates: list[str] = []
+        self.collect_oov = False
+
+        # Decode with timestamp tokens and report "segments" (streaming mode)
+        self.timestamps = False
+
+    def load(self) -> None:
+        """Load processor/model (and the draft model) and the registry."""
+        print(f"[HF Whisper] モデルをロード中: {self.model_name} (device={self.device})")
+        self.processor = WhisperProcessor.from_pretrained(self.model_name)
         self.model = WhisperForConditionalGeneration.from_pretrained(
-            model_name, torch_dtype=self.dtype
+            self.model_name, torch_dtype=self.dtype
         ).to(self.device)
         print("[HF Whisper] モデルのロードが完了しました")
 
+        if self.draft_model:
+            self._load_draft()
+
+        self.token_pieces = TokenPieces(self.processor.tokenizer)
+
+        # Incremental log-mel frontend (fed by the recorder, see audio2wav.add_chunk_listener)
+        self.frontend = LogMelFrontend.from_feature_extractor(self.processor.feature_extractor)
+
         # Registry & tree
-        self.registry = WordRegistry.load(registry_path)
+        self.token_cache = TokenCache(self.token_cache_path)
+        self.registry = WordRegistry.load(self.registry_path)
         self.tree = PrefixTree()
         self._rebuild_tree()
 
-        # Track file mtime for auto-reload
-        self._registry_mtime: float = self._get_registry_mtime()
-
-        # OOV candidate queue (filled during transcribe, consumed by UI)
-        self.oov_candidates: list[str] = []
+    def _load_draft(self) -> None:
+        print(f"[HF Whisper] ドラフトモデルをロード中: {self.draft_model}")
+        draft = WhisperForConditionalGeneration.from_pretrained(
+            self.draft_model, torch_dtype=self.dtype
+        ).to(self.device)
+        main, small = self.model.config, draft.config
+        if (small.vocab_size, small.num_mel_bins) != (main.vocab_size, main.num_mel_bins):
+            # tiny/base (80 mel, 51865語) は large-v3 系 (128 mel, 51866語) と組めない
+            print(f"[HF Whisper] ドラフトモデル {self.draft_model} は {self.model_name} と互換性がありません "
+                  f"(vocab {small.vocab_size}/{main.vocab_size}, mel {small.num_mel_bins}/{main.num_mel_bins})。"
+                  "補助デコードを無効にします "
+                  "(large-v3 / turbo には distil-whisper/distil-large-v3 を指定してください)")
+            return
+        self.draft = draft
+        # Assisted generation decodes one sequence at a time
+        self.batched = False
+        print(f"[HF Whisper] 補助デコード有効: {self.draft_model}")
+
+    def warmup(self) -> None:
+        self.transcribe(np.zeros(16000, dtype=np.float32))
+        self.oov_candidates = []
 
-    def _get_registry_mtime(self) -> float:
-        try:
-            return os.path.getmtime(self.registry_path)
-        except OSError:
-            return 0.0
+    def close(self) -> None:
+        self.processor = None
+        self.model = None
+        self.draft = None
 
     def _rebuild_tree(self):
         words = self.registry.all()
+        self.tree.build(words, self.processor.tokenizer, self.token_cache)
+        self.token_cache.save()
         if words:
-            self.tree.build(words, self.processor.tokenizer)
             print(f"[HF Whisper] PrefixTree構築完了: {len(words)}語登録")
-        else:
-            self.tree = PrefixTree()
 
-    def reload_registry(self):
-        """Reload word registry from disk and rebuild the prefix tree."""
-        self.registry = WordRegistry.load(self.registry_path)
-        self._rebuild_tree()
-        self._registry_mtime = self._get_registry_mtime()
+    def _update_tree(self, changes: list) -> None:
+        """Apply registry changes (see ``WordRegistry.sync``) to the tree."""
+        tokenizer = self.processor.tokenizer
+        counts = {"add": 0, "remove": 0, "boost": 0}
+        for op, bw in changes:
+            if op == "add":
+                self.tree.insert(bw, tokenizer, self.token_cache)
+            elif op == "remove":
+                self.tree.remove(bw.word)
+            elif op == "boost":
+                self.tree.update_boost(bw.word, bw.boost)
+            counts[op] += 1
+        self.token_cache.save()
+        print(f"[HF Whisper] PrefixTree更新: +{counts['add']} -{counts['remove']} "
+              f"~{counts['boost']} ({len(self.registry)}語登録)")
 
-    def transcribe(self, audio: np.ndarray) -> dict:
+    def reload_registry(self):
+        """Pick up registry edits from disk and update the prefix tree in place."""
+        changes = self.registry.sync()
+        if changes:
+            self._update_tree(changes)
+
+    def _input_features(self, audios: list[np.ndarray]) -> torch.Tensor:
+        """Log-mel features from the frontend cache, extracting only misses."""
+        feats = [self.frontend.features(a) for a in audios]
+        missing = [i for i, f in enumerate(feats) if f is None]
+        if missing:
+            extracted = self.processor(
+                [audios[i] for i in missing], sampling_rate=16000, return_tensors="np"
+            ).input_features
+            for i, f in zip(missing, extracted):
+                feats[i] = f
+        return torch.from_numpy(np.stack(feats))
+
+    def transcribe(self, audio: np.ndarray, prompt: str | None = None) -> dict:
         """Transcribe audio with hotword boosting.
 
         Returns a Whisper-compatible result dict: {"text": ..., "language": ...}
+        (plus "segments" when ``timestamps`` is set). ``prompt`` is previous
+        text the decoder is conditioned on, like Whisper's ``initial_prompt``.
+        """
+        return self.transcribe_batch([audio], prompt=prompt)[0]
+
+    def transcribe_batch(self, audios: list[np.ndarray], prompt: str | None = None) -> list[dict]:
+        """Transcribe several segments with one batched ``generate`` call.
+
+        Each segment is padded to Whisper's 30 s window and decoded as its
+        own sequence (hotword state is tracked per row). Returns one result
+        dict per input, in order; ``oov_candidates`` collects the candidates
+        of all segments. With a draft model the segments are decoded one by
+        one (assisted generation needs batch size 1).
+        """
+        # Auto-reload registry edits (change log / snapshot on disk)
+        self.reload_registry()
+
+        # Prepare input features: (batch, n_mels, frames)
+        input_features = self._input_features(audios).to(self.device, dtype=self.dtype)
+
+        # The OOV recorder hooks the main model: it sees unboosted scores
+        # (and only the verifying model's scores under assisted generation)
+        record_oov = self.collect_oov and (getattr(self.model.generation_config, "num_beams", 1) or 1) == 1
+
+        prompt_ids = None
+        if prompt:
+            # Like openai-whisper, keep <|startofprev|> and the last half-context of prompt tokens
+            prompt_ids = self.processor.get_prompt_ids(prompt, return_tensors="pt")
+            limit = self.model.config.max_target_positions // 2 - 1
+            if len(prompt_ids) > limit:
+                prompt_ids = torch.cat((prompt_ids[:1], prompt_ids[len(prompt_ids) - limit + 1:]))
+            prompt_ids = prompt_ids.to(self.device)
+
+        self.oov_candidates = []
+        results = []
+        if self.draft is None:
+            results = self._generate(input_features, record_oov, window=self._window_frames(audios),
+                                     prompt_ids=prompt_ids)
+        else:
+            # 補助デコードはバッチサイズ 1 のみ
+            for i in range(len(audios)):
+                results += self._generate(input_features[i:i + 1], record_oov, assisted=True,
+                                          window=self._window_frames(audios[i:i + 1]),
+                                          prompt_ids=prompt_ids)
+        return results
+
+    def _window_frames(self, audios: list[np.ndarray]) -> int | None:
+        """Mel frames to encode for these segments, or None for the full window."""
+        if self.short_window_pad is None:
+            return None
+        fe = self.processor.feature_extractor
+        seconds = max(len(a) for a in audios) / fe.sampling_rate + self.short_window_pad
+        step = int(self.WINDOW_STEP_SECONDS * fe.sampling_rate / fe.hop_length)
+        frames = math.ceil(seconds * fe.sampling_rate / fe.hop_length / step) * step
+        return frames if frames < fe.nb_max_frames else None
+
+    def _generate(self, input_features: torch.Tensor, record_oov: bool, assisted: bool = False,
+                  window: int | None = None, prompt_ids: torch.Tensor | None = None) -> list[dict]:
+        """One ``generate`` call; returns one result dict per row and adds OOV candidates.
+
+        With ``window`` the main model's encoder only sees the first
+        ``window`` mel frames (see `encode_window`); the full features are
+        still passed for a draft model, which encodes on its own.
         """
-        # Auto-reload registry if file changed
-        current_mtime = self._get_registry_mtime()
-        if current_mtime > self._registry_mtime:
-            self.reload_registry()
-
-        # Prepare input features
-        input_features = self.processor(
-            audio, sampling_rate=16000, return_tensors="pt"
-        ).input_features.to(self.device, dtype=self.dtype)
-
-        # Build logits processors
-        logits_processors = []
+        oov_recorder = ChosenTokenLogProbs() if record_oov else None
+        logits_processors = [oov_recorder] if oov_recorder is not None else []
         if len(self.registry) > 0:
+            # Under assisted generation HF applies the processors to the draft
+            # proposals and to every verified position of the main model.
             logits_processors.append(HotwordLogitsProcessor(self.tree))
 
         # Attention mask (pad_token == eos_token の警告対策)
@@ -157,39 +465,99 @@ class BiasingWhisperBackend:
             "input_features": input_features,
             "attention_mask": attention_mask,
             "language": self.language if self.language != "auto" else None,
-            "return_dict_in_generate": True,
-            "output_logits": True,
         }
         if logits_processors:
             generate_kwargs["logits_processor"] = logits_processors
-
-        with torch.no_grad():
-            output = self.model.generate(**generate_kwargs)
+        if assisted:
+            generate_kwargs["assistant_model"] = self.draft
+        if prompt_ids is not None:
+            generate_kwargs["prompt_ids"] = prompt_ids
+        if self.timestamps:
+            generate_kwargs["return_timestamps"] = True
+
+        with contextlib.ExitStack() as stack:
+            if oov_recorder is not None:
+                stack.enter_context(oov_recorder.attach(self.model))
+            if assisted:
+                trim = self.draft.register_forward_pre_hook(_trim_cached_decoder_inputs, with_kwargs=True)
+                stack.callback(trim.remove)
+                main_counter = _ForwardCounter(self.model)
+                draft_counter = _ForwardCounter(self.draft)
+                for counter in (main_counter, draft_counter):
+                    stack.callback(counter.remove)
+            start = time.perf_counter()
+            with torch.no_grad():
+                if window is not None:
+                    generate_kwargs["encoder_outputs"] = encode_window(
+                        self.model.get_encoder(), input_features[..., :window]
+                    )
+                output = self.model.generate(**generate_kwargs)
+            elapsed = time.perf_counter() - start
 
         # Decode
-        token_ids = output.sequences[0].tolist()
-        text = self.processor.decode(token_ids, skip_special_tokens=True).strip()
-
-        # Extract OOV candidates from logits
-        self.oov_candidates = []
-        if hasattr(output, "logits") and output.logits:
-            log_probs = []
-            # output.logits is a tuple of (batch, vocab_size) tensors per step
-            generated_ids = token_ids[1:]  # skip decoder start token
-            for step, logit_tensor in enumerate(output.logits):
-                if step < len(generated_ids):
-                    probs = torch.log_softmax(logit_tensor[0], dim=-1)
-                    lp = probs[generated_ids[step]].item()
-                    log_probs.append(lp)
-
-            if log_probs:
-                self.oov_candidates = extract_low_confidence_words(
-                    generated_ids[: len(log_probs)],
-                    log_probs,
-                    self.processor.tokenizer,
-                )
-
-        return {
-            "text": text,
-            "language": self.language,
+        sequences = output.sequences if hasattr(output, "sequences") else output
+        texts = self.processor.batch_decode(sequences, skip_special_tokens=True)
+        if assisted:
+            self._report_assist(sequences, elapsed, main_counter, draft_counter)
+
+        # Extract OOV candidates from the recorded token log-probs
+        if oov_recorder is not None:
+            eos_id = self.processor.tokenizer.eos_token_id
+            for generated_ids, log_probs in zip(*oov_recorder.result(sequences)):
+                if eos_id in generated_ids:
+                    generated_ids = generated_ids[: generated_ids.index(eos_id)]
+                log_probs = log_probs[: len(generated_ids)]
+
+                if log_probs:
+                    self.oov_candidates.extend(extract_low_confidence_words(
+                        generated_ids,
+                        log_probs,
+                        self.processor.tokenizer,
+                        pieces=self.token_pieces,
+                    ))
+
+        results = [{"text": text.strip(), "language": self.language} for text in texts]
+        if self.timestamps:
+            for result, seq in zip(results, sequences):
+                decoded = self.processor.tokenizer.decode(seq, skip_special_tokens=True, output_offsets=True)
+                result["segments"] = [
+                    {"start": o["timestamp"][0], "end": o["timestamp"][1], "text": o["text"]}
+                    for o in decoded.get("offsets", [])
+                ]
+        return results
+
+    def _report_assist(self, sequences, elapsed: float, main: _ForwardCounter,
+                       draft: _ForwardCounter) -> None:
+        """Log the measured acceptance of one assisted utterance.
+
+        Every main-model decoder forward verifies one round of draft tokens
+        and yields one token of its own, so the generated tokens beyond the
+        number of rounds are accepted draft tokens; each draft decoder forward
+        proposes one. ``tokens_per_forward`` is the generated tokens per main
+        forward (1.0 for plain decoding). A verification forward is wider
+        than a plain step, so this is not a speed-up;
+        ``benchmarks/bench_assisted_whisper.py`` measures that directly.
+        """
+        tokenizer = self.processor.tokenizer
+        special = set(tokenizer.all_special_ids) - {tokenizer.eos_token_id}
+        ids = sequences[0].tolist()
+        sot = self.model.generation_config.decoder_start_token_id
+        if sot in ids:
+            # 前文脈(prompt_ids)と強制トークンは生成していないので数えない
+            ids = ids[len(ids) - ids[::-1].index(sot):]
+        tokens = sum(1 for t in ids if t not in special)
+        rounds = max(main.calls, 1)
+        accepted = max(tokens - rounds, 0)
+        stats = {
+            "tokens": tokens,
+            "rounds": rounds,
+            "proposed": draft.calls,
+            "accepted": accepted,
+            "acceptance": accepted / draft.calls if draft.calls else 0.0,
+            "tokens_per_forward": tokens / rounds,
+            "seconds": elapsed,
         }
+        self.assist_stats.append(stats)
+        print(f"[HF Whisper] 補助デコード: tokens={tokens} 検証={rounds}回 "
+              f"採択={accepted}/{draft.calls} ({stats['acceptance']:.0%}) "
+              f"tokens/検証={stats['tokens_per_forward']:.2f} ({elapsed * 1000:.0f} ms)")
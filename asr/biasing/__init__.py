@@ -1,5 +1,14 @@
 from .registry import WordRegistry, BiasWord
 from .tree import PrefixTree
-from .processor import HotwordLogitsProcessor
+from .token_cache import TokenCache
 
-__all__ = ["WordRegistry", "BiasWord", "PrefixTree", "HotwordLogitsProcessor"]
+__all__ = ["WordRegistry", "BiasWord", "PrefixTree", "TokenCache", "HotwordLogitsProcessor"]
+
+
+def __getattr__(name):
+    # HotwordLogitsProcessor pulls in torch/transformers; keep the registry
+    # (used by the --dict UI) importable without them.
+    if name == "HotwordLogitsProcessor":
+        from .processor import HotwordLogitsProcessor
+        return HotwordLogitsProcessor
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
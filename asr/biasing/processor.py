@@ -11,26 +11,118 @@ from .tree import PrefixTree
 class HotwordLogitsProcessor(LogitsProcessor):
     """Applies contextual biasing scores during beam search / greedy decoding.
 
-    For each beam, looks at the recent token history and boosts logits
-    for tokens that continue a registered hotword prefix.
+    Keeps the PrefixTree automaton state of every beam across steps, so each
+    call only consumes the tokens appended since the previous call. Beams are
+    matched to their parent by longest common prefix, which also covers beam
+    reordering and the rollbacks of assisted generation.
+
+    Boosts are added to ``scores`` with one broadcast add (hotword starts,
+    valid in every state) and one ``index_put_`` for all state-specific
+    continuations.
     """
 
     def __init__(self, tree: PrefixTree, window_size: int = 10):
         self.tree = tree
         self.window_size = window_size
+        self.reset()
+
+    def reset(self) -> None:
+        """Forget per-beam state (call before reusing for a new generate)."""
+        self._prev_ids: torch.LongTensor | None = None
+        self._states: list[list[int]] = []  # state after each position, per row
+        self._root_vec: torch.Tensor | None = None
+        self._tables: dict[int, tuple[tuple[int, ...], tuple[float, ...]]] = {}
+
+    def _advance(self, input_ids: torch.LongTensor) -> list[int]:
+        """Update per-row state histories and return the current states."""
+        tree = self.tree
+        rows, seq_len = input_ids.shape
+        prev = self._prev_ids
+
+        if prev is None or prev.shape[0] == 0:
+            parents = [None] * rows
+            lcps = [0] * rows
+        else:
+            m = min(seq_len, prev.shape[1])
+            same = input_ids[:, None, :m] == prev[None, :, :m]  # (rows, prev_rows, m)
+            lcp, parent = same.int().cumprod(dim=-1).sum(dim=-1).max(dim=1)
+            lcps = lcp.tolist()
+            parents = parent.tolist()
+
+        start = min(lcps)
+        tails = input_ids[:, start:].tolist()
+        states: list[list[int]] = []
+        for row in range(rows):
+            k = lcps[row]
+            if k > 0:
+                history = self._states[parents[row]][:k]
+            else:
+                # Cold start: only the last window_size tokens can match.
+                k = max(0, seq_len - self.window_size)
+                history = [tree.ROOT] * k
+            state = history[-1] if history else tree.ROOT
+            for tid in tails[row][k - start:]:
+                state = tree.step(state, tid)
+                history.append(state)
+            states.append(history)
+
+        self._prev_ids = input_ids.clone()
+        self._states = states
+        return [h[-1] if h else tree.ROOT for h in states]
+
+    def _root_vector(self, scores: torch.FloatTensor) -> torch.Tensor:
+        vec = self._root_vec
+        if vec is None or vec.shape[0] != scores.shape[1] or vec.device != scores.device \
+                or vec.dtype != scores.dtype:
+            vocab = scores.shape[1]
+            vec = torch.zeros(vocab, dtype=scores.dtype, device=scores.device)
+            items = [(t, b) for t, b in self.tree.root_boosts.items() if 0 <= t < vocab]
+            if items:
+                ids, vals = zip(*items)
+                vec[list(ids)] = torch.tensor(vals, dtype=scores.dtype, device=scores.device)
+            self._root_vec = vec
+            self._tables = {}
+        return vec
+
+    def _table(self, state: int, vocab: int) -> tuple[tuple[int, ...], tuple[float, ...]]:
+        """Boost deltas on top of the root vector for one state (cached)."""
+        table = self._tables.get(state)
+        if table is None:
+            root = self.tree.root_boosts
+            ids, vals = self.tree.state_boosts(state)
+            pairs = [
+                (t, b - root.get(t, 0.0)) for t, b in zip(ids, vals) if 0 <= t < vocab
+            ]
+            table = (tuple(t for t, _ in pairs), tuple(d for _, d in pairs))
+            self._tables[state] = table
+        return table
 
     def __call__(
         self,
         input_ids: torch.LongTensor,   # (batch * beams, seq_len)
         scores: torch.FloatTensor,      # (batch * beams, vocab_size)
     ) -> torch.FloatTensor:
-        for beam_idx in range(scores.shape[0]):
-            ids = input_ids[beam_idx].tolist()
-            window = ids[-self.window_size:]
-
-            next_boosts = self.tree.get_next_boost(window)
-            for token_id, boost in next_boosts.items():
-                if 0 <= token_id < scores.shape[1]:
-                    scores[beam_idx, token_id] += boost
+        states = self._advance(input_ids)
+        vocab = scores.shape[1]
+
+        scores += self._root_vector(scores)
+
+        rows: list[int] = []
+        cols: list[int] = []
+        vals: list[float] = []
+        for row, state in enumerate(states):
+            if state == self.tree.ROOT:
+                continue
+            ids, deltas = self._table(state, vocab)
+            rows.extend([row] * len(ids))
+            cols.extend(ids)
+            vals.extend(deltas)
+        if rows:
+            device = scores.device
+            scores.index_put_(
+                (torch.tensor(rows, device=device), torch.tensor(cols, device=device)),
+                torch.tensor(vals, dtype=scores.dtype, device=device),
+                accumulate=True,
+            )
 
         return scores
@@ -2,7 +2,9 @@
 
 from __future__ import annotations
 
+import hashlib
 import json
+import os
 from dataclasses import dataclass, field, asdict
 from pathlib import Path
 
@@ -15,53 +17,231 @@ class BiasWord:
 
 
 class WordRegistry:
-    """JSON-backed registry of bias words."""
+    """JSON-backed registry of bias words.
+
+    Storage is a JSON snapshot (``words.json``, a list of words) plus an
+    append-only change log next to it (``words.json.log``, one JSON op per
+    line). Edits append one line; every ``COMPACT_EVERY`` ops the snapshot
+    is rewritten and the log emptied, both by atomic rename, so a reader
+    never sees a half-written file.
+
+    The log starts with a header naming the snapshot it applies to (a
+    digest of its bytes). A log whose header does not match the snapshot
+    on disk (the snapshot was edited by hand, or replaced while the log was
+    not) is ignored, and the next edit compacts it away.
+
+    Another instance (the ASR backend, while the dictionary UI edits) calls
+    `sync` to pick up what changed: it replays only the log lines added
+    since its last read, and falls back to re-reading the snapshot when the
+    snapshot was replaced (compaction, hand edit).
+    """
+
+    COMPACT_EVERY = 64
 
     def __init__(self, words: list[BiasWord] | None = None):
         self._words: dict[str, BiasWord] = {}
         self._path: Path | None = None
+        self._snapshot_sig = None
+        self._snapshot_id = None  # digest of the snapshot bytes, written in the log header
+        self._log_sig = None   # (device, inode) of the log file we read
+        self._log_pos = 0      # bytes of the log already applied
+        self._log_entries = 0
+        self._log_stale = False  # the log header names another snapshot
         if words:
             for w in words:
                 self._words[w.word] = w
 
     @classmethod
     def load(cls, path: str) -> WordRegistry:
+        """Load ``path`` and replay (and later append to) its change log."""
         registry = cls()
         registry._path = Path(path)
-        if registry._path.exists():
-            data = json.loads(registry._path.read_text(encoding="utf-8"))
+        registry._words = registry._read_all()
+        return registry
+
+    @property
+    def log_path(self) -> Path | None:
+        return self._path.with_name(self._path.name + ".log") if self._path else None
+
+    @staticmethod
+    def _stat(path: Path):
+        try:
+            st = path.stat()
+        except OSError:
+            return None
+        return st.st_dev, st.st_ino, st.st_mtime_ns, st.st_size
+
+    @staticmethod
+    def _digest(data: bytes) -> str:
+        return hashlib.sha1(data).hexdigest()
+
+    def _header(self) -> bytes:
+        return (json.dumps({"snapshot": self._snapshot_id}) + "\n").encode("utf-8")
+
+    def _read_all(self) -> dict[str, BiasWord]:
+        """Snapshot + full change log."""
+        words: dict[str, BiasWord] = {}
+        self._snapshot_sig = self._stat(self._path)
+        raw = self._path.read_bytes() if self._snapshot_sig is not None else b""
+        self._snapshot_id = self._digest(raw)
+        if raw:
+            data = json.loads(raw.decode("utf-8"))
             for entry in data:
                 bw = BiasWord(
                     word=entry["word"],
                     boost=entry.get("boost", 2.0),
                     note=entry.get("note", ""),
                 )
-                registry._words[bw.word] = bw
-        return registry
+                words[bw.word] = bw
+        self._log_sig = None
+        self._log_pos = 0
+        self._log_entries = 0
+        self._log_stale = False
+        self._replay(words)
+        return words
+
+    def _replay(self, words: dict[str, BiasWord]) -> list[tuple[str, BiasWord]]:
+        """Apply log lines after ``_log_pos`` to ``words``; return the changes."""
+        log = self.log_path
+        try:
+            with open(log, "rb") as f:
+                st = os.fstat(f.fileno())
+                self._log_sig = (st.st_dev, st.st_ino)
+                f.seek(self._log_pos)
+                chunk = f.read()
+        except OSError:
+            return []
+        # A line without its newline is still being written; leave it for later.
+        chunk = chunk[: chunk.rfind(b"\n") + 1]
+        first = self._log_pos == 0
+        self._log_pos += len(chunk)
+        if self._log_stale:
+            return []
+        changes = []
+        for line in chunk.splitlines():
+            try:
+                op = json.loads(line)
+            except ValueError:
+                continue
+            if first:
+                first = False
+                if not isinstance(op, dict) or op.get("snapshot") != self._snapshot_id:
+                    # 別のスナップショット(手編集前など)に対するログは適用しない
+                    self._log_stale = True
+                    return []
+                continue
+            if not isinstance(op, dict):
+                continue
+            self._log_entries += 1
+            change = self._apply(words, op)
+            if change is not None:
+                changes.append(change)
+        return changes
+
+    @staticmethod
+    def _apply(words: dict[str, BiasWord], op: dict) -> tuple[str, BiasWord] | None:
+        kind, word = op.get("op"), op.get("word")
+        if kind == "add":
+            bw = BiasWord(word=word, boost=op.get("boost", 2.0), note=op.get("note", ""))
+            words[word] = bw
+            return "add", bw
+        if kind == "remove" and word in words:
+            return "remove", words.pop(word)
+        if kind == "boost" and word in words:
+            words[word].boost = op["boost"]
+            return "boost", words[word]
+        return None
+
+    def sync(self) -> list[tuple[str, BiasWord]]:
+        """Pick up changes written by other instances since the last read.
+
+        Returns ``("add" | "remove" | "boost", BiasWord)`` changes in order
+        (cheap no-op when nothing changed: two ``stat`` calls).
+        """
+        if self._path is None:
+            return []
+        log = self._stat(self.log_path)
+        log_replaced = log is not None and (log[:2] != self._log_sig or log[3] < self._log_pos)
+        if self._stat(self._path) != self._snapshot_sig or log_replaced \
+                or (log is None and self._log_pos):
+            previous = self._words
+            self._words = self._read_all()
+            return self._diff(previous, self._words)
+        if log is not None and log[3] > self._log_pos:
+            return self._replay(self._words)
+        return []
+
+    @staticmethod
+    def _diff(old: dict[str, BiasWord], new: dict[str, BiasWord]) -> list[tuple[str, BiasWord]]:
+        changes = [("remove", bw) for word, bw in old.items() if word not in new]
+        for word, bw in new.items():
+            previous = old.get(word)
+            if previous is None or previous.note != bw.note:
+                changes.append(("add", bw))
+            elif previous.boost != bw.boost:
+                changes.append(("boost", bw))
+        return changes
 
     def save(self, path: str | None = None):
+        """Write the full snapshot (atomic rename) and start an empty change log."""
         p = Path(path) if path else self._path
         if p is None:
             raise ValueError("No path specified")
         self._path = p
         data = [asdict(w) for w in self._words.values()]
-        p.write_text(json.dumps(data, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+        raw = (json.dumps(data, ensure_ascii=False, indent=2) + "\n").encode("utf-8")
+        tmp = p.with_name(p.name + ".tmp")
+        tmp.write_bytes(raw)
+        os.replace(tmp, p)
+        self._snapshot_sig = self._stat(p)
+        self._snapshot_id = self._digest(raw)
+        # スナップショットを置き換えてからログを空にする(読み手は新しいログを見たらスナップショットを読み直す)
+        log = self.log_path
+        header = self._header()
+        tmp = log.with_name(log.name + ".tmp")
+        tmp.write_bytes(header)
+        os.replace(tmp, log)
+        st = self._stat(log)
+        self._log_sig = st[:2] if st else None
+        self._log_pos = len(header)
+        self._log_entries = 0
+        self._log_stale = False
+
+    def _record(self, op: dict):
+        """Persist one edit as a log line (compacting every ``COMPACT_EVERY`` ops)."""
+        if not self._path:
+            return
+        if self._log_stale or self._log_entries + 1 >= self.COMPACT_EVERY:
+            self.save()
+            return
+        line = (json.dumps(op, ensure_ascii=False) + "\n").encode("utf-8")
+        if self._log_pos == 0:
+            line = self._header() + line  # ログがまだ無い
+        with open(self.log_path, "ab") as f:
+            f.write(line)
+        self._log_pos += len(line)
+        self._log_entries += 1
+        st = self._stat(self.log_path)
+        self._log_sig = st[:2] if st else None
 
     def add(self, word: str, boost: float = 2.0, note: str = ""):
-        self._words[word] = BiasWord(word=word, boost=boost, note=note)
         if self._path:
-            self.save()
+            self.sync()
+        self._words[word] = BiasWord(word=word, boost=boost, note=note)
+        self._record({"op": "add", "word": word, "boost": boost, "note": note})
 
     def remove(self, word: str):
-        self._words.pop(word, None)
         if self._path:
-            self.save()
+            self.sync()
+        if self._words.pop(word, None) is not None:
+            self._record({"op": "remove", "word": word})
 
     def update_boost(self, word: str, boost: float):
+        if self._path:
+            self.sync()
         if word in self._words:
             self._words[word].boost = boost
-            if self._path:
-                self.save()
+            self._record({"op": "boost", "word": word, "boost": boost})
 
     def all(self) -> list[BiasWord]:
         return list(self._words.values())
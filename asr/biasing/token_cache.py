@@ -0,0 +1,76 @@
+"""Persistent cache of tokenized bias-word variants."""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+
+
+class TokenCache:
+    """Map (tokenizer name, text) -> token ids, saved to a JSON file.
+
+    Building the PrefixTree tokenizes every registered word twice (with and
+    without a leading space). The ids only depend on the tokenizer, so they
+    are kept across runs and a tree rebuild only tokenizes new words.
+    """
+
+    VERSION = 1
+
+    def __init__(self, path: str | None = None):
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._entries: dict[str, dict[str, list[int]]] = {}
+        self._dirty = False
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            self.load(path)
+
+    def __len__(self) -> int:
+        return sum(len(v) for v in self._entries.values())
+
+    @staticmethod
+    def tokenizer_name(tokenizer) -> str:
+        return getattr(tokenizer, "name_or_path", None) or type(tokenizer).__name__
+
+    def encode(self, tokenizer, text: str) -> list[int]:
+        """``tokenizer.encode(text)``, answered from the cache when possible."""
+        name = self.tokenizer_name(tokenizer)
+        with self._lock:
+            ids = self._entries.get(name, {}).get(text)
+            if ids is not None:
+                self.hits += 1
+                return ids
+        ids = list(tokenizer.encode(text))
+        with self._lock:
+            self._entries.setdefault(name, {})[text] = ids
+            self.misses += 1
+            self._dirty = True
+        return ids
+
+    def load(self, path: str) -> None:
+        try:
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"[TokenCache] 読み込み失敗 ({path}): {e}")
+            return
+        if data.get("version") != self.VERSION:
+            return
+        with self._lock:
+            for name, entries in data.get("tokenizers", {}).items():
+                self._entries.setdefault(name, {}).update(entries)
+
+    def save(self, path: str | None = None) -> None:
+        """Write the cache (atomic replace); no-op if nothing was added."""
+        path = path or self.path
+        if not path or not self._dirty:
+            return
+        with self._lock:
+            data = {"version": self.VERSION, "tokenizers": self._entries}
+            tmp = path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False)
+            self._dirty = False
+        os.replace(tmp, path)
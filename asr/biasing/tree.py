@@ -2,6 +2,7 @@
 
 from __future__ import annotations
 
+from collections import deque
 from dataclasses import dataclass, field
 
 
@@ -12,92 +13,355 @@ class _TrieNode:
     depth: int = 0       # depth in this word's token sequence
     total_tokens: int = 0  # total token count of the word (for per-token split)
     is_end: bool = False
+    owners: dict[str, float] = field(default_factory=dict)  # word -> per-token boost ending here
+    # --- Aho-Corasick automaton (filled in by PrefixTree._compile / _link) ---
+    index: int = 0       # state id
+    parent: int = 0      # state id of the parent node
+    token: int = -1      # token id of the edge from the parent
+    fail: int = 0        # state id of the longest proper suffix present in the trie
+    hint: float = 0.0    # boost suggested when this node is the *next* token
 
 
 class PrefixTree:
     """Token-level prefix tree for hotword boosting.
 
-    Each registered word is tokenized and inserted into a trie.
-    During decoding, `get_next_boost` looks at recent token history
-    and returns candidate next-token boosts.
+    Each registered word is tokenized and inserted into a trie, which is
+    then compiled into an Aho-Corasick automaton. A decoding state is a plain
+    ``int``; `step` advances it by one token and `boosts` returns the
+    ``{next_token_id: boost}`` table for that state.
+
+    Words can be added, removed or re-weighted one at a time (`insert`,
+    `remove`, `update_boost`); only their token paths are touched. New
+    states get their failure links, the states whose longest suffix is now
+    a new state (or was a pruned one) are re-pointed, and boost hints are
+    refreshed along the path; the other states keep their ids. Per-state
+    boost tables are computed on first use, so a registry edit does not pay
+    for tokenizing, linking or tabulating the other words.
+
+    `get_next_boost` is kept for callers that only have a token window.
     """
 
+    ROOT = 0
+
     def __init__(self):
         self._root = _TrieNode()
+        self._entries: dict[str, tuple[list[tuple[int, ...]], float]] = {}
+        self._compile()
 
-    def build(self, words: list, tokenizer) -> None:
+    @staticmethod
+    def variants(word: str) -> list[str]:
+        """Spellings to tokenize for a word: as is and with a leading space
+        (Whisper's subword tokens depend on the preceding space)."""
+        if word.startswith(" "):
+            return [word]
+        return [word, " " + word]
+
+    def build(self, words: list, tokenizer, cache=None) -> None:
         """Build the prefix tree from a list of BiasWord objects.
 
-        For each word, tokenize with and without a leading space to handle
-        Whisper's context-dependent spacing.
+        ``cache`` (a ``TokenCache``) supplies token ids of already-seen
+        variants instead of calling the tokenizer again.
         """
         self._root = _TrieNode()
-
+        self._entries = {}
         for bw in words:
-            variants = [bw.word]
-            # Add space-prefixed variant for subword tokenizers
-            if not bw.word.startswith(" "):
-                variants.append(" " + bw.word)
-
-            for variant in variants:
-                token_ids = tokenizer.encode(variant)
-                if not token_ids:
-                    continue
-                # Per-token boost: distribute evenly across tokens
-                per_token = bw.boost / len(token_ids)
-                self._insert(token_ids, per_token)
-
-    def _insert(self, token_ids: list[int], per_token_boost: float) -> None:
+            self._add(bw.word, bw.boost, self._tokenize(bw.word, tokenizer, cache))
+        self._compile()
+
+    def _tokenize(self, word: str, tokenizer, cache) -> list[tuple[int, ...]]:
+        sequences = []
+        for variant in self.variants(word):
+            token_ids = cache.encode(tokenizer, variant) if cache is not None else tokenizer.encode(variant)
+            if token_ids:
+                sequences.append(tuple(token_ids))
+        return sequences
+
+    def insert(self, bw, tokenizer, cache=None) -> None:
+        """Add (or replace) one BiasWord."""
+        if bw.word in self._entries:
+            self.remove(bw.word)
+        sequences = self._tokenize(bw.word, tokenizer, cache)
+        created = self._add(bw.word, bw.boost, sequences)
+        # Shallower states first: a failure link always points to a shallower state.
+        self._link(sorted(created, key=lambda pair: pair[1].depth))
+        self._refresh(sequences)
+
+    def remove(self, word: str) -> None:
+        """Remove a word; paths no other word uses are pruned."""
+        if word in self._entries:
+            sequences, _ = self._entries[word]
+            self._unlink(self._discard(word))
+            self._refresh(sequences)
+
+    def update_boost(self, word: str, boost: float) -> None:
+        """Change a word's boost without re-tokenizing it."""
+        entry = self._entries.get(word)
+        if entry is None:
+            return
+        sequences, _ = entry
+        self._entries[word] = (sequences, boost)
+        for token_ids in sequences:
+            node = self._find(token_ids)
+            node.owners[word] = boost / len(token_ids)
+            node.boost = max(node.owners.values())
+        self._refresh(sequences)
+
+    def __contains__(self, word: str) -> bool:
+        return word in self._entries
+
+    def _add(self, word: str, boost: float,
+             sequences: list[tuple[int, ...]]) -> list[tuple[_TrieNode, _TrieNode]]:
+        """Insert a word's paths; return the ``(parent, node)`` pairs created."""
+        self._entries[word] = (sequences, boost)
+        created = []
+        for token_ids in sequences:
+            # Per-token boost: distribute evenly across tokens
+            created += self._insert(token_ids, word, boost / len(token_ids))
+        return created
+
+    def _insert(self, token_ids: tuple[int, ...], word: str,
+                per_token_boost: float) -> list[tuple[_TrieNode, _TrieNode]]:
         node = self._root
         total = len(token_ids)
+        created = []
         for depth, tid in enumerate(token_ids):
             if tid not in node.children:
-                node.children[tid] = _TrieNode()
+                node.children[tid] = _TrieNode(token=tid)
+                created.append((node, node.children[tid]))
             node = node.children[tid]
             node.depth = depth + 1
             node.total_tokens = total
         node.is_end = True
-        node.boost = per_token_boost
+        node.owners[word] = per_token_boost
+        node.boost = max(node.owners.values())
+        return created
 
-    def get_next_boost(self, token_history: list[int]) -> dict[int, float]:
-        """Given recent token history, return {next_token_id: boost} for
-        all hotword prefixes that match the tail of token_history."""
-        result: dict[int, float] = {}
-
-        # Try matching from each position in the history
-        for start in range(len(token_history)):
-            node = self._root
-            matched = True
-            for tid in token_history[start:]:
-                if tid in node.children:
-                    node = node.children[tid]
-                else:
-                    matched = False
+    def _find(self, token_ids: tuple[int, ...]) -> _TrieNode:
+        node = self._root
+        for tid in token_ids:
+            node = node.children[tid]
+        return node
+
+    def _discard(self, word: str) -> list[_TrieNode]:
+        """Take a word out of the trie; return the pruned nodes."""
+        sequences, _ = self._entries.pop(word)
+        pruned = []
+        for token_ids in sequences:
+            path = [self._root]
+            for tid in token_ids:
+                path.append(path[-1].children[tid])
+            leaf = path[-1]
+            leaf.owners.pop(word, None)
+            leaf.is_end = bool(leaf.owners)
+            leaf.boost = max(leaf.owners.values(), default=0.0)
+            # Prune nodes that no longer lead to any word.
+            for depth in range(len(token_ids), 0, -1):
+                node = path[depth]
+                if node.children or node.owners:
                     break
+                del path[depth - 1].children[token_ids[depth - 1]]
+                pruned.append(node)
+        return pruned
+
+    def _compile(self) -> None:
+        """Number the nodes, link failure edges and compute boost hints.
+
+        Per-state boost tables are built lazily by `state_boosts`.
+        """
+        nodes = [self._root]
+        by_token: dict[int, set[int]] = {}
+        queue = deque([self._root])
+        while queue:
+            node = queue.popleft()
+            for tid, child in node.children.items():
+                child.index = len(nodes)
+                child.parent = node.index
+                by_token.setdefault(tid, set()).add(child.index)
+                nodes.append(child)
+                queue.append(child)
+        self._nodes: list[_TrieNode | None] = nodes
+        self._free: list[int] = []  # ids of pruned states, reused by new ones
+        self._by_token = by_token   # token id -> states entered by that token
+
+        # Boost hint of a node as a next-token candidate: its own boost at a
+        # word end, otherwise the best boost below it (independent of the
+        # order words were inserted in, so incremental edits match a rebuild).
+        for node in reversed(nodes):
+            if node.is_end:
+                node.hint = node.boost
+            else:
+                node.hint = max((c.hint for c in node.children.values()), default=0.0)
 
-            if matched:
-                # Add all possible next tokens from this node
-                for next_tid, child in node.children.items():
-                    # Use per-token boost (stored at leaf, but uniform across path)
-                    boost = child.boost if child.is_end else self._get_leaf_boost(child)
-                    if boost > 0:
-                        # Take max if multiple paths suggest the same token
-                        result[next_tid] = max(result.get(next_tid, 0.0), boost)
-
-        # Also check if any hotword starts at the next position (fresh match)
-        for next_tid, child in self._root.children.items():
-            boost = child.boost if child.is_end else self._get_leaf_boost(child)
-            if boost > 0:
-                result[next_tid] = max(result.get(next_tid, 0.0), boost)
+        # Root table: a hotword may start at any position.
+        root = self._root
+        root.index = root.fail = self.ROOT
+        self._root_boosts = {
+            tid: c.hint for tid, c in root.children.items() if c.hint > 0
+        }
 
+        # BFS over the trie: fail links point to strictly shallower states.
+        queue = deque(root.children.values())
+        for child in root.children.values():
+            child.fail = self.ROOT
+        while queue:
+            node = queue.popleft()
+            for tid, child in node.children.items():
+                fail = nodes[node.fail]
+                while tid not in fail.children and fail is not root:
+                    fail = nodes[fail.fail]
+                target = fail.children.get(tid)
+                child.fail = target.index if target is not None and target is not child else self.ROOT
+                queue.append(child)
+
+        self._reset_tables()
+
+    def _reset_tables(self) -> None:
+        self._merged: dict[int, dict[int, float]] = {self.ROOT: {}}
+        self._tables: dict[int, tuple[tuple[int, ...], tuple[float, ...]]] = {self.ROOT: ((), ())}
+
+    def _link(self, created: list[tuple[_TrieNode, _TrieNode]]) -> None:
+        """Give new nodes (shallowest first) a state id and a failure link.
+
+        An existing state X gets a new node T as its failure state when T is
+        a longer suffix of X than its current one. X then ends with T's token
+        and X's parent ends with T's parent, so only the states entered by
+        that token are checked.
+        """
+        nodes, root = self._nodes, self._root
+        for parent, node in created:
+            if self._free:
+                node.index = self._free.pop()
+                nodes[node.index] = node
+            else:
+                node.index = len(nodes)
+                nodes.append(node)
+            node.parent = parent.index
+            tid = node.token
+            fail = nodes[parent.fail]
+            while tid not in fail.children and fail is not root:
+                fail = nodes[fail.fail]
+            target = fail.children.get(tid) if parent is not root else None
+            node.fail = target.index if target is not None else self.ROOT
+            states = self._by_token.setdefault(tid, set())
+            for state in states:
+                other = nodes[state]
+                if other.depth > node.depth and nodes[other.fail].depth < node.depth \
+                        and self._ends_with(nodes[other.parent], parent):
+                    other.fail = node.index
+            states.add(node.index)
+
+    def _ends_with(self, node: _TrieNode, suffix: _TrieNode) -> bool:
+        """Whether ``suffix``'s token path is a suffix of ``node``'s."""
+        # The failure chain visits every suffix of a state present in the trie.
+        while node.depth > suffix.depth:
+            node = self._nodes[node.fail]
+        return node is suffix
+
+    def _unlink(self, pruned: list[_TrieNode]) -> None:
+        """Free the ids of pruned nodes and re-point states that failed to them."""
+        if not pruned:
+            return
+        nodes = self._nodes
+        gone = {node.index: node for node in pruned}
+        for node in pruned:
+            self._by_token[node.token].discard(node.index)
+            nodes[node.index] = None
+            self._free.append(node.index)
+        # A state failing to a pruned node ends with its token; its next
+        # longest suffix is the first surviving state on the pruned chain.
+        for tid in {node.token for node in pruned}:
+            for state in self._by_token[tid]:
+                other = nodes[state]
+                while other.fail in gone:
+                    other.fail = gone[other.fail].fail
+
+    def _refresh(self, sequences: list[tuple[int, ...]]) -> None:
+        """Recompute boost hints along edited paths and drop cached tables."""
+        root = self._root
+        for token_ids in sequences:
+            path = [root]
+            for tid in token_ids:
+                child = path[-1].children.get(tid)
+                if child is None:
+                    break
+                path.append(child)
+            for node in reversed(path[1:]):
+                if node.is_end:
+                    node.hint = node.boost
+                else:
+                    node.hint = max((c.hint for c in node.children.values()), default=0.0)
+            first = token_ids[0]
+            if len(path) > 1 and path[1].hint > 0:
+                self._root_boosts[first] = path[1].hint
+            else:
+                self._root_boosts.pop(first, None)
+        self._reset_tables()
+
+    def _merged_table(self, state: int) -> dict[int, float]:
+        """Best next-token boosts of a state and all its failure states."""
+        table = self._merged.get(state)
+        if table is None:
+            node = self._nodes[state]
+            # A node's table extends its (strictly shallower) failure state's.
+            table = dict(self._merged_table(node.fail))
+            for tid, child in node.children.items():
+                if child.hint > 0 and child.hint > table.get(tid, 0.0):
+                    table[tid] = child.hint
+            self._merged[state] = table
+        return table
+
+    def __len__(self) -> int:
+        """Number of automaton states (including the root)."""
+        return len(self._nodes) - len(self._free)
+
+    @property
+    def root_boosts(self) -> dict[int, float]:
+        """Boosts for tokens that start a hotword (valid in every state)."""
+        return self._root_boosts
+
+    def step(self, state: int, token_id: int) -> int:
+        """Advance the automaton by one token."""
+        nodes = self._nodes
+        node = nodes[state]
+        while True:
+            child = node.children.get(token_id)
+            if child is not None:
+                return child.index
+            if node.index == self.ROOT:
+                return self.ROOT
+            node = nodes[node.fail]
+
+    def walk(self, token_ids, state: int = ROOT) -> int:
+        """Advance the automaton over a sequence of tokens."""
+        for tid in token_ids:
+            state = self.step(state, tid)
+        return state
+
+    def state_boosts(self, state: int) -> tuple[tuple[int, ...], tuple[float, ...]]:
+        """Return the ``(token_ids, boosts)`` of a state (computed once).
+
+        Only entries that exceed `root_boosts` are listed; the full table is
+        the root table overridden by these entries.
+        """
+        table = self._tables.get(state)
+        if table is None:
+            root = self._root_boosts
+            extra = [
+                (tid, b) for tid, b in self._merged_table(state).items()
+                if b > root.get(tid, 0.0)
+            ]
+            table = (tuple(tid for tid, _ in extra), tuple(b for _, b in extra))
+            self._tables[state] = table
+        return table
+
+    def boosts(self, state: int) -> dict[int, float]:
+        """Return the full ``{next_token_id: boost}`` table of a state."""
+        ids, vals = self.state_boosts(state)
+        result = dict(self._root_boosts)
+        result.update(zip(ids, vals))
         return result
 
-    def _get_leaf_boost(self, node: _TrieNode) -> float:
-        """Walk down to find the boost value from any leaf under this node."""
-        if node.is_end:
-            return node.boost
-        for child in node.children.values():
-            b = self._get_leaf_boost(child)
-            if b > 0:
-                return b
-        return 0.0
+    def get_next_boost(self, token_history: list[int]) -> dict[int, float]:
+        """Given recent token history, return {next_token_id: boost} for
+        all hotword prefixes that match the tail of token_history."""
+        return self.boosts(self.walk(token_history))
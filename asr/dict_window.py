@@ -24,12 +24,20 @@ class DictWindow:
         self.win.geometry("520x560")
         self.registry = registry
         self.reload_cb = reload_cb
-        self.oov_queue = oov_queue  # queue.Queue of list[str]
+        self.oov_queue = oov_queue  # queue.Queue (or asr.oov.OOVFeed) of list[str]
         self._build_ui()
         self._refresh_list()
-        if self.oov_queue:
+        if self.oov_queue is not None:
+            # 開いている間だけバックエンドにOOV解析をさせる
+            if hasattr(self.oov_queue, "subscribe"):
+                self.oov_queue.subscribe()
+                self.win.bind("<Destroy>", self._on_destroy)
             self._poll_oov()
 
+    def _on_destroy(self, event):
+        if event.widget is self.win:
+            self.oov_queue.unsubscribe()
+
     def _build_ui(self):
         # --- Input section ---
         input_frame = tk.LabelFrame(self.win, text="単語を追加", padx=10, pady=5)
@@ -160,7 +168,7 @@ class DictWindow:
 
     def _poll_oov(self):
         """Poll OOV candidate queue and display suggestions."""
-        if self.oov_queue:
+        if self.oov_queue is not None:
             try:
                 while True:
                     candidates = self.oov_queue.get_nowait()
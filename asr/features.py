@@ -0,0 +1,146 @@
+"""Incremental Whisper log-mel frontend with a frame cache."""
+
+from __future__ import annotations
+
+import threading
+
+import numpy as np
+
+
+class LogMelFrontend:
+    """Computes Whisper log-mel frames as recorder chunks arrive.
+
+    Frames are laid on a fixed hop grid over the continuous recorder stream
+    and cached (raw log10 mel, before Whisper's per-window normalisation), so
+    audio shared by overlapping segments goes through the STFT only once.
+    `features` then assembles the padded 30 s input of a segment from cached
+    frames, computing only the few frames at the segment's end on demand.
+
+    `push` is meant to be registered as an ``audio2wav`` chunk listener; it
+    runs on the recording thread, off the ASR thread's critical path.
+    """
+
+    def __init__(
+        self,
+        mel_filters: np.ndarray,
+        n_fft: int = 400,
+        hop_length: int = 160,
+        n_samples: int = 480000,
+        cache_seconds: float = 60.0,
+        sampling_rate: int = 16000,
+    ):
+        self.mel_filters = np.asarray(mel_filters, dtype=np.float32)  # (n_freq, n_mels)
+        self.n_fft = n_fft
+        self.hop_length = hop_length
+        self.n_samples = n_samples
+        self.n_frames = n_samples // hop_length
+        self.window = np.hanning(n_fft + 1)[:-1].astype(np.float32)
+        self._capacity = max(int(cache_seconds * sampling_rate / hop_length), self.n_frames)
+        self._lock = threading.Lock()
+        self._cache = np.empty((self.mel_filters.shape[1], self._capacity), dtype=np.float32)
+        self._reset(0)
+
+    @classmethod
+    def from_feature_extractor(cls, feature_extractor, **kwargs) -> LogMelFrontend:
+        """Create a frontend matching a ``WhisperFeatureExtractor``."""
+        return cls(
+            feature_extractor.mel_filters,
+            n_fft=feature_extractor.n_fft,
+            hop_length=feature_extractor.hop_length,
+            n_samples=feature_extractor.n_samples,
+            sampling_rate=feature_extractor.sampling_rate,
+            **kwargs,
+        )
+
+    def _reset(self, origin: int) -> None:
+        half = self.n_fft // 2
+        self._origin = origin            # stream sample of frame 0's centre
+        self._end = origin               # stream sample after the last pushed one
+        self._next_frame = 0             # first frame not computed yet
+        self._buf = np.zeros(half, dtype=np.float32)  # samples from _buf_start on
+        self._buf_start = origin - half
+
+    def _log_mel(self, frames: np.ndarray) -> np.ndarray:
+        """(n, n_fft) sample windows -> (n_mels, n) raw log10 mel."""
+        spec = np.fft.rfft(frames * self.window, axis=-1)
+        power = spec.real ** 2 + spec.imag ** 2
+        mel = self.mel_filters.T @ power.T.astype(np.float32)
+        return np.log10(np.maximum(mel, 1e-10))
+
+    def push(self, start_sample: int, samples: np.ndarray) -> None:
+        """Append recorder samples starting at stream position ``start_sample``."""
+        samples = np.asarray(samples, dtype=np.float32)
+        with self._lock:
+            if start_sample != self._end:
+                # Discontinuity (first chunk, device switch, ...): new grid.
+                self._reset(start_sample)
+            self._buf = np.concatenate([self._buf, samples])
+            self._end = start_sample + len(samples)
+
+            # Frames whose whole window is available.
+            half, hop = self.n_fft // 2, self.hop_length
+            last = (self._end - half - self._origin) // hop  # last complete frame
+            first = self._next_frame
+            if last < first:
+                return
+            offset = self._origin + first * hop - half - self._buf_start
+            count = last - first + 1
+            span = self._buf[offset: offset + (count - 1) * hop + self.n_fft]
+            windows = np.lib.stride_tricks.sliding_window_view(span, self.n_fft)[::hop]
+            log_mel = self._log_mel(windows)
+
+            idx = np.arange(first, first + count) % self._capacity
+            self._cache[:, idx] = log_mel
+            self._next_frame = last + 1
+
+            # Keep only the samples the next frame still needs.
+            keep_from = self._origin + self._next_frame * hop - half - self._buf_start
+            self._buf = self._buf[keep_from:]
+            self._buf_start += keep_from
+
+    def features(self, audio: np.ndarray) -> np.ndarray | None:
+        """Return normalised ``(n_mels, n_frames)`` input features of a segment.
+
+        ``audio`` must carry the ``start_sample`` of its first sample in the
+        recorder stream (see ``audio2wav.AudioSegment``). Returns None when
+        the segment is not covered by the cache or does not start on the
+        cache's hop grid (recorder chunks are a multiple of the hop, so
+        segments normally do); the caller should then fall back to the
+        regular feature extractor.
+        """
+        start = getattr(audio, "start_sample", None)
+        if start is None:
+            return None
+        audio = np.asarray(audio, dtype=np.float32)[: self.n_samples]
+        end = start + len(audio)
+        half, hop = self.n_fft // 2, self.hop_length
+
+        with self._lock:
+            origin = self._origin
+            if start < origin or end > self._end or (start - origin) % hop:
+                return None
+            first = (start - origin) // hop  # frame centred on the segment's first sample
+            # Frames whose window ends inside the segment come from the cache.
+            n_cached = max(0, min((end - half - origin) // hop - first + 1, self.n_frames))
+            if n_cached and first < self._next_frame - self._capacity:
+                return None
+            log_spec = np.full((self.mel_filters.shape[1], self.n_frames), -10.0, dtype=np.float32)
+            if n_cached:
+                idx = np.arange(first, first + n_cached) % self._capacity
+                log_spec[:, :n_cached] = self._cache[:, idx]
+
+        # Frames straddling the segment end see Whisper's zero padding.
+        tail = []
+        j = n_cached
+        while j < self.n_frames and j * hop - half < len(audio):
+            lo = j * hop - half
+            window = np.zeros(self.n_fft, dtype=np.float32)
+            src = audio[max(lo, 0): lo + self.n_fft]
+            window[max(-lo, 0): max(-lo, 0) + len(src)] = src
+            tail.append(window)
+            j += 1
+        if tail:
+            log_spec[:, n_cached: n_cached + len(tail)] = self._log_mel(np.stack(tail))
+
+        log_spec = np.maximum(log_spec, log_spec.max() - 8.0)
+        return (log_spec + 4.0) / 4.0
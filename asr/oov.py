@@ -0,0 +1,40 @@
+"""Subscription-aware channel for OOV (out-of-vocabulary) word candidates."""
+
+from __future__ import annotations
+
+import queue
+import threading
+
+
+class OOVFeed(queue.Queue):
+    """Queue of OOV candidate lists that knows whether anyone is listening.
+
+    The hf backend only analyses token confidences while `active` is true,
+    so decoding pays nothing for OOV extraction when the dictionary window
+    is closed. Consumers call `subscribe` when they start polling and
+    `unsubscribe` when they go away.
+    """
+
+    def __init__(self, maxsize: int = 0):
+        super().__init__(maxsize)
+        self._subscribers = 0
+        self._sub_lock = threading.Lock()
+
+    def subscribe(self) -> None:
+        with self._sub_lock:
+            self._subscribers += 1
+
+    def unsubscribe(self) -> None:
+        with self._sub_lock:
+            self._subscribers = max(0, self._subscribers - 1)
+            if self._subscribers == 0:
+                # 誰も読まない候補は捨てる
+                while True:
+                    try:
+                        self.get_nowait()
+                    except queue.Empty:
+                        break
+
+    @property
+    def active(self) -> bool:
+        return self._subscribers > 0
@@ -0,0 +1,87 @@
+"""Lazy registry of ASR backends and translators.
+
+Entries are import specs (``"module"`` or ``"module:attr"``) resolved on
+first use, so heavy dependencies (torch, transformers, mlx, ...) are only
+imported for the backend/translator actually selected on the command line.
+Backends implement ``asr.backends.ASRBackend``.
+"""
+
+from __future__ import annotations
+
+import importlib
+import sys
+import threading
+import time
+
+BACKENDS: dict[str, str] = {
+    "mlx": "asr.backends:MLXBackend",
+    "openai": "asr.backends:OpenAIWhisperBackend",
+    "stable-ts": "asr.backends:StableTSBackend",
+    "hf": "asr.biased_whisper:BiasingWhisperBackend",
+}
+
+TRANSLATORS: dict[str, str] = {
+    "opus": "asr.translator_opus:OpusTranslator",
+    "gemma": "asr.translator_gemma:GemmaTranslator",
+}
+
+_lock = threading.Lock()
+_profile = False
+import_times: dict[str, float] = {}  # module -> seconds spent on first import
+
+
+def register_backend(name: str, spec: str) -> None:
+    BACKENDS[name] = spec
+
+
+def register_translator(name: str, spec: str) -> None:
+    TRANSLATORS[name] = spec
+
+
+def enable_profiling() -> None:
+    """Print the import time of every module loaded through this registry."""
+    global _profile
+    _profile = True
+
+
+def import_module(name: str):
+    """Import a module, recording how long the first import took."""
+    if name in sys.modules:
+        return sys.modules[name]
+    t0 = time.perf_counter()
+    module = importlib.import_module(name)
+    dt = time.perf_counter() - t0
+    with _lock:
+        import_times.setdefault(name, dt)
+    if _profile:
+        print(f"[startup] import {name}: {dt * 1000:.1f} ms")
+    return module
+
+
+def load(spec: str):
+    """Resolve ``"module"`` or ``"module:attr"``."""
+    module_name, _, attr = spec.partition(":")
+    module = import_module(module_name)
+    return getattr(module, attr) if attr else module
+
+
+def load_backend(name: str):
+    if name not in BACKENDS:
+        raise ValueError(f"未対応のバックエンド: {name}")
+    return load(BACKENDS[name])
+
+
+def load_translator(name: str):
+    if name not in TRANSLATORS:
+        raise ValueError(f"未対応の翻訳器: {name}")
+    return load(TRANSLATORS[name])
+
+
+def report(elapsed: float | None = None) -> None:
+    """Print a summary of import times (slowest first)."""
+    with _lock:
+        items = sorted(import_times.items(), key=lambda kv: kv[1], reverse=True)
+    for name, dt in items:
+        print(f"[startup] {dt * 1000:9.1f} ms  {name}")
+    if elapsed is not None:
+        print(f"[startup] {elapsed * 1000:9.1f} ms  total (起動開始→UI表示)")
@@ -0,0 +1,104 @@
+"""Sentence-aware accumulation of ASR text before translation.
+
+Whisper segments are cut by the recorder (``max_record_seconds``), not by
+sentences, so a segment often ends mid-sentence. ``SentenceAccumulator``
+buffers the unfinished tail of each segment, merges it with the next one and
+releases only complete sentences (Japanese 。？！ and English . ? !). A tail
+that stays unfinished longer than ``max_wait`` seconds is released as is.
+
+Every released job carries the uid of the newest segment it contains, so the
+PiP window (which shows the latest uid) still gets the translation.
+"""
+
+from __future__ import annotations
+
+import re
+import time
+
+_SENTENCE_END_RE = re.compile(r"(?:[。．？！?!]+|\.(?=\s|$))[」』）)\"'”’]*")
+
+
+def split_sentences(text: str) -> tuple[list[str], str]:
+    """Split ``text`` into (complete sentences, unfinished remainder)."""
+    sentences = []
+    pos = 0
+    for match in _SENTENCE_END_RE.finditer(text):
+        sentence = text[pos:match.end()].strip()
+        if sentence:
+            sentences.append(sentence)
+        pos = match.end()
+    return sentences, text[pos:].strip()
+
+
+def join_text(head: str, tail: str) -> str:
+    """Concatenate fragments, with a space only between Latin-script words."""
+    if not head or not tail:
+        return head or tail
+    if head[-1].isascii() and head[-1].isalnum() and tail[0].isascii() and tail[0].isalnum():
+        return f"{head} {tail}"
+    if head[-1] in ",.?!;:" and tail[0].isascii():
+        return f"{head} {tail}"
+    return head + tail
+
+
+def join_sentences(sentences: list[str]) -> str:
+    text = ""
+    for sentence in sentences:
+        text = join_text(text, sentence)
+    return text
+
+
+class SentenceAccumulator:
+    """Turn (uid, text, src, tgt) segments into sentence-complete translation jobs."""
+
+    def __init__(self, max_wait: float = 1.5):
+        self.max_wait = max_wait
+        self._pending = ""
+        self._pending_uid = None
+        self._pending_pair = None
+        self._pending_since = 0.0
+
+    def push(self, uid, text: str, src: str, tgt: str, now: float | None = None) -> list[tuple]:
+        """Add one ASR segment and return the jobs that became ready."""
+        now = time.monotonic() if now is None else now
+        jobs = []
+        if self._pending and self._pending_pair != (src, tgt):
+            jobs.extend(self.flush())
+
+        sentences, remainder = split_sentences(join_text(self._pending, text.strip()))
+        if sentences:
+            # このセグメントで完結した文は(前の断片も含めて)1つのジョブにまとめる
+            jobs.append((uid, join_sentences(sentences), src, tgt))
+        if remainder:
+            if not self._pending or sentences:
+                self._pending_since = now
+            self._pending = remainder
+            self._pending_uid = uid
+            self._pending_pair = (src, tgt)
+        else:
+            self._pending = ""
+            self._pending_uid = None
+        return jobs
+
+    def due(self, now: float | None = None) -> list[tuple]:
+        """Release the unfinished tail if it has waited longer than ``max_wait``."""
+        now = time.monotonic() if now is None else now
+        if self._pending and now - self._pending_since >= self.max_wait:
+            return self.flush()
+        return []
+
+    def timeout(self, now: float | None = None) -> float | None:
+        """Seconds until the pending tail is due (None if nothing is pending)."""
+        if not self._pending:
+            return None
+        now = time.monotonic() if now is None else now
+        return max(0.0, self._pending_since + self.max_wait - now)
+
+    def flush(self) -> list[tuple]:
+        if not self._pending:
+            return []
+        src, tgt = self._pending_pair
+        job = (self._pending_uid, self._pending, src, tgt)
+        self._pending = ""
+        self._pending_uid = None
+        return [job]
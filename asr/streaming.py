@@ -0,0 +1,240 @@
+"""Rolling-buffer streaming transcription with LocalAgreement commits.
+
+Instead of transcribing every recorder segment on its own, short chunks are
+appended to a rolling audio buffer and the buffer is decoded again after
+each chunk. Hypotheses are split into units (Latin-script words, single
+characters otherwise: Japanese has no spaces) and a unit is committed once
+two consecutive hypotheses agree on it (LocalAgreement-2); the rest of the
+latest hypothesis is shown as tentative text.
+
+When the buffer grows past ``trim_seconds``, it is cut at the end of the
+last Whisper segment whose text is fully committed, so only the unconfirmed
+tail is decoded again. The committed text that left the buffer is passed as
+the prompt of the next decodes (``condition_on_previous_text`` across cuts).
+Backends report segments as ``result["segments"]`` (``start`` / ``end`` in
+seconds, ``text``), as openai-whisper and mlx-whisper do.
+
+Chunks carrying their recorder ``start_sample`` keep the buffer tagged with
+its stream position, so the hf backend's log-mel frontend serves every
+re-decode from its cache. Trims cut on the frontend's hop grid
+(``hop_length`` samples) so the buffer start stays on it.
+"""
+
+from __future__ import annotations
+
+import inspect
+import re
+from dataclasses import dataclass, field
+
+import numpy as np
+
+_UNIT_RE = re.compile(r"\s*(?:[0-9A-Za-zÀ-ɏ]+(?:['’.\-][0-9A-Za-zÀ-ɏ]+)*|\S)")
+
+
+def split_units(text: str) -> list[str]:
+    """Split text into comparable units; each unit keeps its leading whitespace."""
+    return _UNIT_RE.findall(text)
+
+
+def _key(unit: str) -> str:
+    return unit.strip().casefold()
+
+
+def common_prefix(a: list[str], b: list[str]) -> int:
+    """Number of leading units ``a`` and ``b`` agree on."""
+    n = 0
+    for x, y in zip(a, b):
+        if _key(x) != _key(y):
+            break
+        n += 1
+    return n
+
+
+class LocalAgreement:
+    """Commit the units that two consecutive hypotheses agree on.
+
+    ``committed`` holds the committed units that still lie in the audio
+    buffer: every hypothesis covers the whole buffer, so they are skipped
+    before comparing. ``tentative`` is the rest of the latest hypothesis.
+    """
+
+    ANCHOR = 3  # committed units used to re-align a hypothesis that revised them
+
+    def __init__(self):
+        self.committed: list[str] = []
+        self.tentative: list[str] = []
+
+    def insert(self, hypothesis: list[str]) -> list[str]:
+        """Feed a hypothesis of the whole buffer; return the newly committed units."""
+        tail = hypothesis[self._skip(hypothesis):]
+        n = common_prefix(self.tentative, tail)
+        new = tail[:n]
+        self.committed += new
+        self.tentative = tail[n:]
+        return new
+
+    def _skip(self, hypothesis: list[str]) -> int:
+        """Number of leading hypothesis units that repeat committed text."""
+        committed = self.committed
+        n = common_prefix(committed, hypothesis)
+        if n == len(committed):
+            return n
+        # 確定済みの部分が再デコードで変わった: 確定末尾の数単位が現れる位置から再開する
+        anchor = [_key(u) for u in committed[-self.ANCHOR:]]
+        keys = [_key(u) for u in hypothesis]
+        ends = [i + len(anchor) for i in range(len(keys) - len(anchor) + 1)
+                if keys[i:i + len(anchor)] == anchor]
+        if ends:
+            return min(ends, key=lambda end: abs(end - len(committed)))
+        return min(len(committed), len(hypothesis))
+
+    def flush(self) -> list[str]:
+        """Commit the tentative units as they are (end of speech / forced cut)."""
+        new, self.tentative = self.tentative, []
+        self.committed += new
+        return new
+
+    def drop(self, n: int) -> list[str]:
+        """Forget the first ``n`` committed units (their audio left the buffer)."""
+        dropped, self.committed = self.committed[:n], self.committed[n:]
+        return dropped
+
+
+class _TaggedAudio(np.ndarray):
+    """Buffer view carrying its recorder stream position (see ``LogMelFrontend.features``)."""
+
+    start_sample = None
+
+
+@dataclass
+class StreamStep:
+    committed: list[str] = field(default_factory=list)  # units committed by this step
+    tentative: list[str] = field(default_factory=list)  # current unconfirmed units
+    final: bool = False  # the buffer was reset (silence or forced cut): nothing is pending
+
+
+class StreamingTranscriber:
+    """Rolling audio buffer decoded with any ``ASRBackend``.
+
+    ``push`` adds audio and decodes the buffer once. A buffer whose tail has
+    been silent for ``silence_seconds`` is finished (tentative text is
+    committed and the buffer cleared); a buffer that is silent throughout is
+    dropped without decoding. If no committed segment end can be found, the
+    buffer is finished by force at ``max_seconds`` (Whisper sees 30 s).
+    """
+
+    def __init__(self, backend, sampling_rate: int = 16000, trim_seconds: float = 10.0,
+                 max_seconds: float = 25.0, silence_threshold: float = 0.01,
+                 silence_seconds: float = 0.8, prompt_chars: int = 200, hop_length: int = 160):
+        self.backend = backend
+        self.sampling_rate = sampling_rate
+        self.hop_length = hop_length
+        self.trim_seconds = trim_seconds
+        self.max_seconds = max_seconds
+        self.silence_threshold = silence_threshold
+        self.silence_seconds = silence_seconds
+        self.prompt_chars = prompt_chars
+        try:
+            self._supports_prompt = "prompt" in inspect.signature(backend.transcribe).parameters
+        except (TypeError, ValueError):
+            self._supports_prompt = False
+        self.agreement = LocalAgreement()
+        self.audio = np.zeros(0, dtype=np.float32)
+        self.offset = 0      # stream position (samples) of audio[0]
+        self._tagged = False  # offset is the recorder's start_sample of audio[0]
+        self.context = ""    # committed text whose audio left the buffer
+        self.language = None  # language reported by the latest decode
+        self.decodes = 0
+
+    @property
+    def buffer_seconds(self) -> float:
+        return len(self.audio) / self.sampling_rate
+
+    @property
+    def end(self) -> int:
+        """Stream position (samples) just after the buffered audio."""
+        return self.offset + len(self.audio)
+
+    def _silent(self, audio: np.ndarray) -> bool:
+        return len(audio) > 0 and float(np.sqrt(np.mean(audio * audio))) < self.silence_threshold
+
+    def push(self, chunk: np.ndarray) -> StreamStep:
+        """Append ``chunk`` and decode the buffer."""
+        start = getattr(chunk, "start_sample", None)
+        if not len(self.audio):
+            self._tagged = start is not None
+            if start is not None:
+                self.offset = start
+        elif start != self.end:
+            self._tagged = False  # 取りこぼしなどで連続していない
+        self.audio = np.concatenate((self.audio, np.asarray(chunk, dtype=np.float32)))
+        if not self.agreement.committed and not self.agreement.tentative and self._silent(self.audio):
+            # 発話前の無音は認識しない(無音へのハルシネーション対策)
+            self.offset += len(self.audio)
+            self.audio = self.audio[:0]
+            return StreamStep(final=True)
+
+        units, segments = self._decode()
+        step = StreamStep(committed=self.agreement.insert(units))
+        tail = self.audio[-int(self.silence_seconds * self.sampling_rate):]
+        if self.buffer_seconds >= self.silence_seconds and self._silent(tail):
+            return self._finish(step)
+        if self.buffer_seconds >= self.trim_seconds and not self._trim(segments) \
+                and self.buffer_seconds >= self.max_seconds:
+            return self._finish(step)
+        step.tentative = list(self.agreement.tentative)
+        return step
+
+    def finish(self) -> StreamStep:
+        """End of input: commit whatever is tentative."""
+        return self._finish(StreamStep())
+
+    def _finish(self, step: StreamStep) -> StreamStep:
+        step.committed = step.committed + self.agreement.flush()
+        step.tentative = []
+        step.final = True
+        self._remember("".join(self.agreement.drop(len(self.agreement.committed))))
+        self.offset += len(self.audio)
+        self.audio = self.audio[:0]
+        return step
+
+    def _remember(self, text: str) -> None:
+        self.context = (self.context + text)[-self.prompt_chars:]
+
+    def _decode(self) -> tuple[list[str], list[tuple[float, int]]]:
+        """Transcribe the buffer; return its units and (segment end, units so far)."""
+        kwargs = {"prompt": self.context.strip()} if self._supports_prompt and self.context.strip() else {}
+        audio = self.audio
+        if self._tagged:
+            audio = audio.view(_TaggedAudio)
+            audio.start_sample = self.offset
+        result = self.backend.transcribe(audio, **kwargs)
+        self.decodes += 1
+        self.language = result.get("language") or self.language
+        segments = result.get("segments") or []
+        if not segments:
+            return split_units(result.get("text", "")), []
+        units, ends = [], []
+        for segment in segments:
+            units += split_units(segment.get("text", ""))
+            ends.append((float(segment.get("end", 0.0)), len(units)))
+        return units, ends
+
+    def _trim(self, segment_ends: list[tuple[float, int]]) -> bool:
+        """Cut the buffer at the last fully committed segment end; False if none."""
+        committed = len(self.agreement.committed)
+        cut = None
+        for end, count in segment_ends:
+            if count <= committed and 0 < end < self.buffer_seconds:
+                cut = (end, count)
+        if cut is None:
+            return False
+        end, count = cut
+        # log-melのホップ境界に切り下げる(バッファ先頭がフレームキャッシュの格子から外れないように)
+        samples = round(end * self.sampling_rate) // self.hop_length * self.hop_length
+        if samples <= 0:
+            return False
+        self._remember("".join(self.agreement.drop(count)))
+        self.offset += samples
+        self.audio = self.audio[samples:]
+        return True
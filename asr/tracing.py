@@ -0,0 +1,140 @@
+"""Per-utterance latency tracing (record → ASR → translate → render).
+
+Stages record spans ``(uid, stage, start, end)`` on ``time.monotonic()``.
+Values that are known before the uid exists (e.g. when the recorder closed
+a segment) or in another thread (when a job was queued) are passed along as
+marks; only the marks of the latest ``MARKED_UIDS_MAX`` uids are kept
+(an older utterance has long been rendered). Tracing is off by default and every call is a cheap no-op until
+``enable()`` is called (``--trace FILE``).
+
+``export(path)`` writes Chrome trace JSON (``*.json``, open in
+chrome://tracing or Perfetto) or one JSON span per line otherwise;
+``summary()`` gives p50/p95/p99 per stage.
+"""
+
+from __future__ import annotations
+
+import json
+import math
+import threading
+import time
+from collections import OrderedDict
+
+MARKED_UIDS_MAX = 256
+
+_lock = threading.Lock()
+_enabled = False
+_spans: list[tuple] = []
+_marks: OrderedDict = OrderedDict()  # uid -> {name: t}, oldest uid first
+
+
+def enable() -> None:
+    global _enabled
+    _enabled = True
+
+
+def enabled() -> bool:
+    return _enabled
+
+
+def now() -> float:
+    return time.monotonic()
+
+
+def mark(uid, name: str, t: float | None = None) -> None:
+    """Remember a timestamp for ``uid`` to close a span later (maybe in another thread)."""
+    if not _enabled or uid is None:
+        return
+    with _lock:
+        marks = _marks.get(uid)
+        if marks is None:
+            marks = _marks[uid] = {}
+            while len(_marks) > MARKED_UIDS_MAX:
+                _marks.popitem(last=False)
+        marks[name] = now() if t is None else t
+
+
+def get_mark(uid, name: str) -> float | None:
+    with _lock:
+        return _marks.get(uid, {}).get(name)
+
+
+def span(uid, stage: str, start: float | None, end: float | None = None, **args) -> None:
+    """Record ``stage`` for ``uid`` from ``start`` to ``end`` (default: now)."""
+    if not _enabled or start is None:
+        return
+    end = now() if end is None else end
+    with _lock:
+        _spans.append((uid, stage, start, end, args))
+
+
+def span_from_mark(uid, stage: str, mark_name: str, end: float | None = None, **args) -> None:
+    if _enabled:
+        span(uid, stage, get_mark(uid, mark_name), end, **args)
+
+
+def spans() -> list[tuple]:
+    with _lock:
+        return list(_spans)
+
+
+def _percentile(sorted_values: list[float], q: float) -> float:
+    # nearest-rank
+    rank = math.ceil(q / 100 * len(sorted_values))
+    return sorted_values[min(max(rank, 1), len(sorted_values)) - 1]
+
+
+def summary() -> dict[str, dict]:
+    """Per-stage count and p50/p95/p99/max in milliseconds (stages in first-seen order)."""
+    durations: dict[str, list[float]] = {}
+    for _, stage, start, end, _ in spans():
+        durations.setdefault(stage, []).append((end - start) * 1000)
+    result = {}
+    for stage, values in durations.items():
+        values.sort()
+        result[stage] = {
+            "count": len(values),
+            "p50": _percentile(values, 50),
+            "p95": _percentile(values, 95),
+            "p99": _percentile(values, 99),
+            "max": values[-1],
+        }
+    return result
+
+
+def print_summary(file=None) -> None:
+    stats = summary()
+    print(f"[trace] {'stage':20} {'n':>5} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}", file=file)
+    for stage, s in stats.items():
+        print(f"[trace] {stage:20} {s['count']:5d} {s['p50']:9.1f} {s['p95']:9.1f} "
+              f"{s['p99']:9.1f} {s['max']:9.1f}", file=file)
+
+
+def export(path: str) -> None:
+    """Write spans as Chrome trace JSON (``.json``) or JSONL (anything else)."""
+    recorded = spans()
+    origin = min((s[2] for s in recorded), default=0.0)
+    with open(path, "w", encoding="utf-8") as f:
+        if path.endswith(".json"):
+            stages = list(dict.fromkeys(s[1] for s in recorded))
+            events = [
+                {"name": "thread_name", "ph": "M", "pid": 1, "tid": i, "args": {"name": stage}}
+                for i, stage in enumerate(stages)
+            ]
+            for uid, stage, start, end, args in recorded:
+                events.append({
+                    "name": f"{stage} uid={uid}",
+                    "cat": stage,
+                    "ph": "X",
+                    "pid": 1,
+                    "tid": stages.index(stage),
+                    "ts": (start - origin) * 1e6,
+                    "dur": (end - start) * 1e6,
+                    "args": {"uid": uid, **args},
+                })
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+        else:
+            for uid, stage, start, end, args in recorded:
+                record = {"uid": uid, "stage": stage, "start": start, "end": end,
+                          "dur_ms": (end - start) * 1000, **args}
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
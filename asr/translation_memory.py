@@ -0,0 +1,160 @@
+"""LRU translation memory in front of any translator.
+
+Meetings repeat the same short phrases ("はい", "そうですね", "OK", product
+names) over and over. ``CachedTranslator`` looks each text up in a
+``TranslationMemory`` keyed by (normalized text, src, tgt, translator id)
+and only sends misses to the wrapped translator. The memory can be saved to
+a JSON file and reloaded in the next session.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+
+_SPACES_RE = re.compile(r"\s+")
+
+# 失敗時に翻訳器が返す文字列はキャッシュしない
+_ERROR_PREFIXES = ("[翻訳エラー", "[未対応の言語ペア")
+
+
+def normalize(text: str) -> str:
+    """NFKC + collapse whitespace, so full/half-width variants share an entry."""
+    return _SPACES_RE.sub(" ", unicodedata.normalize("NFKC", text)).strip()
+
+
+class TranslationMemory:
+    """Bounded LRU map (translator, src, tgt, normalized text) -> translation."""
+
+    VERSION = 1
+
+    def __init__(self, capacity: int = 4096, path: str | None = None):
+        self.capacity = capacity
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[tuple, str] = OrderedDict()
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            self.load(path)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def key(text: str, src: str, tgt: str, translator_id: str) -> tuple:
+        return (translator_id, src, tgt, normalize(text))
+
+    def get(self, text: str, src: str, tgt: str, translator_id: str) -> str | None:
+        key = self.key(text, src, tgt, translator_id)
+        with self._lock:
+            translation = self._entries.get(key)
+            if translation is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return translation
+
+    def put(self, text: str, src: str, tgt: str, translator_id: str, translation: str) -> None:
+        if not translation or translation.startswith(_ERROR_PREFIXES):
+            return
+        key = self.key(text, src, tgt, translator_id)
+        with self._lock:
+            self._entries[key] = translation
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+    def load(self, path: str) -> None:
+        """Load entries saved by ``save`` (oldest first, so LRU order survives)."""
+        try:
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"[TM] 読み込み失敗 ({path}): {e}")
+            return
+        if not isinstance(data, dict) or data.get("version") != self.VERSION:
+            return
+        with self._lock:
+            for translator_id, src, tgt, text, translation in data.get("entries", []):
+                self._entries[(translator_id, src, tgt, text)] = translation
+            while len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+        print(f"[TM] {len(self._entries)}件を読み込みました: {path}")
+
+    def save(self, path: str | None = None) -> None:
+        """Write all entries to ``path`` (atomic replace)."""
+        path = path or self.path
+        if not path:
+            return
+        with self._lock:
+            entries = [list(key) + [translation] for key, translation in self._entries.items()]
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"version": self.VERSION, "entries": entries}, f, ensure_ascii=False)
+        os.replace(tmp, path)
+
+
+class CachedTranslator:
+    """Wrap a translator so repeated texts are answered from a TranslationMemory."""
+
+    def __init__(self, translator, memory: TranslationMemory, translator_id: str):
+        self.translator = translator
+        self.memory = memory
+        self.translator_id = translator_id
+
+    def __getattr__(self, name):
+        return getattr(self.translator, name)
+
+    def translate(self, text: str, source_lang: str, target_lang: str) -> str:
+        return self.translate_batch([text], source_lang, target_lang)[0]
+
+    def translate_batch(self, texts: list, source_lang: str, target_lang: str) -> list:
+        results = [self.memory.get(t, source_lang, target_lang, self.translator_id) for t in texts]
+        # 同じバッチ内の重複はまとめて1回だけ翻訳する。正規化はキーにだけ使い、
+        # モデルには各キーで最初に現れた原文をそのまま渡す(全角・空白を書き換えない)
+        pending: dict[str, str] = {}
+        for text, result in zip(texts, results):
+            if result is None:
+                pending.setdefault(normalize(text), text)
+        if pending:
+            originals = list(pending.values())
+            batch_fn = getattr(self.translator, "translate_batch", None)
+            if batch_fn is not None:
+                translated = batch_fn(originals, source_lang, target_lang)
+            else:
+                translated = [self.translator.translate(t, source_lang, target_lang) for t in originals]
+            fresh = dict(zip(pending, translated))
+            for text, translation in zip(originals, translated):
+                self.memory.put(text, source_lang, target_lang, self.translator_id, translation)
+            results = [fresh[normalize(t)] if r is None else r for t, r in zip(texts, results)]
+        return results
+
+    def translate_stream(self, text: str, source_lang: str, target_lang: str):
+        cached = self.memory.get(text, source_lang, target_lang, self.translator_id)
+        if cached is not None:
+            yield cached
+            return
+        stream_fn = getattr(self.translator, "translate_stream", None)
+        if stream_fn is None:
+            partial = self.translator.translate(text, source_lang, target_lang)
+            yield partial
+        else:
+            partial = ""
+            for partial in stream_fn(text, source_lang, target_lang):
+                yield partial
+        self.memory.put(text, source_lang, target_lang, self.translator_id, partial)
@@ -1,6 +1,9 @@
 import sys
 import time
-from mlx_lm import load, generate
+import mlx_lm
+from mlx_lm import load, generate, stream_generate
+
+_STRIP_TOKENS = ("<end_of_turn>", "<start_of_turn>", "<eos>", "<bos>")
 
 
 class GemmaTranslator:
@@ -13,30 +16,71 @@ class GemmaTranslator:
         self.translate("こんにちは", "ja", "en")
         print(f"[TranslateGemma] warmup完了 ({time.time()-t0:.2f}s)")
 
+    def _prompt(self, text: str, source_lang: str, target_lang: str):
+        messages = [{
+            "role": "user",
+            "content": [{
+                "type": "text",
+                "source_lang_code": source_lang,
+                "target_lang_code": target_lang,
+                "text": text,
+            }],
+        }]
+        return self.tokenizer.apply_chat_template(
+            messages, add_generation_prompt=True
+        )
+
+    @staticmethod
+    def _clean(output: str) -> str:
+        for tok in _STRIP_TOKENS:
+            output = output.replace(tok, "")
+        return output.strip()
+
     def translate(self, text: str, source_lang: str, target_lang: str) -> str:
         try:
-            messages = [{
-                "role": "user",
-                "content": [{
-                    "type": "text",
-                    "source_lang_code": source_lang,
-                    "target_lang_code": target_lang,
-                    "text": text,
-                }],
-            }]
-            prompt = self.tokenizer.apply_chat_template(
-                messages, add_generation_prompt=True
-            )
             output = generate(
                 self.model,
                 self.tokenizer,
-                prompt=prompt,
+                prompt=self._prompt(text, source_lang, target_lang),
                 max_tokens=self.max_tokens,
                 verbose=False,
             )
-            for tok in ("<end_of_turn>", "<start_of_turn>", "<eos>", "<bos>"):
-                output = output.replace(tok, "")
-            return output.strip()
+            return self._clean(output)
         except Exception as e:
             print(f"[TranslateGemma例外]\n{e}", file=sys.stderr)
             return f"[翻訳エラー: {e}]"
+
+    def translate_stream(self, text: str, source_lang: str, target_lang: str):
+        """生成途中の翻訳(先頭からの全文)をトークンごとに返すジェネレータ"""
+        try:
+            output = ""
+            for response in stream_generate(
+                self.model,
+                self.tokenizer,
+                prompt=self._prompt(text, source_lang, target_lang),
+                max_tokens=self.max_tokens,
+            ):
+                output += response.text
+                yield self._clean(output)
+        except Exception as e:
+            print(f"[TranslateGemma例外]\n{e}", file=sys.stderr)
+            yield f"[翻訳エラー: {e}]"
+
+    def translate_batch(self, texts: list, source_lang: str, target_lang: str) -> list:
+        """複数文を mlx_lm.batch_generate でまとめて翻訳する(未対応のmlx_lmでは逐次)"""
+        batch_generate = getattr(mlx_lm, "batch_generate", None)
+        if batch_generate is None or len(texts) == 1:
+            return [self.translate(t, source_lang, target_lang) for t in texts]
+        try:
+            prompts = [self._prompt(t, source_lang, target_lang) for t in texts]
+            response = batch_generate(
+                self.model,
+                self.tokenizer,
+                prompts,
+                max_tokens=self.max_tokens,
+                verbose=False,
+            )
+            return [self._clean(t) for t in response.texts]
+        except Exception as e:
+            print(f"[TranslateGemma例外]\n{e}", file=sys.stderr)
+            return [f"[翻訳エラー: {e}]"] * len(texts)
@@ -1,5 +1,8 @@
+from __future__ import annotations
+
 import sys
 import time
+import warnings
 import torch
 from transformers import MarianMTModel, MarianTokenizer
 
@@ -10,35 +13,188 @@ class OpusTranslator:
         ("en", "ja"): "Helsinki-NLP/opus-mt-en-jap",
     }
 
-    def __init__(self, device: str = "cpu", max_new_tokens: int = 128):
+    def __init__(self, device: str = "cpu", max_new_tokens: int = 128, stream_chunk_tokens: int = 4,
+                 quantize: bool = False):
+        """
+        quantize: CPUでLinear層をint8動的量子化する(fp32より高速・省メモリ、訳はわずかに変わる)
+
+        torchのスレッド数は翻訳を呼ぶスレッド側で設定する(main.py の --mt-threads)
+        """
         self.device = device
         self.max_new_tokens = max_new_tokens
+        self.stream_chunk_tokens = stream_chunk_tokens
+        self.quantize = quantize and device == "cpu"
         self.models = {}
         self.tokenizers = {}
+        self._sessions = {}
         for pair, name in self.PAIRS.items():
             print(f"[OpusMT] ロード中: {name} ({pair[0]}->{pair[1]})")
             tok = MarianTokenizer.from_pretrained(name)
             mdl = MarianMTModel.from_pretrained(name).to(device)
             mdl.eval()
+            if self.quantize:
+                mdl = self._quantize(mdl)
             self.tokenizers[pair] = tok
             self.models[pair] = mdl
-        print("[OpusMT] ロード完了 / warmup中...")
+        mode = "int8" if self.quantize else "fp32"
+        print(f"[OpusMT] ロード完了 ({mode}) / warmup中...")
         t0 = time.time()
         self.translate("こんにちは", "ja", "en")
         self.translate("hello", "en", "ja")
         print(f"[OpusMT] warmup完了 ({time.time()-t0:.2f}s)")
 
+    @staticmethod
+    def _quantize(mdl):
+        with warnings.catch_warnings():
+            # torch.ao.quantization と量子化テンソル生成の非推奨警告だけを抑制(APIは引き続き利用可能)
+            warnings.filterwarnings("ignore", message=r"torch\.ao\.quantization is deprecated",
+                                    category=DeprecationWarning)
+            warnings.filterwarnings("ignore", message=r"torch\.quantize_per_tensor, .* are deprecated",
+                                    category=UserWarning)
+            return torch.ao.quantization.quantize_dynamic(mdl, {torch.nn.Linear}, dtype=torch.qint8)
+
+    def session(self, source_lang: str, target_lang: str) -> "OpusSession":
+        """言語ペアごとの翻訳セッション(直前の入力・エンコーダ出力・訳を保持)"""
+        pair = (source_lang, target_lang)
+        if pair not in self._sessions:
+            self._sessions[pair] = OpusSession(self, pair)
+        return self._sessions[pair]
+
     def translate(self, text: str, source_lang: str, target_lang: str) -> str:
+        if (source_lang, target_lang) not in self.models:
+            return f"[未対応の言語ペア: {source_lang}->{target_lang}]"
+        result = ""
+        for result in self.session(source_lang, target_lang).stream(text, chunk_tokens=self.max_new_tokens):
+            pass
+        return result
+
+    def translate_batch(self, texts: list, source_lang: str, target_lang: str) -> list:
+        """同じ言語ペアの複数文をパディングして1回のgenerateで翻訳する"""
         pair = (source_lang, target_lang)
         if pair not in self.models:
-            return f"[未対応の言語ペア: {source_lang}->{target_lang}]"
+            return [f"[未対応の言語ペア: {source_lang}->{target_lang}]"] * len(texts)
         try:
             tok = self.tokenizers[pair]
             mdl = self.models[pair]
-            inputs = tok(text, return_tensors="pt", truncation=True, max_length=512).to(self.device)
+            inputs = tok(list(texts), return_tensors="pt", padding=True,
+                         truncation=True, max_length=512).to(self.device)
             with torch.no_grad():
                 out = mdl.generate(**inputs, max_new_tokens=self.max_new_tokens, num_beams=1)
-            return tok.decode(out[0], skip_special_tokens=True).strip()
+            return [t.strip() for t in tok.batch_decode(out, skip_special_tokens=True)]
+        except Exception as e:
+            print(f"[OpusMT例外]\n{e}", file=sys.stderr)
+            return [f"[翻訳エラー: {e}]"] * len(texts)
+
+    def translate_stream(self, text: str, source_lang: str, target_lang: str):
+        """翻訳途中の文字列(先頭からの全文)を順に返すジェネレータ
+
+        stream_chunk_tokens トークンずつgreedyでデコードを進める。最後に返す値は
+        translate() の結果と同じ。
+        """
+        if (source_lang, target_lang) not in self.models:
+            yield f"[未対応の言語ペア: {source_lang}->{target_lang}]"
+            return
+        yield from self.session(source_lang, target_lang).stream(text)
+
+
+class OpusSession:
+    """1つの言語ペアについて、伸びていく発話の翻訳で前回の計算を再利用する
+
+    前回と同じ入力なら訳をそのまま返す。入力が前回の続き
+    (トークン列が前回の末尾1トークンを除いて一致)なら、エンコーダは新しい入力で
+    計算し直し(双方向なので全位置が変わる)、前回の訳を教師強制で1回だけ流して
+    greedyの予測と一致する先頭部分をそのまま採用する。続きだけを逐次デコードするので、
+    結果は毎回最初から翻訳した場合と同じになる。
+    """
+
+    def __init__(self, translator: OpusTranslator, pair: tuple):
+        self.translator = translator
+        self.tok = translator.tokenizers[pair]
+        self.mdl = translator.models[pair]
+        self.device = translator.device
+        self._input_ids: list[int] | None = None
+        self._decoder_ids: list[int] = []  # 前回の出力(開始トークン込み、EOSまで)
+        self._result = ""
+        self.reused_tokens = 0  # 統計: 逐次デコードを省略できたトークン数
+
+    def _extends_previous(self, input_ids: list[int]) -> bool:
+        if not self._input_ids or not self._decoder_ids:
+            return False
+        # 末尾はEOS、その直前のトークンは続きによって分割が変わり得るので比較しない
+        head = self._input_ids[:-2]
+        return len(head) > 0 and input_ids[:len(head)] == head
+
+    def _agreeing_prefix(self, encoder_outputs, attention_mask) -> list[int]:
+        """前回の訳のうち、新しい入力でもgreedyが同じトークンを選ぶ先頭部分(+次の1トークン)"""
+        mdl = self.mdl
+        previous = torch.tensor([self._decoder_ids], device=self.device)
+        logits = mdl(
+            encoder_outputs=encoder_outputs,
+            attention_mask=attention_mask,
+            decoder_input_ids=previous[:, :-1],
+        ).logits[0]
+        for bad in getattr(mdl.generation_config, "bad_words_ids", None) or []:
+            if len(bad) == 1:
+                logits[:, bad[0]] = float("-inf")
+        predicted = logits.argmax(dim=-1)
+        agree = int((predicted == previous[0, 1:]).int().cumprod(dim=0).sum())
+        prefix = self._decoder_ids[:1 + agree]
+        if agree < len(predicted):
+            prefix.append(int(predicted[agree]))
+        return prefix
+
+    def stream(self, text: str, chunk_tokens: int | None = None):
+        translator = self.translator
+        chunk_tokens = chunk_tokens or translator.stream_chunk_tokens
+        max_new = translator.max_new_tokens
+        mdl, tok = self.mdl, self.tok
+        eos_id = mdl.config.eos_token_id
+        try:
+            inputs = tok(text, return_tensors="pt", truncation=True, max_length=512).to(self.device)
+            input_ids = inputs["input_ids"][0].tolist()
+            if input_ids == self._input_ids:
+                yield self._result
+                return
+            with torch.no_grad():
+                encoder_outputs = mdl.get_encoder()(**inputs)
+                prefix = [mdl.config.decoder_start_token_id]
+                if self._extends_previous(input_ids):
+                    # 最後の1トークンは generate に任せる(上限到達時のEOS強制を揃えるため)
+                    prefix = self._agreeing_prefix(encoder_outputs, inputs["attention_mask"])[:max_new]
+                    self.reused_tokens += len(prefix) - 1
+                decoder_ids = torch.tensor([prefix], device=self.device)
+                finished = prefix[-1] == eos_id and len(prefix) > 1
+                partial = tok.decode(decoder_ids[0], skip_special_tokens=True).strip()
+                if partial and not finished:
+                    yield partial
+                while not finished and decoder_ids.shape[1] - 1 < max_new:
+                    n_new = min(chunk_tokens, max_new - (decoder_ids.shape[1] - 1))
+                    prev_len = decoder_ids.shape[1]
+                    kwargs = {}
+                    if prev_len - 1 + n_new < max_new:
+                        # 途中のチャンク末尾でEOSを強制されないようにする
+                        kwargs["forced_eos_token_id"] = None
+                    decoder_ids = mdl.generate(
+                        encoder_outputs=encoder_outputs,
+                        attention_mask=inputs["attention_mask"],
+                        decoder_input_ids=decoder_ids,
+                        max_new_tokens=n_new,
+                        num_beams=1,
+                        **kwargs,
+                    )
+                    finished = (decoder_ids.shape[1] - prev_len < n_new
+                                or eos_id in decoder_ids[0, prev_len:].tolist())
+                    partial = tok.decode(decoder_ids[0], skip_special_tokens=True).strip()
+                    if finished:
+                        break
+                    yield partial
+            ids = decoder_ids[0].tolist()
+            if eos_id in ids[1:]:
+                ids = ids[:ids.index(eos_id, 1) + 1]
+            self._input_ids = input_ids
+            self._decoder_ids = ids
+            self._result = partial
+            yield partial
         except Exception as e:
             print(f"[OpusMT例外]\n{e}", file=sys.stderr)
-            return f"[翻訳エラー: {e}]"
+            yield f"[翻訳エラー: {e}]"
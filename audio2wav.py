@@ -1,178 +1,604 @@
-import pyaudio
 import numpy as np
 import threading
-import queue
+import struct
+import sys
 import time
 
-
-class AudioRecorder:
-    def __init__(self, rate=16000, chunk=1024, channels=1, record_seconds=3, device_index=None):
+# pyaudioはライブ録音時のみ必要(ファイル入力・ヘッドレス環境ではimportしない)
+PA_FLOAT32 = 1  # == pyaudio.paFloat32
+PA_CONTINUE = 0  # == pyaudio.paContinue
+PA_INPUT_OVERFLOW = 2  # == pyaudio.paInputOverflow
+FILE_READ_CHUNKS = 16  # ファイル入力で1回に読むチャンク数
+CHUNK = 960  # 録音チャンク(60ms)。Whisperのホップ長160の倍数にしてセグメント先頭をlog-melのフレーム格子に揃える
+
+
+class AudioSegment(np.ndarray):
+    """録音ストリーム上の開始位置(start_sample)と確定時刻(closed_at)を持つ音声セグメント
+
+    closed_at はセグメントを切り出した時刻(time.monotonic())。遅延計測に使う。
+    """
+
+    def __new__(cls, data, start_sample=None):
+        obj = np.asarray(data, dtype=np.float32).view(cls)
+        obj.start_sample = start_sample
+        obj.closed_at = time.monotonic()
+        return obj
+
+    def __array_finalize__(self, obj):
+        # スライス・演算結果は元の位置情報と一致しないため引き継がない
+        self.start_sample = None
+        self.closed_at = None
+
+
+class RingBuffer:
+    """単一プロデューサ/単一コンシューマのfloat32リングバッファ(ロックなし)
+
+    録音側は write だけ、セグメント分割側は consume だけを呼ぶ。位置は録音開始からの
+    通算サンプル数(単調増加)で、配列上の添字は pos % capacity。書き込み側は
+    read_pos を動かさないので、空きが足りないときは新しいデータを捨てて数える。
+    """
+
+    def __init__(self, capacity):
+        self.capacity = int(capacity)
+        self._buf = np.zeros(self.capacity, dtype=np.float32)
+        self.write_pos = 0
+        self.read_pos = 0
+        self.overflow_count = 0   # 空き不足で書き込みを切り詰めた回数
+        self.dropped_samples = 0  # 空き不足で捨てたサンプル数
+        self._data_ready = threading.Event()
+
+    def available(self):
+        return self.write_pos - self.read_pos
+
+    def write(self, data):
+        n = len(data)
+        free = self.capacity - (self.write_pos - self.read_pos)
+        if n > free:
+            self.overflow_count += 1
+            self.dropped_samples += n - free
+            data = data[:free]
+            n = free
+        if n:
+            i = self.write_pos % self.capacity
+            first = min(n, self.capacity - i)
+            self._buf[i:i + first] = data[:first]
+            self._buf[:n - first] = data[first:]
+            self.write_pos += n  # コピー完了後に公開
+        self._data_ready.set()
+        return n
+
+    def wait_until(self, pos, timeout):
+        """write_pos が pos に届くまで最大timeout秒待つ"""
+        deadline = time.monotonic() + timeout
+        while self.write_pos < pos:
+            self._data_ready.clear()
+            if self.write_pos >= pos:
+                break
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not self._data_ready.wait(remaining):
+                return self.write_pos >= pos
+        return True
+
+    def view(self, start, end):
+        """[start, end) を返す。折り返さなければゼロコピーのビュー(consumeまで有効)"""
+        i, j = start % self.capacity, end % self.capacity
+        if end - start <= 0:
+            return self._buf[:0]
+        if i < j or j == 0:
+            return self._buf[i:j or self.capacity]
+        return np.concatenate((self._buf[i:], self._buf[:j]))
+
+    def copy(self, start, end):
+        """[start, end) を1回のコピーで取り出す"""
+        out = np.empty(end - start, dtype=np.float32)
+        i = start % self.capacity
+        first = min(end - start, self.capacity - i)
+        out[:first] = self._buf[i:i + first]
+        out[first:] = self._buf[:end - start - first]
+        return out
+
+    def consume(self, pos):
+        """pos より前のデータを解放する(読み出し側のみ呼ぶ)"""
+        self.read_pos = max(self.read_pos, min(pos, self.write_pos))
+
+    def reset(self):
+        """未読データを捨てる(読み出し側のみ呼ぶ)"""
+        self.read_pos = self.write_pos
+
+
+class CaptureHealth:
+    """録音コールバックの健全性カウンタ(書き込みはコールバックスレッドのみ)"""
+
+    def __init__(self):
+        self.callbacks = 0
+        self.frames = 0
+        self.dropped_frames = 0     # リングに入りきらず捨てたフレーム数
+        self.input_overflows = 0    # PortAudioが報告した入力オーバーフロー回数
+        self.callback_time_total = 0.0
+        self.callback_time_max = 0.0
+        self.input_latency = 0.0    # ADC→コールバック呼び出しの遅延(直近)
+
+    def record(self, frames, dropped, time_info, status, elapsed):
+        self.callbacks += 1
+        self.frames += frames
+        self.dropped_frames += dropped
+        if status & PA_INPUT_OVERFLOW:
+            self.input_overflows += 1
+        self.callback_time_total += elapsed
+        self.callback_time_max = max(self.callback_time_max, elapsed)
+        if time_info:
+            adc = time_info.get("input_buffer_adc_time", 0.0)
+            now = time_info.get("current_time", 0.0)
+            if adc > 0 and now > 0:
+                self.input_latency = now - adc
+
+    def snapshot(self, ring=None):
+        n = max(self.callbacks, 1)
+        stats = {
+            "callbacks": self.callbacks,
+            "frames": self.frames,
+            "dropped_frames": self.dropped_frames,
+            "input_overflows": self.input_overflows,
+            "callback_ms_avg": self.callback_time_total / n * 1000,
+            "callback_ms_max": self.callback_time_max * 1000,
+            "input_latency_ms": self.input_latency * 1000,
+        }
+        if ring is not None:
+            stats["ring_overflows"] = ring.overflow_count
+            stats["ring_fill"] = ring.available() / ring.capacity
+        return stats
+
+
+class FakeInputStream:
+    """サウンドカードなしでコールバック録音を動かすためのPyAudio互換ストリーム
+
+    signal(float32配列)を frames_per_buffer ずつ stream_callback に渡す。
+    realtime=True なら実時間のペースで、Falseなら待たずに流す。signalが尽きたら止まる。
+    使い方: DynamicAudioRecorder(stream_source=FakeInputStream.source(signal))
+    """
+
+    def __init__(self, signal, rate=16000, frames_per_buffer=CHUNK, stream_callback=None,
+                 realtime=True, **_):
+        self.signal = np.asarray(signal, dtype=np.float32)
+        self.rate = rate
+        self.frames_per_buffer = frames_per_buffer
+        self.callback = stream_callback
+        self.realtime = realtime
+        self._stop = threading.Event()
+        self._thread = None
+
+    @classmethod
+    def source(cls, signal, realtime=True):
+        """stream_source に渡す関数を返す"""
+        return lambda **kwargs: cls(signal, realtime=realtime, **kwargs)
+
+    def _run(self):
+        n = self.frames_per_buffer
+        t_start = time.monotonic()
+        for pos in range(0, len(self.signal), n):
+            if self._stop.is_set():
+                return
+            due = t_start + (pos + n) / self.rate
+            if self.realtime:
+                self._stop.wait(max(0.0, due - time.monotonic()))
+            block = self.signal[pos:pos + n]
+            if len(block) < n:
+                block = np.pad(block, (0, n - len(block)))
+            now = time.monotonic()
+            time_info = {"input_buffer_adc_time": due - n / self.rate if self.realtime else now,
+                         "current_time": now, "output_buffer_dac_time": 0.0}
+            self.callback(block.tobytes(), n, time_info, 0)
+        self._stop.set()
+
+    def start_stream(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop_stream(self):
+        self._stop.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+
+    def is_active(self):
+        return not self._stop.is_set()
+
+    def close(self):
+        self.stop_stream()
+
+
+class _RingRecorder:
+    """録音ストリーム→RingBuffer→セグメント分割 の共通部分
+
+    サブクラスは _find_cuts を実装し、スキャンしたブロック内のセグメント境界を返す。
+    """
+
+    def _init_capture(self, rate, chunk, channels, device_index, max_segment_seconds,
+                      stream_source):
         self.rate = rate
         self.chunk = chunk
         self.channels = channels
-        self.record_seconds = record_seconds
-        self.format = pyaudio.paFloat32
-        self.audio_queue = queue.Queue()
+        self.format = PA_FLOAT32
         self.stop_event = threading.Event()
         self.device_index = device_index
-
-    def record_audio(self):
+        # 最長セグメント(+オーバーラップ)の2倍かつ30秒以上を確保
+        self.ring = RingBuffer(rate * max(30.0, 2 * max_segment_seconds))
+        self.chunk_listeners = []
+        self._segments = None
+        self._discard = False
+        # stream_source: pa.open と同じ引数でストリームを返す関数(テスト用のFakeInputStream等)
+        self.stream_source = stream_source
+        self._pa = self._stream = None
+        self.health = CaptureHealth()
+
+    @property
+    def stream_pos(self):
+        return self.ring.write_pos
+
+    def _open_stream(self):
+        kwargs = dict(rate=self.rate,
+                      channels=self.channels,
+                      format=self.format,
+                      input=True,
+                      input_device_index=self.device_index,
+                      frames_per_buffer=self.chunk,
+                      stream_callback=self._on_audio)
+        if self.stream_source is not None:
+            return None, self.stream_source(**kwargs)
+        import pyaudio
         pa = pyaudio.PyAudio()
-        stream = pa.open(rate=self.rate,
-                    channels=self.channels,
-                    format=self.format,
-                    input=True,
-                    input_device_index=self.device_index,
-                    frames_per_buffer=self.chunk)
-
-        while not self.stop_event.is_set():
-            data = stream.read(self.chunk, exception_on_overflow=False)
-            self.audio_queue.put(np.frombuffer(data, dtype=np.float32))
-
-        stream.stop_stream()
-        stream.close()
-        pa.terminate()
+        return pa, pa.open(**kwargs)
+
+    def _on_audio(self, in_data, frame_count, time_info, status):
+        """PyAudioのコールバック(PortAudioのスレッド)。リングに書くだけで返す"""
+        t0 = time.perf_counter()
+        samples = np.frombuffer(in_data, dtype=np.float32)
+        written = self.ring.write(samples)
+        self.health.record(len(samples), len(samples) - written, time_info, status,
+                           time.perf_counter() - t0)
+        return None, PA_CONTINUE
 
     def start_recording(self):
         self.stop_event.clear()
-        self.recording_thread = threading.Thread(target=self.record_audio)
-        self.recording_thread.start()
+        self._pa, self._stream = self._open_stream()
+        self._stream.start_stream()
 
     def stop_recording(self):
         self.stop_event.set()
-        if hasattr(self, "recording_thread"):
-            self.recording_thread.join()
+        self.ring._data_ready.set()  # 待機中のsegments()を起こす
+        if getattr(self, "_stream", None) is not None:
+            self._stream.stop_stream()
+            self._stream.close()
+            self._stream = None
+        if getattr(self, "_pa", None) is not None:
+            self._pa.terminate()
+            self._pa = None
+
+    def capture_health(self):
+        return self.health.snapshot(self.ring)
 
     def change_device(self, device_index):
         self.stop_recording()
         self.device_index = device_index
-        while not self.audio_queue.empty():
-            try:
-                self.audio_queue.get_nowait()
-            except queue.Empty:
-                break
+        self._discard = True  # 読み出し側で未処理データを捨てる
         self.start_recording()
 
+    def _input_ended(self):
+        """録音が止められたか、ストリーム自体が終わった(FakeInputStreamの信号が尽きた等)"""
+        stream = self._stream
+        return self.stop_event.is_set() or (stream is not None and not stream.is_active())
+
+    def _wait_for(self, pos, fill):
+        """ring上でposまで揃うのを待つ。揃わないまま入力が終わればFalse"""
+        while self.ring.write_pos < pos:
+            if fill is not None:
+                if not fill():
+                    return False
+            elif not self.ring.wait_until(pos, timeout=1) and self._input_ended():
+                return False
+        return True
+
+    def segments(self, fill=None):
+        """ringをスキャンしてセグメントを返すジェネレータ
+
+        届いている完全なチャンクをまとめて1ブロックとして判定する(録音が遅れても
+        チャンクごとのPythonループにならない)。
+        fill: ringにデータを追加する関数(ファイル入力用)。Falseを返したら入力終了。
+              Noneならライブ録音として書き込みを待ち、停止されたら終了する。
+        """
+        ring = self.ring
+        seg_start = scan = ring.read_pos
+        self._reset_segmenter()
+
+        while True:
+            if self._discard:
+                self._discard = False
+                ring.reset()
+                seg_start = scan = ring.read_pos
+                self._reset_segmenter()
+
+            if not self._wait_for(scan + self.chunk, fill):
+                end = ring.write_pos
+                if end > scan:
+                    self._notify(scan, ring.view(scan, end))
+                if end > seg_start:
+                    yield AudioSegment(ring.copy(seg_start, end), seg_start)
+                ring.consume(end)
+                return
+
+            end = scan + (ring.write_pos - scan) // self.chunk * self.chunk
+            block = ring.view(scan, end)
+            self._notify(scan, block)
+            cuts = self._find_cuts(block, scan, seg_start)
+            scan = end
+            for start, cut in cuts:
+                yield AudioSegment(ring.copy(start, cut), start)
+                seg_start = self._next_segment_start(start, cut)
+            ring.consume(seg_start)
+
+    def _notify(self, start, chunk):
+        for listener in self.chunk_listeners:
+            listener(start, chunk)
+
+    def _reset_segmenter(self):
+        pass
+
+    def _next_segment_start(self, seg_start, seg_end):
+        return seg_end
+
     def get_audio_chunk(self):
-        required_chunks = int(self.rate / self.chunk * self.record_seconds)
-        audio_data = []
+        if self._segments is None:
+            self._segments = self.segments()
+        segment = next(self._segments, None)
+        if segment is None:
+            self._segments = None
+        return segment
+
 
-        while len(audio_data) < required_chunks:
-            try:
-                audio_data.append(self.audio_queue.get(timeout=1))
-            except queue.Empty:
-                if self.stop_event.is_set():
-                    break
+class AudioRecorder(_RingRecorder):
+    def __init__(self, rate=16000, chunk=CHUNK, channels=1, record_seconds=3, device_index=None,
+                 stream_source=None):
+        self.record_seconds = record_seconds
+        self._init_capture(rate, chunk, channels, device_index, record_seconds, stream_source)
+
+    def _find_cuts(self, block, scan, seg_start):
+        """record_seconds分たまるごとに区切る。(開始, 終了)のリストを返す"""
+        length = int(self.rate / self.chunk * self.record_seconds) * self.chunk
+        end = scan + len(block)
+        cuts = []
+        while seg_start + length <= end:
+            cuts.append((seg_start, seg_start + length))
+            seg_start += length
+        return cuts
+
+
+class EnergyVAD:
+    """フレームエネルギーによる発話検出(適応ノイズフロア+ヒステリシス+ハングオーバー)
+
+    特徴量(RMS、任意でゼロ交差率・スペクトル平坦度)とノイズフロアはブロック単位で
+    ベクトル化して計算し、状態を持つヒステリシス判定だけをフレームごとに行う。
+
+    - ノイズフロア: 直近 noise_window_seconds 秒のフレームエネルギーの最小値
+      (0/Noneなら固定閾値 threshold のみ)
+    - 発話開始: energy > max(threshold, floor * snr_on)
+    - 発話継続: energy > 開始閾値 * snr_off / snr_on (ヒステリシス)
+    - ハングオーバー: 閾値を下回ってから hangover_frames フレームは発話扱いを続ける
+    - zcr_max / flatness_max: 指定すると、ゼロ交差率・スペクトル平坦度がそれを超える
+      フレーム(白色雑音的な音)は発話開始とみなさない
+    """
+
+    def __init__(self, frame=CHUNK, rate=16000, threshold=0.01, snr_on=3.0, snr_off=1.5,
+                 noise_window_seconds=3.0, hangover_frames=0,
+                 zcr_max=None, flatness_max=None):
+        self.frame = frame
+        self.threshold = threshold
+        self.snr_on = snr_on
+        self.snr_off = snr_off
+        self.window = int(noise_window_seconds * rate / frame) if noise_window_seconds else 0
+        self.hangover_frames = hangover_frames
+        self.zcr_max = zcr_max
+        self.flatness_max = flatness_max
+        self.reset()
+
+    def reset(self):
+        # 窓が埋まるまではフロアが threshold / snr_on を超えない(=固定閾値と同じ)
+        self._history = np.full(max(self.window - 1, 0), self.threshold / self.snr_on,
+                                dtype=np.float32)
+        self.in_speech = False   # ヒステリシス判定の状態
+        self.silence_run = max(self.hangover_frames, 1)  # 閾値を下回り続けているフレーム数
+        self.noise_floor = self.threshold / self.snr_on
+
+    def features(self, frames):
+        """(n, frame) のフレーム列から (energy, 発話らしさのマスク) を返す"""
+        energy = np.sqrt(np.einsum("ij,ij->i", frames, frames) / frames.shape[1])
+        voiced = np.ones(len(frames), dtype=bool)
+        if self.zcr_max is not None:
+            crossings = np.count_nonzero(np.diff(np.signbit(frames), axis=1), axis=1)
+            voiced &= crossings / (frames.shape[1] - 1) <= self.zcr_max
+        if self.flatness_max is not None:
+            power = np.abs(np.fft.rfft(frames, axis=1)) ** 2 + 1e-12
+            flatness = np.exp(np.mean(np.log(power), axis=1)) / np.mean(power, axis=1)
+            voiced &= flatness <= self.flatness_max
+        return energy, voiced
+
+    def process(self, block):
+        """blockの各フレームについて (発話中(ハングオーバー込み), 発話を検出したか) を順に返す
+
+        特徴量とノイズフロアはブロック単位で先に計算し、判定はフレームごとに進める
+        ジェネレータなので、途中で呼んだ end_segment() は以降のフレームに効く。
+        """
+        n = len(block) // self.frame
+        if n == 0:
+            return
+        frames = block[:n * self.frame].reshape(n, self.frame)
+        energy, voiced = self.features(frames)
+
+        if self.window:
+            span = np.concatenate((self._history, energy))
+            floor = np.lib.stride_tricks.sliding_window_view(span, self.window).min(axis=1)
+            self._history = span[len(span) - (self.window - 1):] if self.window > 1 else span[:0]
+        else:
+            floor = np.full(n, self.threshold / self.snr_on, dtype=np.float32)
+        self.noise_floor = float(floor[-1])
+        on = np.maximum(self.threshold, floor * self.snr_on)
+        off = on * (self.snr_off / self.snr_on)
+        start = (energy > on) & voiced
+        stay = energy > off
 
-        return np.concatenate(audio_data) if audio_data else None
+        for start_i, stay_i in zip(start.tolist(), stay.tolist()):
+            self.in_speech = stay_i if self.in_speech else start_i
+            self.silence_run = 0 if self.in_speech else self.silence_run + 1
+            yield self.silence_run < max(self.hangover_frames, 1), self.in_speech
 
+    def end_segment(self):
+        """セグメント境界: 前のセグメントの無音継続(ハングオーバー)を持ち越さない"""
+        self.silence_run = 0 if self.in_speech else max(self.hangover_frames, 1)
 
-class DynamicAudioRecorder:
-    """VADベースの動的セグメンテーションをサポートする音声レコーダー"""
 
-    def __init__(self, rate=16000, chunk=1024, channels=1,
+class DynamicAudioRecorder(_RingRecorder):
+    """VADベースの動的セグメンテーションをサポートする音声レコーダー
+
+    発話検出は EnergyVAD。silence_duration がハングオーバー(発話終了とみなすまでの
+    無音時間)になる。noise_window_seconds=0 で従来どおりの固定閾値になる。
+    """
+
+    def __init__(self, rate=16000, chunk=CHUNK, channels=1,
                  silence_threshold=0.01, silence_duration=0.5,
                  min_record_seconds=0.5, max_record_seconds=5.0,
-                 overlap_seconds=0.0, device_index=None):
-        self.rate = rate
-        self.chunk = chunk
-        self.channels = channels
-        self.format = pyaudio.paFloat32
-
+                 overlap_seconds=0.0, device_index=None, stream_source=None,
+                 noise_window_seconds=3.0, snr_on=3.0, snr_off=1.5,
+                 zcr_max=None, flatness_max=None):
         self.silence_threshold = silence_threshold
         self.silence_duration = silence_duration
         self.min_record_seconds = min_record_seconds
         self.max_record_seconds = max_record_seconds
         self.overlap_seconds = overlap_seconds
-
-        self.audio_queue = queue.Queue()
-        self.stop_event = threading.Event()
-        self.overlap_buffer = []
-        self.device_index = device_index
-
-    def _calculate_energy(self, audio_chunk):
-        return np.sqrt(np.mean(audio_chunk ** 2))
-
-    def record_audio(self):
-        pa = pyaudio.PyAudio()
-        stream = pa.open(rate=self.rate,
-                        channels=self.channels,
-                        format=self.format,
-                        input=True,
-                        input_device_index=self.device_index,
-                        frames_per_buffer=self.chunk)
-
-        while not self.stop_event.is_set():
-            data = stream.read(self.chunk, exception_on_overflow=False)
-            chunk_array = np.frombuffer(data, dtype=np.float32)
-            self.audio_queue.put(chunk_array)
-
-        stream.stop_stream()
-        stream.close()
-        pa.terminate()
-
-    def start_recording(self):
-        self.stop_event.clear()
-        self.recording_thread = threading.Thread(target=self.record_audio)
-        self.recording_thread.start()
-
-    def stop_recording(self):
-        self.stop_event.set()
-        if hasattr(self, "recording_thread"):
-            self.recording_thread.join()
-
-    def change_device(self, device_index):
-        self.stop_recording()
-        self.device_index = device_index
-        self.overlap_buffer = []
-        while not self.audio_queue.empty():
-            try:
-                self.audio_queue.get_nowait()
-            except queue.Empty:
+        self._init_capture(rate, chunk, channels, device_index,
+                           max_record_seconds + overlap_seconds, stream_source)
+        chunk_duration = chunk / rate
+        self.vad = EnergyVAD(frame=chunk, rate=rate, threshold=silence_threshold,
+                             snr_on=snr_on, snr_off=snr_off,
+                             noise_window_seconds=noise_window_seconds,
+                             hangover_frames=int(silence_duration / chunk_duration),
+                             zcr_max=zcr_max, flatness_max=flatness_max)
+        self._min_chunks = int(min_record_seconds / chunk_duration)
+        self._max_chunks = int(max_record_seconds / chunk_duration)
+        self._had_speech = False
+
+    def _reset_segmenter(self):
+        self.vad.reset()
+        self._had_speech = False
+
+    def _find_cuts(self, block, scan, seg_start):
+        """発話終了(ハングオーバー切れ)か最大長で区切る。(開始, 終了)のリストを返す"""
+        cuts = []
+        pos = scan
+        for speaking, detected in self.vad.process(block):
+            pos += self.chunk
+            # ハングオーバー中のフレームは発話に数えない(無音だけのセグメントを作らない)
+            self._had_speech |= detected
+            n_chunks = (pos - seg_start) // self.chunk
+            end_of_speech = self._had_speech and not speaking and n_chunks >= self._min_chunks
+            if end_of_speech or n_chunks >= self._max_chunks:
+                cuts.append((seg_start, pos))
+                seg_start = self._next_segment_start(seg_start, pos)
+                self._had_speech = False
+                self.vad.end_segment()
+        return cuts
+
+    def _next_segment_start(self, seg_start, seg_end):
+        # オーバーラップ分はringに残したまま次のセグメントの先頭にする
+        overlap = int(self.overlap_seconds / (self.chunk / self.rate)) * self.chunk
+        if overlap > 0 and seg_end - seg_start > overlap:
+            return seg_end - overlap
+        return seg_end
+
+
+def iter_audio_file(path, chunk=1024, rate=16000):
+    """WAVファイル/生float32 PCM(16kHz)をchunkサンプルずつ返すジェネレータ
+
+    path に "-" を指定すると標準入力から読む。WAVヘッダ(RIFF)があればWAVとして、
+    なければリトルエンディアンのfloat32モノラルPCMとして扱う。ファイル全体は読み込まない。
+    """
+    f = sys.stdin.buffer if path == "-" else open(path, "rb")
+    try:
+        head = f.read(4)
+        if head == b"RIFF":
+            dtype, channels, file_rate = _read_wav_header(f)
+            if file_rate != rate:
+                raise ValueError(f"サンプリングレートが{rate}Hzではありません: {file_rate}Hz "
+                                 f"(ffmpeg -i in.wav -ar {rate} -ac 1 out.wav で変換してください)")
+        else:
+            dtype, channels = np.dtype("<f4"), 1
+
+        frame_bytes = dtype.itemsize * channels
+        pending = b"" if head == b"RIFF" else head
+        while True:
+            data = pending + f.read(chunk * frame_bytes - len(pending))
+            usable = len(data) - len(data) % frame_bytes
+            if usable == 0:
                 break
-        self.start_recording()
-
-    def get_audio_chunk(self):
-        audio_data = list(self.overlap_buffer)
-        self.overlap_buffer = []
-
-        chunk_duration = self.chunk / self.rate
-        silence_chunks_needed = int(self.silence_duration / chunk_duration)
-        min_chunks = int(self.min_record_seconds / chunk_duration)
-        max_chunks = int(self.max_record_seconds / chunk_duration)
-        overlap_chunks = int(self.overlap_seconds / chunk_duration)
-
-        consecutive_silence = 0
-        is_speaking = False
-
-        while len(audio_data) < max_chunks:
-            try:
-                chunk = self.audio_queue.get(timeout=1)
-                audio_data.append(chunk)
-
-                energy = self._calculate_energy(chunk)
+            pending = data[usable:]
+            samples = np.frombuffer(data[:usable], dtype=dtype).reshape(-1, channels)
+            yield _to_float32(samples).mean(axis=1, dtype=np.float32)
+    finally:
+        if f is not sys.stdin.buffer:
+            f.close()
+
+
+def _read_wav_header(f):
+    """"RIFF"の直後からdataチャンク先頭まで読み、(dtype, channels, rate) を返す"""
+    if f.read(8)[4:] != b"WAVE":
+        raise ValueError("WAVファイルではありません")
+    fmt = None
+    while True:
+        header = f.read(8)
+        if len(header) < 8:
+            raise ValueError("WAVのdataチャンクが見つかりません")
+        chunk_id, size = header[:4], struct.unpack("<I", header[4:])[0]
+        if chunk_id == b"fmt ":
+            body = f.read(size + size % 2)
+            tag, channels, rate, _, _, bits = struct.unpack("<HHIIHH", body[:16])
+            if tag == 0xFFFE:  # WAVE_FORMAT_EXTENSIBLE
+                tag = struct.unpack("<H", body[24:26])[0]
+            fmt = (tag, channels, rate, bits)
+        elif chunk_id == b"data":
+            if fmt is None:
+                raise ValueError("WAVのfmtチャンクがありません")
+            tag, channels, rate, bits = fmt
+            dtypes = {(1, 8): "u1", (1, 16): "<i2", (1, 32): "<i4", (3, 32): "<f4", (3, 64): "<f8"}
+            if (tag, bits) not in dtypes:
+                raise ValueError(f"未対応のWAV形式です (format={tag}, bits={bits})")
+            return np.dtype(dtypes[(tag, bits)]), channels, rate
+        else:
+            f.read(size + size % 2)
 
-                if energy > self.silence_threshold:
-                    is_speaking = True
-                    consecutive_silence = 0
-                else:
-                    consecutive_silence += 1
 
-                if is_speaking and consecutive_silence >= silence_chunks_needed:
-                    if len(audio_data) >= min_chunks:
-                        break
+def _to_float32(samples):
+    if samples.dtype == np.uint8:
+        return (samples.astype(np.float32) - 128.0) / 128.0
+    if samples.dtype.kind == "i":
+        return samples.astype(np.float32) / float(np.iinfo(samples.dtype).max + 1)
+    return samples.astype(np.float32)
 
-            except queue.Empty:
-                if self.stop_event.is_set():
-                    break
 
-        if not audio_data:
-            return None
+def iter_file_segments(path, mode="fixed", **kwargs):
+    """ファイル入力をライブ録音と同じセグメント分割ロジックに通すジェネレータ"""
+    if mode == "dynamic":
+        rec = DynamicAudioRecorder(**kwargs)
+    else:
+        rec = AudioRecorder(**kwargs)
+    # まとめて読み込み、VADはブロック単位で処理させる
+    chunks = iter_audio_file(path, chunk=rec.chunk * FILE_READ_CHUNKS, rate=rec.rate)
 
-        if overlap_chunks > 0 and len(audio_data) > overlap_chunks:
-            self.overlap_buffer = audio_data[-overlap_chunks:]
+    def fill():
+        chunk = next(chunks, None)
+        if chunk is None:
+            return False
+        rec.ring.write(chunk)
+        return True
 
-        return np.concatenate(audio_data)
+    return rec.segments(fill)
 
 
 recorder = None
@@ -181,6 +607,7 @@ recorder_mode = "fixed"
 
 def list_input_devices():
     """利用可能な入力デバイス一覧を返す"""
+    import pyaudio
     pa = pyaudio.PyAudio()
     devices = []
     try:
@@ -215,6 +642,28 @@ def switch_device(device_index):
     recorder.change_device(device_index)
 
 
+def add_chunk_listener(listener):
+    """録音チャンクを取り出すたびに listener(start_sample, chunk) を呼ぶ"""
+    if recorder is None:
+        return
+    recorder.chunk_listeners.append(listener)
+
+
+def remove_chunk_listener(listener):
+    """add_chunk_listener で登録した listener を外す(未登録なら何もしない)"""
+    if recorder is None:
+        return
+    # 録音スレッドが走査中のリストは変更せず、差し替える
+    recorder.chunk_listeners = [fn for fn in recorder.chunk_listeners if fn != listener]
+
+
+def capture_health():
+    """録音の健全性(取りこぼし・オーバーフロー・コールバック遅延)を返す"""
+    if recorder is None:
+        return None
+    return recorder.capture_health()
+
+
 def initialize_recorder(mode="fixed", device_index=None, **kwargs):
     global recorder, recorder_mode
     recorder_mode = mode
@@ -223,7 +672,7 @@ def initialize_recorder(mode="fixed", device_index=None, **kwargs):
         if mode == "dynamic":
             recorder = DynamicAudioRecorder(device_index=device_index, **kwargs)
         else:
-            recorder = AudioRecorder(device_index=device_index)
+            recorder = AudioRecorder(device_index=device_index, **kwargs)
         recorder.start_recording()
 
 
@@ -0,0 +1,82 @@
+"""Benchmark: hf backend with and without a draft model (assisted generation).
+
+Splits each input file into utterances with the same dynamic VAD as live
+capture, transcribes every utterance with plain greedy decoding and with
+the draft model proposing tokens, and prints per-utterance latency, the
+measured speed-up, the draft acceptance rate and whether both texts agree
+(greedy verification should give the same text; hotword boosts apply to
+both paths).
+
+    python benchmarks/bench_assisted_whisper.py talk.wav \\
+        --model openai/whisper-large-v3-turbo --draft distil-whisper/distil-large-v3
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from asr.biased_whisper import BiasingWhisperBackend  # noqa: E402
+from benchmarks.common import utterances  # noqa: E402
+
+
+def timed(backend: BiasingWhisperBackend, audio, draft) -> tuple[str, float]:
+    backend.draft = draft
+    t0 = time.perf_counter()
+    text = backend.transcribe(audio)["text"]
+    return text, time.perf_counter() - t0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("files", nargs="+", help="WAV / raw float32 PCM (16 kHz)")
+    parser.add_argument("--model", default="openai/whisper-large-v3-turbo")
+    parser.add_argument("--draft", default="distil-whisper/distil-large-v3")
+    parser.add_argument("--language", default="ja")
+    parser.add_argument("--registry", default="words.json", help="hotword registry (both paths)")
+    args = parser.parse_args()
+
+    segments = utterances(args.files)
+    if not segments:
+        sys.exit("no utterances found")
+
+    # One backend, timed with and without its draft attached (the main model is loaded once)
+    backend = BiasingWhisperBackend(args.model, args.language, registry_path=args.registry,
+                                    draft_model=args.draft)
+    backend.load()
+    draft = backend.draft
+    if draft is None:
+        sys.exit(f"draft model {args.draft} cannot assist {args.model}")
+    for attached in (None, draft):
+        backend.draft = attached
+        backend.warmup()
+    backend.assist_stats.clear()
+
+    print(f"{'#':>3} {'sec':>5} {'plain ms':>9} {'assist ms':>9} {'speedup':>7} {'tok/fwd':>7} "
+          f"{'accept':>6} {'same':>4}  text")
+    speedups, acceptances, same = [], [], 0
+    for i, audio in enumerate(segments):
+        text_plain, t_plain = timed(backend, audio, None)
+        text_assisted, t_assisted = timed(backend, audio, draft)
+        stats = backend.assist_stats[-1]
+        speedups.append(t_plain / t_assisted)
+        acceptances.append(stats["acceptance"])
+        same += text_plain == text_assisted
+        print(f"{i:3d} {len(audio) / 16000:5.1f} {t_plain * 1000:9.0f} {t_assisted * 1000:9.0f} "
+              f"{speedups[-1]:6.2f}x {stats['tokens_per_forward']:7.2f} {stats['acceptance']:6.0%} "
+              f"{'yes' if text_plain == text_assisted else 'NO':>4}  {text_assisted}")
+        if text_plain != text_assisted:
+            print(f"{'':>51}  plain: {text_plain}")
+
+    print(f"utterances={len(segments)} speedup median={statistics.median(speedups):.2f}x "
+          f"mean={statistics.mean(speedups):.2f}x acceptance mean={statistics.mean(acceptances):.0%} "
+          f"same text={same}/{len(segments)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""Benchmark: OpusTranslator fp32 vs. int8 dynamic quantization on CPU.
+
+Translates a fixed ja↔en sentence set with both paths and reports per
+sentence latency and corpus BLEU against reference translations, plus the
+BLEU of int8 output measured against fp32 output (how much quantization
+changes the translations).
+
+    python benchmarks/bench_opus_quantization.py --threads 2
+"""
+
+from __future__ import annotations
+
+import argparse
+import math
+import os
+import statistics
+import sys
+import time
+from collections import Counter
+
+import torch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from asr.translator_opus import OpusTranslator  # noqa: E402
+
+# (source, reference) per direction
+SENTENCES = {
+    ("ja", "en"): [
+        ("こんにちは。", "Hello."),
+        ("今日はいい天気ですね。", "It's nice weather today."),
+        ("会議は十時に始まります。", "The meeting starts at ten."),
+        ("資料を共有してもらえますか？", "Could you share the materials?"),
+        ("来週までに見積もりを送ります。", "I will send the estimate by next week."),
+        ("その件については後で確認します。", "I will check on that later."),
+        ("音声が少し途切れています。", "The audio is cutting out a little."),
+        ("ありがとうございました。", "Thank you very much."),
+    ],
+    ("en", "ja"): [
+        ("Hello.", "こんにちは。"),
+        ("Thank you very much.", "どうもありがとうございます。"),
+        ("The meeting starts at ten.", "会議は十時に始まります。"),
+        ("Can you hear me?", "聞こえますか？"),
+        ("Let's take a short break.", "少し休憩しましょう。"),
+        ("I will send the report tomorrow.", "明日報告書を送ります。"),
+        ("Please share your screen.", "画面を共有してください。"),
+        ("See you next week.", "また来週。"),
+    ],
+}
+
+
+def _tokens(text: str, lang: str) -> list[str]:
+    # 日本語は文字単位、英語は空白区切りで評価する
+    if lang == "ja":
+        return [c for c in text if not c.isspace()]
+    return text.lower().split()
+
+
+def corpus_bleu(hypotheses: list[str], references: list[str], lang: str) -> float:
+    """Corpus BLEU-4 (uniform weights, brevity penalty, +1 smoothing for n>1)."""
+    matches = [0] * 4
+    totals = [0] * 4
+    hyp_len = ref_len = 0
+    for hyp, ref in zip(hypotheses, references):
+        h, r = _tokens(hyp, lang), _tokens(ref, lang)
+        hyp_len += len(h)
+        ref_len += len(r)
+        for n in range(1, 5):
+            h_ngrams = Counter(tuple(h[i:i + n]) for i in range(len(h) - n + 1))
+            r_ngrams = Counter(tuple(r[i:i + n]) for i in range(len(r) - n + 1))
+            matches[n - 1] += sum((h_ngrams & r_ngrams).values())
+            totals[n - 1] += max(len(h) - n + 1, 0)
+    if hyp_len == 0 or matches[0] == 0:
+        return 0.0
+    log_precision = sum(
+        math.log((matches[n] + (n > 0)) / (totals[n] + (n > 0))) for n in range(4)
+    ) / 4
+    brevity = min(0.0, 1 - ref_len / hyp_len)
+    return 100 * math.exp(log_precision + brevity)
+
+
+def run(translator: OpusTranslator, repeats: int):
+    outputs = {}
+    latencies = {}
+    for pair, items in SENTENCES.items():
+        outputs[pair] = [translator.translate(src, *pair) for src, _ in items]
+        times = []
+        for _ in range(repeats):
+            for src, _ in items:
+                t0 = time.perf_counter()
+                translator.translate(src, *pair)
+                times.append(time.perf_counter() - t0)
+        latencies[pair] = times
+    return outputs, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--threads", type=int, default=None, help="intra-op threads for both paths")
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+    if args.threads:
+        torch.set_num_threads(args.threads)
+
+    results = {}
+    for mode, quantize in (("fp32", False), ("int8", True)):
+        translator = OpusTranslator(quantize=quantize)
+        results[mode] = run(translator, args.repeats)
+        del translator
+
+    # BLEU: 参照訳に対するBLEU / ΔBLEU: fp32との差 / vs fp32: fp32出力を参照にしたBLEU
+    print(f"{'pair':8} {'mode':5} {'p50 ms':>8} {'mean ms':>8} {'BLEU':>6} {'ΔBLEU':>6} {'vs fp32':>8}")
+    for pair, items in SENTENCES.items():
+        refs = [ref for _, ref in items]
+        fp32_out = results["fp32"][0][pair]
+        base = corpus_bleu(fp32_out, refs, pair[1])
+        for mode, (outputs, latencies) in results.items():
+            times = latencies[pair]
+            bleu = corpus_bleu(outputs[pair], refs, pair[1])
+            agreement = corpus_bleu(outputs[pair], fp32_out, pair[1])
+            print(f"{pair[0]}->{pair[1]:4} {mode:5} {statistics.median(times) * 1000:8.1f} "
+                  f"{statistics.mean(times) * 1000:8.1f} {bleu:6.1f} {bleu - base:+6.1f} {agreement:8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""Benchmark: hf backend, full 30 s encoder window vs. short windows.
+
+Splits each input file into utterances with the same dynamic VAD as live
+capture and transcribes every utterance with the full window and with
+short windows (segment + PAD seconds, rounded up to whole seconds). For
+each setting it reports median / mean latency, the speed-up over the full
+window, how many texts match the full-window text exactly and the
+character error rate against it (the full window is what Whisper was
+trained on, so it serves as the reference). ``--refs`` adds CER against
+reference transcripts (one line per utterance, in order).
+
+``--sweep`` times the encoder alone for window lengths 1..30 s instead.
+
+    python benchmarks/bench_short_window.py talk.wav --pads 0.5 1 2
+    python benchmarks/bench_short_window.py --sweep --model openai/whisper-small
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+import torch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from asr.biased_whisper import BiasingWhisperBackend, encode_window  # noqa: E402
+from benchmarks.common import cer, utterances  # noqa: E402
+
+
+def transcribe_all(backend: BiasingWhisperBackend, segments: list) -> tuple[list[str], list[float]]:
+    texts, times = [], []
+    for audio in segments:
+        t0 = time.perf_counter()
+        texts.append(backend.transcribe(audio)["text"])
+        times.append(time.perf_counter() - t0)
+    return texts, times
+
+
+def sweep(backend: BiasingWhisperBackend, repeats: int) -> None:
+    encoder = backend.model.get_encoder()
+    fe = backend.processor.feature_extractor
+    features = backend._input_features([np.zeros(fe.n_samples, dtype=np.float32)])
+    features = features.to(backend.device, dtype=backend.dtype)
+    frames_per_second = fe.sampling_rate // fe.hop_length
+    print(f"{'window s':>8} {'encoder ms':>10}")
+    for seconds in list(range(1, 11)) + [15, 20, 30]:
+        window = features[..., : seconds * frames_per_second]
+        with torch.no_grad():
+            encode_window(encoder, window)
+            times = []
+            for _ in range(repeats):
+                t0 = time.perf_counter()
+                encode_window(encoder, window)
+                times.append(time.perf_counter() - t0)
+        print(f"{seconds:8d} {statistics.median(times) * 1000:10.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("files", nargs="*", help="WAV / raw float32 PCM (16 kHz)")
+    parser.add_argument("--model", default="openai/whisper-large-v3-turbo")
+    parser.add_argument("--language", default="ja")
+    parser.add_argument("--registry", default="words.json", help="hotword registry (all settings)")
+    parser.add_argument("--pads", type=float, nargs="+", default=[0.5, 1.0, 2.0],
+                        help="seconds of padding kept after the segment")
+    parser.add_argument("--refs", default=None, help="reference transcripts, one line per utterance")
+    parser.add_argument("--sweep", action="store_true", help="time the encoder per window length")
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    backend = BiasingWhisperBackend(args.model, args.language, registry_path=args.registry)
+    backend.load()
+    backend.warmup()
+    if args.sweep:
+        sweep(backend, args.repeats)
+        return
+
+    segments = utterances(args.files)
+    if not segments:
+        sys.exit("no utterances found")
+    refs = None
+    if args.refs:
+        with open(args.refs, encoding="utf-8") as f:
+            refs = [line.strip() for line in f][: len(segments)]
+
+    results = {}
+    for pad in [None] + args.pads:
+        backend.short_window_pad = pad
+        backend.warmup()
+        results["full" if pad is None else f"+{pad:g}s"] = transcribe_all(backend, segments)
+
+    full_texts, full_times = results["full"]
+    print(f"utterances={len(segments)} "
+          f"mean length={statistics.mean(len(s) for s in segments) / 16000:.1f}s")
+    print(f"{'window':8} {'p50 ms':>8} {'mean ms':>8} {'speedup':>7} {'same':>7} {'CER/full':>8}"
+          + (f" {'CER/ref':>8}" if refs else ""))
+    for name, (texts, times) in results.items():
+        same = sum(a == b for a, b in zip(texts, full_texts))
+        line = (f"{name:8} {statistics.median(times) * 1000:8.1f} {statistics.mean(times) * 1000:8.1f} "
+                f"{sum(full_times) / sum(times):6.2f}x {same:3d}/{len(texts):<3d} "
+                f"{cer(texts, full_texts):8.2%}")
+        if refs:
+            line += f" {cer(texts[: len(refs)], refs):8.2%}"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""Benchmark: rolling-buffer streaming (``--stream``) vs. VAD-closed segments.
+
+Replays each input file on a simulated clock: audio arrives in real time
+and a decode starts when both its audio and the previous decode are done,
+so a model slower than real time falls behind as it would live.
+
+For VAD segments every word of a segment is shown when the segment's decode
+finishes; its lag is measured from the segment midpoint. For streaming, a
+unit (word, or character for Japanese) is heard at most one step before the
+decode whose hypothesis first covers it; the report gives the lag until it
+is first shown (tentative) and until it is committed. Both are estimates
+without word timestamps, good for comparing settings on the same audio.
+It also prints decodes, decode time, real-time factor and the CER of the
+streamed transcript against the VAD transcript.
+
+    python benchmarks/bench_streaming.py talk.wav --backend hf --steps 0.5 1 2
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import audio2wav  # noqa: E402
+from asr import plugins  # noqa: E402
+from asr.streaming import StreamingTranscriber  # noqa: E402
+from benchmarks.common import cer  # noqa: E402
+
+SR = 16000
+
+
+def percentile(values: list[float], q: float) -> float:
+    return float(np.percentile(values, q)) if values else float("nan")
+
+
+def run_vad(backend, path: str) -> dict:
+    clock = 0.0
+    lags, times, texts = [], [], []
+    for segment in audio2wav.iter_file_segments(path, mode="dynamic"):
+        start = segment.start_sample / SR
+        end = start + len(segment) / SR
+        t0 = time.perf_counter()
+        texts.append(backend.transcribe(segment)["text"].strip())
+        times.append(time.perf_counter() - t0)
+        clock = max(clock, end) + times[-1]
+        lags.append(clock - (start + end) / 2)
+    return {"shown": lags, "final": lags, "times": times, "text": "".join(texts)}
+
+
+def run_stream(backend, audio: np.ndarray, step: float, buffer: float) -> dict:
+    streamer = StreamingTranscriber(backend, trim_seconds=buffer)
+    n = int(step * SR)
+    clock = 0.0
+    seen: list[tuple[float, float]] = []  # (heard, shown) per unit of the current hypothesis
+    committed = 0
+    shown, final, times, units = [], [], [], []
+
+    def account(result, heard_at):
+        nonlocal committed
+        start, committed = committed, committed + len(result.committed)
+        covered = committed + len(result.tentative)
+        del seen[covered:]  # 内容が変わった未確定部分は表示し直し扱い
+        while len(seen) < covered:
+            seen.append((heard_at, clock))
+        for heard, first in seen[start:committed]:
+            shown.append(first - heard)
+            final.append(clock - heard)
+        units.extend(result.committed)
+
+    for i in range(0, len(audio), n):
+        chunk = audio[i:i + n]
+        t_audio = (i + len(chunk)) / SR
+        t0 = time.perf_counter()
+        result = streamer.push(chunk)
+        times.append(time.perf_counter() - t0)
+        clock = max(clock, t_audio) + times[-1]
+        account(result, t_audio - len(chunk) / SR / 2)
+    account(streamer.finish(), len(audio) / SR)
+    return {"shown": shown, "final": final, "times": times, "text": "".join(units)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("files", nargs="+", help="WAV / raw float32 PCM (16 kHz)")
+    parser.add_argument("--backend", choices=list(plugins.BACKENDS), default="hf")
+    parser.add_argument("--model", default="openai/whisper-large-v3-turbo")
+    parser.add_argument("--language", default="ja")
+    parser.add_argument("--steps", type=float, nargs="+", default=[1.0], help="streaming chunk lengths (s)")
+    parser.add_argument("--buffer", type=float, default=10.0, help="trim the buffer past this length (s)")
+    args = parser.parse_args()
+
+    backend = plugins.load_backend(args.backend)(model_name=args.model, language=args.language)
+    backend.load()
+    backend.warmup()
+
+    runs = {"vad": [run_vad(backend, path) for path in args.files]}
+    if hasattr(backend, "timestamps"):
+        backend.timestamps = True
+    audios = [np.concatenate(list(audio2wav.iter_audio_file(path, chunk=SR, rate=SR))) for path in args.files]
+    for step in args.steps:
+        runs[f"stream {step:g}s"] = [run_stream(backend, audio, step, args.buffer) for audio in audios]
+
+    duration = sum(len(a) for a in audios) / SR
+    print(f"files={len(args.files)} audio={duration:.1f}s backend={args.backend} model={args.model}")
+    print(f"{'mode':12} {'decodes':>7} {'p50 ms':>7} {'RTF':>5} {'shown p50/p95 s':>16} "
+          f"{'final p50/p95 s':>16} {'CER/vad':>7}")
+    vad_text = " ".join(run["text"] for run in runs["vad"])
+    for name, file_runs in runs.items():
+        shown = [x for run in file_runs for x in run["shown"]]
+        final = [x for run in file_runs for x in run["final"]]
+        times = [x for run in file_runs for x in run["times"]]
+        text = " ".join(run["text"] for run in file_runs)
+        print(f"{name:12} {len(times):7d} {statistics.median(times) * 1000:7.0f} {sum(times) / duration:5.2f} "
+              f"{percentile(shown, 50):7.2f}/{percentile(shown, 95):<8.2f} "
+              f"{percentile(final, 50):7.2f}/{percentile(final, 95):<8.2f} {cer([text], [vad_text]):7.2%}")
+
+
+if __name__ == "__main__":
+    main()
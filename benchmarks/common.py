@@ -0,0 +1,93 @@
+"""Helpers shared by the benchmark scripts: VAD-split utterances, CER and
+synthetic hotword registries (tokenizer, words, PrefixTree)."""
+
+from __future__ import annotations
+
+import random
+
+import audio2wav
+from asr.biasing import BiasWord, PrefixTree
+
+VOCAB = 51866  # Whisper large-v3 の語彙数
+_KATAKANA = "アイウエオカキクケコサシスセソタチツテトナニヌネノハヒフヘホマミムメモヤユヨラリルレロワン"
+
+
+def utterances(paths: list[str]) -> list:
+    """Split files into utterances with the same dynamic VAD as live capture."""
+    segments = []
+    for path in paths:
+        segments.extend(audio2wav.iter_file_segments(path, mode="dynamic"))
+    return segments
+
+
+def edit_distance(a: str, b: str) -> int:
+    row = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        prev, row[0] = row[0], i
+        for j, cb in enumerate(b, 1):
+            prev, row[j] = row[j], min(row[j] + 1, row[j - 1] + 1, prev + (ca != cb))
+    return row[-1]
+
+
+def cer(hypotheses: list[str], references: list[str]) -> float:
+    """Character error rate over the corpus (whitespace ignored)."""
+    errors = chars = 0
+    for hyp, ref in zip(hypotheses, references):
+        hyp, ref = "".join(hyp.split()), "".join(ref.split())
+        errors += edit_distance(hyp, ref)
+        chars += len(ref)
+    return errors / max(chars, 1)
+
+
+class SyntheticTokenizer:
+    """Deterministic tokenizer over a synthetic piece vocabulary.
+
+    ``encode`` maps a word to 1-4 pseudo-random ids (stable per text);
+    ``decode`` returns the piece of each id: Latin pieces with a leading
+    space start words, katakana pieces continue them.
+    """
+
+    name_or_path = "synthetic"
+
+    def __init__(self, vocab: int = VOCAB, seed: int = 0):
+        self.vocab = vocab
+        rng = random.Random(seed)
+        self.pieces = []
+        for i in range(vocab):
+            if i % 3 == 0:
+                self.pieces.append(" " + "".join(rng.choice("ABCDEFGHKLMNPRSTabcdeiou") for _ in range(rng.randint(1, 4))))
+            else:
+                self.pieces.append("".join(rng.choice(_KATAKANA) for _ in range(rng.randint(1, 3))))
+        self.eos_token_id = vocab - 1
+
+    def encode(self, text: str) -> list[int]:
+        rng = random.Random(text)
+        return [rng.randrange(self.vocab - 1) for _ in range(rng.randint(1, 4))]
+
+    def decode(self, ids, skip_special_tokens: bool = False) -> str:
+        return "".join(self.pieces[i] for i in ids)
+
+    def convert_ids_to_tokens(self, ids):
+        return [self.pieces[i] for i in ids]
+
+
+def make_words(n: int, seed: int = 0) -> list[BiasWord]:
+    rng = random.Random(seed)
+    words = []
+    for i in range(n):
+        if i % 2:
+            word = "".join(rng.choice(_KATAKANA) for _ in range(rng.randint(2, 6))) + str(i)
+        else:
+            word = f"Word{i}"
+        words.append(BiasWord(word, boost=rng.choice([1.5, 2.0, 2.5, 3.0])))
+    return words
+
+
+def make_tree(n_words: int, vocab: int = VOCAB,
+              seed: int = 0) -> tuple[PrefixTree, SyntheticTokenizer, list[list[int]]]:
+    """A PrefixTree of ``n_words`` synthetic words, its tokenizer and the words' token ids."""
+    tok = SyntheticTokenizer(vocab)
+    words = make_words(n_words, seed)
+    tree = PrefixTree()
+    tree.build(words, tok)
+    return tree, tok, [tok.encode(w.word) for w in words]
@@ -0,0 +1,188 @@
+"""Offline evaluation of DynamicAudioRecorder segmentation on WAV files.
+
+Runs each file through the same ring buffer / VAD path as live capture and
+prints the segment boundaries. When speech labels are available it also
+reports the latency from each end of speech to the emission of the segment
+that contains it, and how many cuts fell inside speech.
+
+Labels are read from ``<wav>.txt`` next to the WAV (Audacity label export:
+``start<TAB>end[<TAB>label]`` in seconds). ``--synthetic`` generates a
+signal with known labels whose background noise steps up half way, which
+a fixed threshold cannot handle.
+
+    python benchmarks/eval_vad.py --synthetic
+    python benchmarks/eval_vad.py talk.wav --silence-duration 0.4 --json
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import wave
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import audio2wav  # noqa: E402
+
+RATE = 16000
+
+CONFIGS = {
+    # 従来どおりの固定閾値(ノイズフロア追跡・ヒステリシスなし)
+    "fixed": {"noise_window_seconds": 0, "snr_off": 3.0},
+    "adaptive": {},
+}
+
+
+def make_synthetic(path: str, seconds: float = 24.0, seed: int = 0):
+    """Speech-like bursts over noise that gets 15x louder half way through."""
+    rng = np.random.default_rng(seed)
+    n = int(seconds * RATE)
+    t = np.arange(n) / RATE
+    noise_level = np.where(t < seconds / 2, 0.002, 0.03)
+    signal = rng.standard_normal(n) * noise_level
+
+    labels = []
+    start = 1.0
+    while start + 1.5 < seconds:
+        length = rng.uniform(0.8, 1.6)
+        i, j = int(start * RATE), int((start + length) * RATE)
+        tt = t[i:j] - start
+        f0 = rng.uniform(110, 220)
+        voiced = sum(np.sin(2 * np.pi * f0 * k * tt) / k for k in range(1, 6))
+        syllables = 0.5 * (1 - np.cos(2 * np.pi * 4 * tt)) ** 0.5  # 4Hz音節包絡
+        signal[i:j] += 0.15 * voiced * syllables
+        labels.append((start, start + length))
+        start += length + rng.uniform(0.8, 1.4)
+
+    pcm = (np.clip(signal, -1, 1) * 32767).astype("<i2")
+    with wave.open(path, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(RATE)
+        w.writeframes(pcm.tobytes())
+    return labels
+
+
+def read_labels(wav_path: str):
+    path = os.path.splitext(wav_path)[0] + ".txt"
+    if not os.path.exists(path):
+        return None
+    labels = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            fields = line.split("\t")
+            if len(fields) >= 2 and not line.startswith("\\"):
+                labels.append((float(fields[0]), float(fields[1])))
+    return labels
+
+
+def evaluate(path: str, labels, recorder_kwargs: dict):
+    t0 = time.perf_counter()
+    segments = [
+        (seg.start_sample / RATE, (seg.start_sample + len(seg)) / RATE)
+        for seg in audio2wav.iter_file_segments(path, mode="dynamic", **recorder_kwargs)
+    ]
+    elapsed = time.perf_counter() - t0
+    duration = segments[-1][1] if segments else 0.0
+    chunk = audio2wav.CHUNK / RATE
+    max_len = int(recorder_kwargs.get("max_record_seconds", 5.0) / chunk) * chunk
+
+    rows = []
+    for start, end in segments:
+        forced = end - start >= max_len - 1e-6
+        rows.append({"start": round(start, 3), "end": round(end, 3), "forced": forced})
+
+    report = {
+        "file": path,
+        "segments": rows,
+        "n_segments": len(rows),
+        "forced_cuts": sum(r["forced"] for r in rows),
+        "realtime_factor": elapsed / duration if duration else 0.0,
+    }
+    if labels is not None:
+        # 発話終了 → その発話を含むセグメントが確定するまでの遅延(ファイルの時間軸)
+        ends = [e for _, e in segments]
+        latencies = []
+        for _, speech_end in labels:
+            emitted = next((e for e in ends if e >= speech_end), None)
+            if emitted is not None:
+                latencies.append(emitted - speech_end)
+        inside = sum(any(s < e < t for s, t in labels) for e in ends[:-1])
+        report.update({
+            "latency_mean": float(np.mean(latencies)) if latencies else None,
+            "latency_p95": float(np.percentile(latencies, 95)) if latencies else None,
+            "latency_max": float(np.max(latencies)) if latencies else None,
+            "cuts_inside_speech": inside,
+        })
+    return report
+
+
+def print_report(name: str, report: dict):
+    print(f"== {report['file']} [{name}]")
+    for r in report["segments"]:
+        flag = "  (max)" if r["forced"] else ""
+        print(f"  {r['start']:8.3f} - {r['end']:8.3f}s{flag}")
+    line = (f"  segments={report['n_segments']} forced={report['forced_cuts']} "
+            f"rtf={report['realtime_factor']:.4f}")
+    if report.get("latency_mean") is not None:
+        line += (f" end-of-speech→emit mean={report['latency_mean'] * 1000:.0f}ms "
+                 f"p95={report['latency_p95'] * 1000:.0f}ms max={report['latency_max'] * 1000:.0f}ms "
+                 f"cuts_inside_speech={report['cuts_inside_speech']}")
+    print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("files", nargs="*", help="16kHz WAV files")
+    parser.add_argument("--synthetic", action="store_true", help="evaluate a generated signal with known labels")
+    parser.add_argument("--config", choices=list(CONFIGS), action="append",
+                        help="recorder configuration(s) to run (default: all)")
+    parser.add_argument("--silence-threshold", type=float, default=0.01)
+    parser.add_argument("--silence-duration", type=float, default=0.5)
+    parser.add_argument("--min-record", type=float, default=0.5)
+    parser.add_argument("--max-record", type=float, default=5.0)
+    parser.add_argument("--overlap", type=float, default=0.0)
+    parser.add_argument("--zcr-max", type=float, default=None)
+    parser.add_argument("--flatness-max", type=float, default=None)
+    parser.add_argument("--json", action="store_true", help="print one JSON report per line")
+    args = parser.parse_args()
+
+    inputs = [(path, read_labels(path)) for path in args.files]
+    tmp = None
+    if args.synthetic:
+        tmp = tempfile.NamedTemporaryFile(suffix=".wav", delete=False)
+        tmp.close()
+        inputs.append((tmp.name, make_synthetic(tmp.name)))
+    if not inputs:
+        parser.error("WAVファイルか --synthetic を指定してください")
+
+    base = {
+        "silence_threshold": args.silence_threshold,
+        "silence_duration": args.silence_duration,
+        "min_record_seconds": args.min_record,
+        "max_record_seconds": args.max_record,
+        "overlap_seconds": args.overlap,
+        "zcr_max": args.zcr_max,
+        "flatness_max": args.flatness_max,
+    }
+    try:
+        for path, labels in inputs:
+            for name in args.config or list(CONFIGS):
+                report = evaluate(path, labels, {**base, **CONFIGS[name]})
+                if args.json:
+                    print(json.dumps({"config": name, **report}, ensure_ascii=False))
+                else:
+                    print_report(name, report)
+    finally:
+        if tmp is not None:
+            os.unlink(tmp.name)
+
+
+if __name__ == "__main__":
+    main()
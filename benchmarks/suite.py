@@ -0,0 +1,510 @@
+"""Benchmark suite: synthetic micro-benchmarks plus tiny-model runs on CPU.
+
+Every input is generated on the fly from a fixed seed: word registries of
+10 / 1k / 10k entries, synthetic token streams (random tokens with hotword
+spans and beam reordering) and fixed sentence corpora. Pure-Python
+components (PrefixTree, SentenceAccumulator, TranslationMemory) need no
+model; HotwordLogitsProcessor and extract_low_confidence_words need torch /
+transformers but run on synthetic logits. ``--models`` adds the
+translators and the hf Whisper backend with small checkpoints
+(downloaded on first use).
+
+The report is JSON (``--save``); ``--compare`` prints the ratio of every
+case against a saved baseline and exits with 1 when one got slower than
+``--threshold``.
+
+    python benchmarks/suite.py --save baseline.json
+    python benchmarks/suite.py --compare baseline.json
+    python benchmarks/suite.py --filter prefix_tree --quick
+    python benchmarks/suite.py --models --whisper-model openai/whisper-tiny
+    python benchmarks/suite.py --models --opus-model ./tiny-marian --filter translator
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import dataclass, field
+from typing import Callable
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+from asr.biasing import BiasWord, PrefixTree  # noqa: E402
+from benchmarks.common import VOCAB, SyntheticTokenizer, make_tree, make_words  # noqa: E402
+
+REPORT_VERSION = 1
+SIZES = (10, 1000, 10000)
+
+# 固定の文セット(翻訳・文結合・翻訳メモリ用)
+CORPUS = {
+    ("ja", "en"): [
+        "こんにちは。",
+        "今日はいい天気ですね。",
+        "会議は十時に始まります。",
+        "資料を共有してもらえますか？",
+        "来週までに見積もりを送ります。",
+        "その件については後で確認します。",
+        "音声が少し途切れています。",
+        "ありがとうございました。",
+    ],
+    ("en", "ja"): [
+        "Hello.",
+        "Thank you very much.",
+        "The meeting starts at ten.",
+        "Can you hear me?",
+        "Let's take a short break.",
+        "I will send the report tomorrow.",
+        "Please share your screen.",
+        "See you next week.",
+    ],
+}
+
+
+@dataclass
+class Case:
+    name: str
+    setup: Callable[[], Callable[[], object]]  # returns the timed function
+    params: dict = field(default_factory=dict)
+    needs: tuple[str, ...] = ()  # importable modules required
+    model: bool = False          # only with --models
+
+
+CASES: list[Case] = []
+
+
+def case(name: str, needs: tuple[str, ...] = (), model: bool = False, **params):
+    def register(setup):
+        CASES.append(Case(name, lambda: setup(**params), params, needs, model))
+        return setup
+    return register
+
+
+# --- synthetic inputs ------------------------------------------------------
+
+def make_token_stream(length: int, hot: list[list[int]], vocab: int = VOCAB, seed: int = 0) -> list[int]:
+    """Random tokens with a hotword span inserted ~30% of the time."""
+    rng = random.Random(seed)
+    out: list[int] = []
+    while len(out) < length:
+        if hot and rng.random() < 0.3:
+            out.extend(rng.choice(hot))
+        else:
+            out.append(rng.randrange(vocab))
+    return out[:length]
+
+
+# --- cases -----------------------------------------------------------------
+
+for _n in SIZES:
+    @case(f"prefix_tree.build[{_n}]", n_words=_n)
+    def _prefix_tree_build(n_words):
+        tok = SyntheticTokenizer()
+        words = make_words(n_words)
+
+        def run():
+            PrefixTree().build(words, tok)
+        return run
+
+    @case(f"prefix_tree.edit[{_n}]", n_words=_n)
+    def _prefix_tree_edit(n_words):
+        """One registry edit (add + remove a word) and the next lookup."""
+        tree, tok, _ = make_tree(n_words)
+        word = BiasWord("Edited", boost=2.0)
+
+        def run():
+            tree.insert(word, tok)
+            tree.walk(tok.encode(word.word))
+            tree.remove(word.word)
+            tree.walk(tok.encode(word.word))
+        return run
+
+    @case(f"prefix_tree.walk[{_n}]", n_words=_n, tokens=2000)
+    def _prefix_tree_walk(n_words, tokens):
+        tree, _, hot = make_tree(n_words)
+        stream = make_token_stream(tokens, hot)
+
+        def run():
+            state = tree.ROOT
+            for tid in stream:
+                state = tree.step(state, tid)
+                tree.state_boosts(state)
+        return run
+
+    @case(f"registry.edit_sync[{_n}]", n_words=_n)
+    def _registry_edit_sync(n_words):
+        """One dictionary-UI edit on disk and the backend picking it up."""
+        from asr.biasing import WordRegistry
+
+        path = os.path.join(tempfile.mkdtemp(prefix="asrivia-bench-"), "words.json")
+        WordRegistry(make_words(n_words)).save(path)
+        writer, reader = WordRegistry.load(path), WordRegistry.load(path)
+
+        def run():
+            writer.update_boost("Word0", 2.5)
+            reader.sync()
+        return run
+
+    @case(f"hotword_processor.decode[{_n}]", needs=("torch", "transformers"),
+          n_words=_n, beams=5, steps=100)
+    def _hotword_processor(n_words, beams, steps):
+        import torch
+        from asr.biasing import HotwordLogitsProcessor
+        from bench_hotword_processor import make_stream
+
+        tree, _, hot = make_tree(n_words)
+        stream = make_stream(steps, beams, VOCAB, hot, seed=0)
+        scores = torch.zeros(beams, VOCAB)
+
+        def run():
+            processor = HotwordLogitsProcessor(tree)
+            for input_ids in stream:
+                scores.zero_()
+                processor(input_ids, scores)
+        return run
+
+
+@case("oov.extract[200]", needs=("torch", "transformers"), tokens=200)
+def _oov_extract(tokens):
+    from asr.biased_whisper import TokenPieces, extract_low_confidence_words
+
+    tok = SyntheticTokenizer()
+    pieces = TokenPieces(tok)  # the backend keeps one table for its lifetime
+    rng = random.Random(0)
+    ids = [rng.randrange(tok.vocab - 1) for _ in range(tokens)]
+    log_probs = [rng.uniform(-6.0, 0.0) for _ in range(tokens)]
+
+    def run():
+        extract_low_confidence_words(ids, log_probs, tok, pieces=pieces)
+    return run
+
+
+@case("oov.log_prob_hook[4x200]", needs=("torch", "transformers"), batch=4, steps=200)
+def _oov_log_prob_hook(batch, steps):
+    """Per-step cost of recording chosen-token log-probs during generate()."""
+    import torch
+    from asr.biased_whisper import ChosenTokenLogProbs
+
+    gen = torch.Generator().manual_seed(0)
+    scores = [torch.randn(batch, VOCAB, generator=gen) for _ in range(steps)]
+    sequences = torch.randint(0, VOCAB, (batch, steps + 1), generator=gen)
+
+    def run():
+        recorder = ChosenTokenLogProbs()
+        for step, step_scores in enumerate(scores):
+            recorder(sequences[:, : step + 1], step_scores)
+        recorder.result(sequences)
+    return run
+
+
+@case("sentences.push", segments=400)
+def _sentences_push(segments):
+    from asr.sentences import SentenceAccumulator
+
+    # 文の途中で切れたセグメントを模擬する
+    text = "".join(CORPUS[("ja", "en")]) * (segments // 8 + 1)
+    rng = random.Random(0)
+    cuts = sorted(rng.sample(range(1, len(text)), segments - 1))
+    pieces = [text[a:b] for a, b in zip([0] + cuts, cuts + [len(text)])]
+
+    def run():
+        acc = SentenceAccumulator(max_wait=1.5)
+        for uid, piece in enumerate(pieces):
+            acc.push(uid, piece, "ja", "en", now=float(uid))
+        acc.flush()
+    return run
+
+
+@case("streaming.local_agreement", steps=400)
+def _local_agreement(steps):
+    from asr.streaming import LocalAgreement, split_units
+
+    # チャンクごとに伸びる仮説(末尾は毎回揺れる)と、確定分を捨てるバッファの切り詰めを模擬する
+    text = "".join(CORPUS[("ja", "en")]) * (steps // 8 + 1)
+    rng = random.Random(0)
+    ends = []
+    for _ in range(steps):
+        ends.append(min(len(text), (ends[-1] if ends else 0) + rng.randint(2, 6)))
+    tails = [rng.choice(["", "えー", "あの", "ね"]) for _ in range(steps)]
+
+    def run():
+        agreement = LocalAgreement()
+        start = 0
+        for end, tail in zip(ends, tails):
+            agreement.insert(split_units(text[start:end] + tail))
+            if len(agreement.committed) > 40:
+                start += len("".join(agreement.drop(20)))
+    return run
+
+
+@case("translation_memory.lookup", lookups=2000, capacity=4096)
+def _translation_memory(lookups, capacity):
+    from asr.translation_memory import TranslationMemory
+
+    memory = TranslationMemory(capacity=capacity)
+    texts = [s for items in CORPUS.values() for s in items]
+    for i in range(capacity):
+        memory.put(f"{texts[i % len(texts)]} {i}", "ja", "en", "bench", f"t{i}")
+    rng = random.Random(0)
+    queries = [f"{texts[i % len(texts)]} {i}" for i in (rng.randrange(capacity * 2) for _ in range(lookups))]
+
+    def run():
+        for q in queries:
+            memory.get(q, "ja", "en", "bench")
+    return run
+
+
+def _translator_case(make_translator, batch: bool):
+    translator = make_translator()
+    jobs = list(CORPUS.items())
+    sessions = getattr(translator, "_sessions", None)  # OpusMTの言語ペアごとのセッション
+
+    def run():
+        for pair, texts in jobs:
+            if batch:
+                translator.translate_batch(texts, *pair)
+            else:
+                for text in texts:
+                    if sessions is not None:
+                        # 前回の入力・訳の再利用を避け、毎回新しいセッションで最初から翻訳する
+                        sessions.clear()
+                    translator.translate(text, *pair)
+    return run
+
+
+def _opus(args):
+    def make(quantize: bool):
+        from asr.translator_opus import OpusTranslator
+        cls = OpusTranslator
+        if args.opus_model:
+            # 小さいMarianチェックポイントで両方向を代用する(速度の比較用、OpusTranslator自体は書き換えない)
+            pairs = {pair: args.opus_model for pair in OpusTranslator.PAIRS}
+            cls = type("BenchOpusTranslator", (OpusTranslator,), {"PAIRS": pairs})
+        return cls(quantize=quantize)  # スレッド数は run_suite で設定済み
+    return make
+
+
+def register_model_cases(args):
+    opus = _opus(args)
+    for mode, quantize in (("fp32", False), ("int8", True)):
+        for batch in (False, True):
+            kind = "batch" if batch else "sequential"
+            case(f"translator.opus-{mode}.{kind}", needs=("torch", "transformers", "sentencepiece"),
+                 model=True, make_translator=lambda q=quantize: opus(q), batch=batch)(_translator_case)
+    if args.gemma:
+        def make_gemma():
+            from asr.translator_gemma import GemmaTranslator
+            return GemmaTranslator()
+        case("translator.gemma.sequential", needs=("mlx_lm",), model=True,
+             make_translator=make_gemma, batch=False)(_translator_case)
+
+    for n_words in SIZES:
+        case(f"whisper_hf.transcribe[{n_words}]", needs=("torch", "transformers"), model=True,
+             model_name=args.whisper_model, n_words=n_words)(_whisper_case)
+
+
+def _whisper_case(model_name, n_words):
+    import numpy as np
+    from asr.biased_whisper import BiasingWhisperBackend
+    from asr.biasing import WordRegistry
+
+    tmp = tempfile.mkdtemp(prefix="asrivia-bench-")
+    path = os.path.join(tmp, "words.json")
+    WordRegistry(make_words(n_words)).save(path)
+    backend = BiasingWhisperBackend(model_name=model_name, language="ja", registry_path=path)
+    backend.load()
+    rng = np.random.default_rng(0)
+    t = np.arange(3 * 16000) / 16000
+    audio = (0.1 * np.sin(2 * np.pi * 220 * t) + 0.01 * rng.standard_normal(len(t))).astype(np.float32)
+
+    def run():
+        backend.transcribe(audio)
+    return run
+
+
+# --- runner ----------------------------------------------------------------
+
+def _available(modules: tuple[str, ...]) -> str | None:
+    import importlib.util
+    for module in modules:
+        if importlib.util.find_spec(module) is None:
+            return module
+    return None
+
+
+def measure(fn: Callable[[], object], repeats: int, min_time: float) -> dict:
+    """Time ``fn``: calibrate the loop count so one repeat takes >= min_time."""
+    fn()  # warmup
+    number = 1
+    while True:
+        t0 = time.perf_counter()
+        for _ in range(number):
+            fn()
+        elapsed = time.perf_counter() - t0
+        if elapsed >= min_time or number >= 1 << 20:
+            break
+        number *= 2 if elapsed <= 0 else max(2, min(10, int(min_time / elapsed * 1.2) + 1))
+    times = [elapsed / number]
+    for _ in range(repeats - 1):
+        t0 = time.perf_counter()
+        for _ in range(number):
+            fn()
+        times.append((time.perf_counter() - t0) / number)
+    ms = sorted(t * 1000 for t in times)
+    return {
+        "median_ms": statistics.median(ms),
+        "min_ms": ms[0],
+        "mean_ms": statistics.mean(ms),
+        "stdev_ms": statistics.stdev(ms) if len(ms) > 1 else 0.0,
+        "repeats": len(ms),
+        "number": number,
+    }
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BENCH_DIR,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment() -> dict:
+    env = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "commit": _git_commit(),
+    }
+    try:
+        import torch
+        env["torch"] = torch.__version__
+        env["torch_threads"] = torch.get_num_threads()
+    except ImportError:
+        pass
+    return env
+
+
+def run_suite(args) -> dict:
+    if args.threads:
+        try:
+            import torch
+            torch.set_num_threads(args.threads)
+        except ImportError:
+            pass
+    repeats, min_time = (3, 0.02) if args.quick else (args.repeats, args.min_time)
+    results = {}
+    skipped = {}
+    for c in CASES:
+        if args.filter and not any(f in c.name for f in args.filter):
+            continue
+        if c.model and not args.models:
+            continue
+        missing = _available(c.needs)
+        if missing:
+            skipped[c.name] = f"{missing} not installed"
+            print(f"[bench] skip {c.name}: {skipped[c.name]}", file=sys.stderr)
+            continue
+        try:
+            fn = c.setup()
+            stats = measure(fn, repeats, min_time)
+        except Exception as e:  # モデルの取得失敗などはそのケースだけ飛ばす
+            skipped[c.name] = f"{type(e).__name__}: {e}"
+            print(f"[bench] skip {c.name}: {skipped[c.name]}", file=sys.stderr)
+            continue
+        params = {k: v for k, v in c.params.items() if isinstance(v, (int, float, str, bool))}
+        results[c.name] = {**stats, "params": params}
+        print(f"[bench] {c.name:40} {stats['median_ms']:10.3f} ms  "
+              f"(±{stats['stdev_ms']:.3f}, n={stats['repeats']}x{stats['number']})", file=sys.stderr)
+    return {
+        "version": REPORT_VERSION,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "environment": environment(),
+        "results": results,
+        "skipped": skipped,
+    }
+
+
+def compare(report: dict, baseline: dict, threshold: float, filters: list[str] | None = None) -> list[str]:
+    """Print current/baseline ratios; return the names that regressed."""
+    base = {
+        name: stats for name, stats in baseline.get("results", {}).items()
+        if not filters or any(f in name for f in filters)
+    }
+    regressions = []
+    print(f"{'case':40} {'base ms':>10} {'now ms':>10} {'ratio':>7}")
+    for name, stats in report["results"].items():
+        if name not in base:
+            print(f"{name:40} {'-':>10} {stats['median_ms']:10.3f} {'new':>7}")
+            continue
+        old, new = base[name]["median_ms"], stats["median_ms"]
+        ratio = new / old if old > 0 else float("inf")
+        flag = ""
+        if ratio > 1 + threshold:
+            flag = "  SLOWER"
+            regressions.append(name)
+        elif ratio < 1 - threshold:
+            flag = "  faster"
+        print(f"{name:40} {old:10.3f} {new:10.3f} {ratio:7.2f}{flag}")
+    for name in base:
+        if name not in report["results"]:
+            print(f"{name:40} {base[name]['median_ms']:10.3f} {'-':>10} {'gone':>7}")
+    if baseline.get("environment", {}).get("platform") != report["environment"].get("platform"):
+        print("note: baseline was recorded on a different platform")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--save", metavar="FILE", help="write the JSON report to FILE")
+    parser.add_argument("--compare", metavar="FILE", help="compare against a saved report")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="relative slowdown counted as a regression in --compare (default 0.10)")
+    parser.add_argument("--filter", action="append", help="only run cases whose name contains this (repeatable)")
+    parser.add_argument("--list", action="store_true", help="list the cases and exit")
+    parser.add_argument("--quick", action="store_true", help="fewer repeats / shorter timing (smoke run)")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--min-time", type=float, default=0.2, help="minimum seconds per repeat")
+    parser.add_argument("--threads", type=int, default=None, help="torch intra-op threads")
+    parser.add_argument("--models", action="store_true", help="also run translator / Whisper cases with real models")
+    parser.add_argument("--whisper-model", default="openai/whisper-tiny")
+    parser.add_argument("--opus-model", default=None,
+                        help="Marian checkpoint used for both Opus directions instead of Helsinki-NLP/opus-mt-*")
+    parser.add_argument("--gemma", action="store_true", help="include GemmaTranslator (Apple Silicon only)")
+    args = parser.parse_args()
+
+    if args.models:
+        register_model_cases(args)
+    if args.list:
+        for c in CASES:
+            print(c.name + ("  (--models)" if c.model else ""))
+        return
+
+    report = run_suite(args)
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+            f.write("\n")
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if compare(report, baseline, args.threshold, args.filter):
+            sys.exit(1)
+    elif not args.save:
+        json.dump(report, sys.stdout, indent=2, ensure_ascii=False)
+        print()
+
+
+if __name__ == "__main__":
+    main()
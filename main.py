@@ -1,15 +1,15 @@
-import mlx_whisper
 import time
-import audio2wav
 import threading
 import queue
 import tkinter as tk
 import argparse
 import sys
 import os
+import json
+import contextlib
 
-from asr.translator_gemma import GemmaTranslator
-from asr.translator_opus import OpusTranslator
+# バックエンド・翻訳器・録音モジュールは選択されたものだけを遅延import
+from asr import plugins, tracing
 
 def detect_translation_direction(lang):
     if lang == "ja":
@@ -21,145 +21,536 @@ def detect_translation_direction(lang):
 
 # mainブランチ準拠: record_audio_thread構造そのままコピー
 def record_audio_thread(audio_q):
+    import audio2wav
+    lost = (0, 0)
     try:
         while True:
             frame = audio2wav.record_audio()
+            # 取りこぼし・オーバーフローが増えたときだけ録音の健全性を表示
+            health = audio2wav.capture_health()
+            if health and (health["dropped_frames"], health["input_overflows"]) != lost:
+                lost = (health["dropped_frames"], health["input_overflows"])
+                print(f"[capture] dropped={health['dropped_frames']} overflows={health['input_overflows']} "
+                      f"callback avg={health['callback_ms_avg']:.2f}ms max={health['callback_ms_max']:.2f}ms "
+                      f"latency={health['input_latency_ms']:.1f}ms")
             if frame is None:
                 continue
             audio_q.put(frame)
     except Exception as e:
         print(f"[録音エラー]\n{e}", file=sys.stderr)
 
-TRANSLATE_QUEUE_MAX = 2  # バックプレッシャー: 溢れたら古いジョブを破棄して最新優先
+TRANSLATE_QUEUE_MAX = 8  # バックプレッシャー: 溢れたら古いジョブを破棄して最新優先(ワーカーはまとめて翻訳する)
+OFFLINE_AUDIO_QUEUE_MAX = 4  # --input: 認識待ちセグメントの上限(ファイル長によらずメモリ一定)
+ASR_BATCH_MAX = 4  # hfバックエンド: audio_qに溜まったフレームを最大この数までまとめて認識
+TRANSLATE_BATCH_MAX = 8  # 翻訳キューに溜まったジョブを最大この数までまとめて翻訳
+
+def create_translator(args):
+    """--translator の翻訳器を作り、--tm-size > 0 なら翻訳メモリ(LRU)をかぶせる"""
+    kwargs = {}
+    translator_id = args.translator
+    if args.translator == "opus":
+        kwargs = {"quantize": args.mt_quantize}
+        if args.mt_quantize:
+            translator_id = "opus-int8"  # 量子化すると訳がわずかに変わるので別エントリにする
+    translator = plugins.load_translator(args.translator)(**kwargs)
+    if args.tm_size > 0:
+        from asr.translation_memory import CachedTranslator, TranslationMemory
+        memory = TranslationMemory(capacity=args.tm_size, path=args.tm_file)
+        translator = CachedTranslator(translator, memory, translator_id=translator_id)
+    return translator
+
+
+def set_torch_threads(num_threads):
+    """呼び出したスレッドのtorch intra-opスレッド数を設定する(Noneなら既定のまま)
+
+    OpenMPビルドのtorchではスレッドごとの設定なので、ASRスレッドと翻訳スレッドが
+    それぞれ開始時に1回ずつ呼べば、互いのスレッド数を変えずにコアを分け合える。
+    """
+    if num_threads is None:
+        return
+    try:
+        import torch
+    except ImportError:
+        return
+    torch.set_num_threads(num_threads)
+
+
+def close_translator(translator):
+    """翻訳メモリの統計を表示し、--tm-file があれば保存する"""
+    memory = getattr(translator, "memory", None)
+    if memory is None:
+        return
+    stats = memory.stats()
+    print(f"[TM] hits={stats['hits']} misses={stats['misses']} hit_rate={stats['hit_rate']:.1%} entries={stats['entries']}")
+    memory.save()
+
+
+def put_translate_job(translate_q, job, translate_queue_max):
+    """翻訳キューへ投入。上限(None以外)を超えていたら古いジョブから破棄する"""
+    while translate_queue_max is not None and translate_q.qsize() >= translate_queue_max:
+        try:
+            dropped = translate_q.get_nowait()
+            translate_q.task_done()
+            print(f"[backpressure] 翻訳ジョブ破棄 uid={dropped[0]}")
+        except queue.Empty:
+            break
+    tracing.mark(job[0], "translate_enqueued")
+    translate_q.put(job)
+
 
-def translate_worker_thread(translate_q, result_q, translator):
+def sentence_thread(sentence_q, translate_q, max_wait, translate_queue_max=TRANSLATE_QUEUE_MAX):
+    """ASR→翻訳の間で文単位にまとめ直すスレッド
+
+    sentence_q には transcribe_audio_thread が翻訳ジョブ (uid, text, src, tgt) を入れる。
+    文末(。？！ . ? !)までたまったものだけを translate_q へ流し、文末が来ないまま
+    max_wait 秒たった断片はそのまま流す。None を受け取ったら残りを流して None を渡す。
+    """
+    from asr.sentences import SentenceAccumulator
+    acc = SentenceAccumulator(max_wait=max_wait)
     while True:
-        item = translate_q.get()
+        try:
+            item = sentence_q.get(timeout=acc.timeout())
+        except queue.Empty:
+            item = ()  # 待ち時間切れ
         if item is None:
-            translate_q.task_done()
+            jobs = acc.flush()
+        elif item:
+            jobs = acc.push(*item)
+        else:
+            jobs = acc.due()
+        for job in jobs:
+            tracing.span_from_mark(job[0], "sentence_wait", "text_ready")
+            put_translate_job(translate_q, job, translate_queue_max)
+        if item is None:
+            translate_q.put(None)
+            sentence_q.task_done()
             break
-        uid, text, src, tgt = item
-        t0 = time.time()
-        translated = translator.translate(text, src, tgt)
-        translate_q.task_done()
-        print(f"[timing] translate uid={uid} dt={time.time()-t0:.2f}s tqlen={translate_q.qsize()}")
-        result_q.put(("translation", uid, translated))
+        if item:
+            sentence_q.task_done()
+
+
+def translate_worker_thread(translate_q, result_q, translator, stream=False, num_threads=None):
+    """翻訳スレッド。溜まっているジョブを言語ペアごとにまとめて1回で翻訳する
+
+    stream=True なら、単独のジョブは translate_stream で翻訳し、途中経過を
+    ("translation_partial", uid, text) として流す(溜まっているときはまとめて翻訳を優先)。
+    num_threads: このスレッドで使うtorchのスレッド数(--mt-threads)
+    """
+    set_torch_threads(num_threads)
+    batch_fn = getattr(translator, "translate_batch", None)
+    stream_fn = getattr(translator, "translate_stream", None) if stream else None
+    stop = False
+    while not stop:
+        jobs = [translate_q.get()]
+        while len(jobs) < TRANSLATE_BATCH_MAX:
+            try:
+                jobs.append(translate_q.get_nowait())
+            except queue.Empty:
+                break
+        t_dequeued = tracing.now()
+        for job in jobs:
+            if job is not None:
+                tracing.span_from_mark(job[0], "translate_q", "translate_enqueued", t_dequeued)
+        if None in jobs:
+            stop = True
+            n_sentinels = jobs.count(None)
+            jobs = [job for job in jobs if job is not None]
+            for _ in range(n_sentinels):
+                translate_q.task_done()
+
+        # (src, tgt)ごとにグループ化(到着順は保つ)
+        groups = {}
+        for job in jobs:
+            groups.setdefault((job[2], job[3]), []).append(job)
+
+        for (src, tgt), group in groups.items():
+            t0 = time.time()
+            t_start = tracing.now()
+            texts = [text for _, text, _, _ in group]
+            if stream_fn is not None and len(jobs) == 1:
+                uid = group[0][0]
+                translated = ""
+                for partial in stream_fn(texts[0], src, tgt):
+                    if partial != translated:
+                        if not translated:
+                            print(f"[timing] translate_first uid={uid} dt={time.time()-t0:.2f}s")
+                            tracing.span(uid, "translate_first", t_start)
+                        translated = partial
+                        result_q.put(("translation_partial", uid, partial))
+                translations = [translated]
+            elif batch_fn is not None:
+                translations = batch_fn(texts, src, tgt)
+            else:
+                translations = [translator.translate(text, src, tgt) for text in texts]
+            dt = time.time() - t0
+            t_end = tracing.now()
+            for (uid, _, _, _), translated in zip(group, translations):
+                tracing.span(uid, "translate", t_start, t_end, batch=len(group))
+                tracing.mark(uid, "translation_put")
+                translate_q.task_done()
+                print(f"[timing] translate uid={uid} dt={dt:.2f}s batch={len(group)} tqlen={translate_q.qsize()}")
+                result_q.put(("translation", uid, translated))
+
+
+def asr_backend_kwargs(args):
+    """コマンドライン引数からバックエンド固有の追加引数を組み立てる"""
+    backend_kwargs = {}
+    hf_options = {"draft_model": args.asr_draft_model, "short_window_pad": args.asr_short_window}
+    for key, value in hf_options.items():
+        if value is None:
+            continue
+        if args.backend == "hf":
+            backend_kwargs[key] = value
+        else:
+            option = "--asr-draft-model" if key == "draft_model" else "--asr-short-window"
+            print(f"[警告] {option} は hf バックエンドのみ対応です(無視します)", file=sys.stderr)
+    return backend_kwargs
 
 
 # mainブランチ準拠: transcribe_audio_thread構造を統一、backend対応のみ追加
-def transcribe_audio_thread(audio_q, result_q, lang_mode, enable_translate, backend, model_name, oov_queue=None, translate_q=None):
+def transcribe_audio_thread(audio_q, result_q, lang_mode, enable_translate, backend, model_name, oov_queue=None, translate_q=None, translate_queue_max=TRANSLATE_QUEUE_MAX, backend_kwargs=None, num_threads=None):
     """
-    音声認識スレッド。バックエンドに応じて処理を切り替える。
-    backend: 'mlx', 'openai', 'stable-ts', または 'hf'
+    音声認識スレッド。バックエンドはasr.backends.ASRBackendとして共通に扱う。
+    backend: 'mlx', 'openai', 'stable-ts', または 'hf'（plugins.BACKENDSのキー）
     model_name: 使用するモデル名
+    translate_queue_max: 翻訳キューの上限(Noneなら破棄しない)
+    backend_kwargs: バックエンド固有の追加引数(例: hf の draft_model)
+    num_threads: このスレッドで使うtorchのスレッド数(--asr-threads)
     """
-    if backend == "mlx":
-        print(f"[MLX] モデル: {model_name}")
-    elif backend == "openai":
-        import whisper
-        print(f"[PyTorch Whisper] モデルをロード中: {model_name}")
-        asr_model = whisper.load_model(model_name)
-        print("[PyTorch Whisper] モデルのロードが完了しました")
-    elif backend == "stable-ts":
-        import stable_whisper
-        print(f"[Stable-TS] モデルをロード中: {model_name}")
-        asr_model = stable_whisper.load_model(model_name)
-        print("[Stable-TS] モデルのロードが完了しました")
-    elif backend == "hf":
-        from asr.biased_whisper import BiasingWhisperBackend
-        asr_model = BiasingWhisperBackend(
-            model_name=model_name,
-            language=lang_mode,
-            registry_path="words.json",
-        )
-    else:
-        raise ValueError(f"未対応のバックエンド: {backend}")
+    import audio2wav
+    set_torch_threads(num_threads)
+    asr_model = plugins.load_backend(backend)(model_name=model_name, language=lang_mode, **(backend_kwargs or {}))
+    asr_model.load()
+    asr_model.warmup()
+    if hasattr(asr_model, "frontend"):
+        # 録音チャンクが届くたびにlog-melを先行計算(オーバーラップ部分は再計算しない)
+        audio2wav.add_chunk_listener(asr_model.frontend.push)
 
     utterance_id = 0
 
     while True:
+        frames = []
+        stop = False
         try:
             frame = audio_q.get()
             if frame is None:
                 audio_q.task_done()
                 break
-
-            audio_sec = len(frame) / 16000.0 if hasattr(frame, "__len__") else 0.0
+            frames.append(frame)
+            t_dequeued = [tracing.now()]
+
+            # 認識が遅れてキューに溜まった分はまとめて1回のgenerateで処理する
+            if asr_model.batched:
+                while len(frames) < ASR_BATCH_MAX:
+                    try:
+                        frame = audio_q.get_nowait()
+                    except queue.Empty:
+                        break
+                    if frame is None:
+                        audio_q.task_done()
+                        stop = True
+                        break
+                    frames.append(frame)
+                    t_dequeued.append(tracing.now())
+
+            audio_sec = sum(len(f) for f in frames if hasattr(f, "__len__")) / 16000.0
             t_asr_start = time.time()
+            t_trace_asr = tracing.now()
 
-            # mainブランチ準拠: backend分岐のみ差分
-            if backend == "mlx":
-                if lang_mode == "auto":
-                    result = mlx_whisper.transcribe(frame, path_or_hf_repo=model_name)
-                else:
-                    result = mlx_whisper.transcribe(frame, path_or_hf_repo=model_name, language=lang_mode)
-            elif backend == "openai":
-                if lang_mode == "auto":
-                    result = asr_model.transcribe(frame)
-                else:
-                    result = asr_model.transcribe(frame, language=lang_mode)
-            elif backend == "stable-ts":
-                # stable-ts: VAD有効化、condition_on_previous_text=False でハルシネーション軽減
-                transcribe_options = {
-                    "vad": "silero",
-                    "condition_on_previous_text": False,
-                    "word_timestamps": False,
-                    "verbose": False,
-                }
-                if lang_mode != "auto":
-                    transcribe_options["language"] = lang_mode
-                stable_result = asr_model.transcribe(frame, **transcribe_options)
-                # stable-ts の結果を Whisper 互換形式に変換
-                result = {
-                    "text": stable_result.text if hasattr(stable_result, 'text') else str(stable_result),
-                    "language": stable_result.language if hasattr(stable_result, 'language') else lang_mode,
-                }
-            elif backend == "hf":
-                result = asr_model.transcribe(frame)
-                # OOV候補をoov_queueに送信
-                if hasattr(asr_model, 'oov_candidates') and asr_model.oov_candidates:
-                    if oov_queue is not None:
-                        oov_queue.put(list(asr_model.oov_candidates))
-            
-            text = result.get("text", "").strip()
-            detected_lang = result.get("language", lang_mode)
-            audio_q.task_done()
+            # OOV候補の解析は辞書ウィンドウが購読している間だけ行う
+            if oov_queue is not None and hasattr(asr_model, "collect_oov"):
+                asr_model.collect_oov = getattr(oov_queue, "active", True)
+
+            results = asr_model.transcribe_batch(frames)
+            # OOV候補をoov_queueに送信
+            if getattr(asr_model, "oov_candidates", None) and oov_queue is not None:
+                oov_queue.put(list(asr_model.oov_candidates))
+
+            for _ in frames:
+                audio_q.task_done()
             asr_sec = time.time() - t_asr_start
+            t_trace_asr_end = tracing.now()
+            batch, frames = frames, []
+            if len(batch) > 1:
+                print(f"[timing] asr batch={len(batch)} audio={audio_sec:.2f}s asr={asr_sec:.2f}s aqlen={audio_q.qsize()}")
+
+            for frame, result, t_deq in zip(batch, results, t_dequeued):
+                text = result.get("text", "").strip()
+                detected_lang = result.get("language", lang_mode)
+                if not text:
+                    continue
+
+                utterance_id += 1
+                # asr はバッチ全体の時間(バッチの合計音声長は上の batch 行)
+                print(f"[timing] uid={utterance_id} audio={len(frame) / 16000.0:.2f}s asr={asr_sec:.2f}s batch={len(results)} aqlen={audio_q.qsize()}")
+
+                # 遅延トレース: 録音(セグメント確定まで) → audio_q待ち → ASR
+                closed_at = getattr(frame, "closed_at", None)
+                if closed_at is not None:
+                    tracing.mark(utterance_id, "closed", closed_at)
+                    tracing.span(utterance_id, "record", closed_at - len(frame) / 16000.0, closed_at)
+                    tracing.span(utterance_id, "audio_q", closed_at, t_deq)
+                tracing.span(utterance_id, "asr", t_trace_asr, t_trace_asr_end, batch=len(results))
+
+                # セグメントの位置(秒)。PiPは無視し、オフライン出力で使う
+                start_sample = getattr(frame, "start_sample", None)
+                if start_sample is not None:
+                    result_q.put(("segment", utterance_id, (start_sample / 16000.0, (start_sample + len(frame)) / 16000.0)))
+
+                # 認識テキストを即時UI表示
+                tracing.mark(utterance_id, "text_ready")
+                result_q.put(("text", utterance_id, text))
+
+                # 翻訳ジョブを別キューへ投入(バックプレッシャー: 上限超過時は古いジョブを破棄)
+                if enable_translate and translate_q is not None:
+                    from_lang, to_lang = detect_translation_direction(detected_lang)
+                    if from_lang and to_lang:
+                        put_translate_job(translate_q, (utterance_id, text, from_lang, to_lang), translate_queue_max)
 
-            if not text:
-                continue
+        except Exception as e:
+            print(f"[文字起こしエラー]\n{e}", file=sys.stderr)
+            import traceback
+            traceback.print_exc()
+            for _ in frames:
+                audio_q.task_done()
+
+        if stop:
+            break
+
+    if hasattr(asr_model, "frontend"):
+        audio2wav.remove_chunk_listener(asr_model.frontend.push)
+    asr_model.close()
+
+STREAM_DRAIN_MAX = 5.0  # --stream: 認識が遅れたとき1回のデコードに追加するチャンクの上限[秒]
+
+def stream_transcribe_thread(audio_q, result_q, lang_mode, enable_translate, backend, model_name, translate_q=None, translate_queue_max=TRANSLATE_QUEUE_MAX, backend_kwargs=None, trim_seconds=10.0, silence_threshold=0.01, num_threads=None):
+    """
+    ストリーミング認識スレッド(--stream)。audio_qの短いチャンクをローリングバッファに足して毎回デコードし、
+    連続する2回の仮説が一致した部分だけを確定する(asr.streaming.StreamingTranscriber)。
+    確定済みの文の途中と未確定部分は ("stream", 次のuid, (確定, 未確定)) でPiPへ送り、
+    文末まで確定した文は通常の発話と同じく "text" として送って翻訳する。
+    num_threads: このスレッドで使うtorchのスレッド数(--asr-threads)
+    """
+    import numpy as np
+    import audio2wav
+    from asr.sentences import split_sentences
+    from asr.streaming import StreamingTranscriber
+    set_torch_threads(num_threads)
+    asr_model = plugins.load_backend(backend)(model_name=model_name, language=lang_mode, **(backend_kwargs or {}))
+    asr_model.load()
+    asr_model.warmup()
+    if hasattr(asr_model, "frontend"):
+        audio2wav.add_chunk_listener(asr_model.frontend.push)
+    if hasattr(asr_model, "timestamps"):
+        asr_model.timestamps = True  # 確定済みセグメントの終端でバッファを切り詰める
+    streamer = StreamingTranscriber(asr_model, trim_seconds=trim_seconds, silence_threshold=silence_threshold)
+
+    utterance_id = 0
+    line = ""           # 確定済みだがまだ文として送っていないテキスト
+    line_start = None   # lineの先頭を含むバッファの開始位置(サンプル、おおよそ)
+
+    while True:
+        frame = audio_q.get()
+        if frame is None:
+            audio_q.task_done()
+            break
+        chunks = [frame]
+        stop = False
+        # 認識が遅れて溜まったチャンクはまとめて1回だけデコードする
+        while sum(len(c) for c in chunks) < STREAM_DRAIN_MAX * 16000:
+            try:
+                frame = audio_q.get_nowait()
+            except queue.Empty:
+                break
+            if frame is None:
+                audio_q.task_done()
+                stop = True
+                break
+            chunks.append(frame)
 
-            utterance_id += 1
-            print(f"[timing] uid={utterance_id} audio={audio_sec:.2f}s asr={asr_sec:.2f}s aqlen={audio_q.qsize()}")
-
-            # 認識テキストを即時UI表示
-            result_q.put(("text", utterance_id, text))
-
-            # 翻訳ジョブを別キューへ投入(バックプレッシャー: 上限超過時は古いジョブを破棄)
-            if enable_translate and translate_q is not None:
-                from_lang, to_lang = detect_translation_direction(detected_lang)
-                if from_lang and to_lang:
-                    while translate_q.qsize() >= TRANSLATE_QUEUE_MAX:
-                        try:
-                            dropped = translate_q.get_nowait()
-                            translate_q.task_done()
-                            print(f"[backpressure] 翻訳ジョブ破棄 uid={dropped[0]}")
-                        except queue.Empty:
-                            break
-                    translate_q.put((utterance_id, text, from_lang, to_lang))
-            
+        try:
+            audio = chunks[0] if len(chunks) == 1 else audio2wav.AudioSegment(
+                np.concatenate(chunks), getattr(chunks[0], "start_sample", None))
+            chunk_start = getattr(audio, "start_sample", None)
+            if chunk_start is None:
+                chunk_start = streamer.end
+            buffer_start = streamer.offset if len(streamer.audio) else chunk_start
+
+            t_asr_start = time.time()
+            t_trace_asr = tracing.now()
+            step = streamer.push(audio)
+            if stop:
+                step.committed += streamer.finish().committed
+                step.tentative, step.final = [], True
+            asr_sec = time.time() - t_asr_start
+            t_trace_asr_end = tracing.now()
+            print(f"[timing] stream buf={streamer.buffer_seconds:.1f}s asr={asr_sec:.2f}s chunks={len(chunks)} aqlen={audio_q.qsize()}")
+
+            if step.committed and not line:
+                line_start = buffer_start
+            line += "".join(step.committed)
+            sentences, rest = split_sentences(line)
+            if step.final and rest:
+                sentences, rest = sentences + [rest], ""
+            closed_at = getattr(chunks[-1], "closed_at", None)
+            for text in sentences:
+                utterance_id += 1
+                print(f"[timing] uid={utterance_id} asr={asr_sec:.2f}s buf={streamer.buffer_seconds:.1f}s (stream)")
+                if closed_at is not None:
+                    tracing.mark(utterance_id, "closed", closed_at)
+                tracing.span(utterance_id, "asr", t_trace_asr, t_trace_asr_end)
+
+                # 文の位置(秒)。単語の時刻は持たないので、デコードしたバッファ単位のおおよその範囲
+                result_q.put(("segment", utterance_id, (line_start / 16000.0, (chunk_start + len(audio)) / 16000.0)))
+                tracing.mark(utterance_id, "text_ready")
+                result_q.put(("text", utterance_id, text))
+
+                if enable_translate and translate_q is not None:
+                    from_lang, to_lang = detect_translation_direction(streamer.language or lang_mode)
+                    if from_lang and to_lang:
+                        put_translate_job(translate_q, (utterance_id, text, from_lang, to_lang), translate_queue_max)
+            if sentences:
+                line = rest
+                line_start = buffer_start if rest else None
+
+            # 確定済み(文の途中まで)と未確定の仮説をPiPへ
+            committed = line.strip()
+            tentative = "".join(step.tentative)
+            result_q.put(("stream", utterance_id + 1, (committed, tentative if committed else tentative.strip())))
         except Exception as e:
             print(f"[文字起こしエラー]\n{e}", file=sys.stderr)
             import traceback
             traceback.print_exc()
+
+        for _ in chunks:
             audio_q.task_done()
+        if stop:
+            break
+
+    if hasattr(asr_model, "frontend"):
+        audio2wav.remove_chunk_listener(asr_model.frontend.push)
+    asr_model.close()
+
+def run_offline(args, segments):
+    """--input: ファイル/標準入力の音声を認識し、結果をJSONLで標準出力へ書き出す
+
+    ログはstderrへ回す。録音の代わりにsegments(ジェネレータ)をaudio_qへ流し込む。
+    audio_qは有限長なので、読み込みは認識の速度に合わせて進む(実時間より速くてよい)。
+    """
+    out = sys.stdout
+    with contextlib.redirect_stdout(sys.stderr):
+        audio_q = queue.Queue(maxsize=OFFLINE_AUDIO_QUEUE_MAX)
+        result_q = queue.Queue()
+        translate_q = queue.Queue() if args.translate else None
+
+        def feed():
+            try:
+                for segment in segments:
+                    audio_q.put(segment)
+            except Exception as e:
+                print(f"[入力エラー]\n{e}", file=sys.stderr)
+            audio_q.put(None)
+
+        threads = [threading.Thread(target=feed, daemon=True)]
+        # 文単位にまとめる場合、ASRは sentence_q へ入れ、sentence_thread が translate_q へ流す
+        asr_translate_q = translate_q
+        if translate_q is not None and args.sentence_wait > 0:
+            asr_translate_q = queue.Queue()
+            threads.append(threading.Thread(
+                target=sentence_thread,
+                args=(asr_translate_q, translate_q, args.sentence_wait),
+                kwargs={"translate_queue_max": None},
+                daemon=True,
+            ))
+        if args.stream:
+            asr_thread = threading.Thread(
+                target=stream_transcribe_thread,
+                args=(audio_q, result_q, args.language, args.translate, args.backend, args.model, asr_translate_q),
+                kwargs={"translate_queue_max": None, "backend_kwargs": asr_backend_kwargs(args),
+                        "trim_seconds": args.stream_buffer, "silence_threshold": args.silence_threshold,
+                        "num_threads": args.asr_threads},
+                daemon=True,
+            )
+        else:
+            asr_thread = threading.Thread(
+                target=transcribe_audio_thread,
+                args=(audio_q, result_q, args.language, args.translate, args.backend, args.model, None, asr_translate_q),
+                kwargs={"translate_queue_max": None, "backend_kwargs": asr_backend_kwargs(args),
+                        "num_threads": args.asr_threads},
+                daemon=True,
+            )
+        threads.append(asr_thread)
+        translate_thread = None
+        translator = None
+        if args.translate:
+            translator = create_translator(args)
+            translate_thread = threading.Thread(
+                target=translate_worker_thread,
+                args=(translate_q, result_q, translator),
+                kwargs={"num_threads": args.mt_threads},
+                daemon=True,
+            )
+            threads.append(translate_thread)
+        for t in threads:
+            t.start()
+
+        spans = {}
+        translate_closed = False
+        while True:
+            if not asr_thread.is_alive() and translate_q is not None and not translate_closed:
+                asr_translate_q.put(None)
+                translate_closed = True
+            try:
+                kind, uid, payload = result_q.get(timeout=0.1)
+            except queue.Empty:
+                if not any(t.is_alive() for t in threads[1:]):
+                    break
+                continue
+            if kind == "segment":
+                spans[uid] = payload
+            elif kind == "text":
+                record = {"uid": uid, "text": payload}
+                if uid in spans:
+                    record["start"], record["end"] = (round(t, 3) for t in spans.pop(uid))
+                out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                out.flush()
+                trace_rendered(uid, "text")
+            elif kind == "translation":
+                out.write(json.dumps({"uid": uid, "translation": payload}, ensure_ascii=False) + "\n")
+                out.flush()
+                trace_rendered(uid, "translation")
+            result_q.task_done()
+
+        if translator is not None:
+            close_translator(translator)
+        finish_trace(args)
+
+
+def trace_rendered(uid, kind):
+    """表示(オフラインではJSONL出力)完了時の遅延トレース: result_q待ち+描画と、録音確定からの合計"""
+    if not tracing.enabled():
+        return
+    put_mark = "text_ready" if kind == "text" else "translation_put"
+    tracing.span_from_mark(uid, f"render_{kind}", put_mark)
+    tracing.span_from_mark(uid, f"e2e_{kind}", "closed")
+
+
+def finish_trace(args, file=None):
+    """--trace: スパンをファイルへ書き出し、ステージごとのp50/p95/p99を表示"""
+    if not args.trace:
+        return
+    tracing.export(args.trace)
+    tracing.print_summary(file=file)
+    print(f"[trace] {len(tracing.spans())}件のスパンを書き出しました: {args.trace}", file=file)
+
 
 FONT_MIN = 8
 FONT_MAX = 96
 FONT_DEFAULT = 14
 
 
-def start_pip_window(result_q, stop_ev, backend=None, registry=None, reload_cb=None, oov_queue=None, translate_enabled=False):
+def start_pip_window(result_q, stop_ev, backend=None, registry=None, reload_cb=None, oov_queue=None, translate_enabled=False, streaming=False):
+    import audio2wav
     pip = tk.Toplevel()
     pip.title("asrivia")
     pip.geometry("600x180")
@@ -173,6 +564,14 @@ def start_pip_window(result_q, stop_ev, backend=None, registry=None, reload_cb=N
     button_frame = tk.Frame(pip)
     button_frame.pack(side=tk.BOTTOM, fill=tk.X, padx=5, pady=4)
 
+    # --stream: 認識中の文(確定済み+未確定)をボタンバーの上に表示。未確定部分は灰色
+    live_text = None
+    if streaming:
+        live_text = tk.Text(pip, height=2, wrap="char", borderwidth=0, highlightthickness=0,
+                            bg=pip.cget("bg"), font=("Arial", FONT_DEFAULT), state="disabled")
+        live_text.tag_configure("tentative", foreground="gray50")
+        live_text.pack(side=tk.BOTTOM, fill=tk.X, padx=10)
+
     text_label = tk.Label(
         pip,
         text="認識結果がここに表示されます",
@@ -197,6 +596,8 @@ def start_pip_window(result_q, stop_ev, backend=None, registry=None, reload_cb=N
         new_size = max(FONT_MIN, min(FONT_MAX, font_size.get() + delta))
         font_size.set(new_size)
         text_label.config(font=("Arial", new_size))
+        if live_text is not None:
+            live_text.config(font=("Arial", new_size))
 
     btn_decrease = tk.Button(button_frame, text="－", width=2, command=lambda: change_font(-2))
     btn_decrease.pack(side=tk.LEFT, padx=2)
@@ -243,17 +644,28 @@ def start_pip_window(result_q, stop_ev, backend=None, registry=None, reload_cb=N
         btn_dict.pack(side=tk.LEFT, padx=4)
 
     # 現在表示中の発話状態
-    state = {"uid": None, "text": "", "translated": None, "translate_enabled": translate_enabled}
+    # done: 表示中の発話に届いた翻訳(文単位にまとめると1発話に複数届くことがある)
+    state = {"uid": None, "text": "", "done": [], "translated": None, "translate_enabled": translate_enabled}
 
     def render():
         if state["text"] == "":
             return
         if state["translate_enabled"]:
-            tr = state["translated"] if state["translated"] is not None else "..."
+            parts = list(state["done"])
+            if state["translated"] is not None:
+                parts.append(state["translated"] + " …")  # 翻訳の途中経過
+            tr = " ".join(parts) if parts else "..."
             text_label.config(text=f"{state['text']}\n→ {tr}")
         else:
             text_label.config(text=state["text"])
 
+    def render_live(committed, tentative):
+        live_text.config(state="normal")
+        live_text.delete("1.0", tk.END)
+        live_text.insert(tk.END, committed)
+        live_text.insert(tk.END, tentative, "tentative")
+        live_text.config(state="disabled")
+
     def poll_queue():
         try:
             while True:
@@ -262,12 +674,23 @@ def start_pip_window(result_q, stop_ev, backend=None, registry=None, reload_cb=N
                 if kind == "text":
                     state["uid"] = uid
                     state["text"] = payload
+                    state["done"] = []
                     state["translated"] = None
                     render()
-                elif kind == "translation":
+                    trace_rendered(uid, "text")
+                elif kind == "stream":
+                    if live_text is not None:
+                        render_live(*payload)
+                elif kind == "translation_partial":
                     if uid == state["uid"]:
                         state["translated"] = payload
                         render()
+                elif kind == "translation":
+                    if uid == state["uid"]:
+                        state["done"].append(payload)
+                        state["translated"] = None
+                        render()
+                        trace_rendered(uid, "translation")
                     # 古い翻訳が遅れて到着した場合は破棄
                 result_q.task_done()
         except queue.Empty:
@@ -275,7 +698,9 @@ def start_pip_window(result_q, stop_ev, backend=None, registry=None, reload_cb=N
         if not stop_ev.is_set():
             pip.after(100, poll_queue)
         else:
+            # rootは非表示のまま残るので、mainloopを明示的に抜けて終了処理(翻訳メモリ保存など)へ進む
             pip.destroy()
+            pip.master.quit()
     
     poll_queue()
     pip.protocol("WM_DELETE_WINDOW", stop_ev.set)
@@ -283,14 +708,20 @@ def start_pip_window(result_q, stop_ev, backend=None, registry=None, reload_cb=N
 
 # mainブランチ準拠: main()構造統一、backend/model引数のみ差分
 def main():
+    t_start = time.perf_counter()
     parser = argparse.ArgumentParser()
     parser.add_argument("--language", choices=["ja", "en", "auto"], default="ja", help="認識言語モード: ja=日本語 en=英語 auto=自動判定")
     parser.add_argument("--translate", action="store_true", help="翻訳も実行する(指定しないと翻訳なし)")
-    parser.add_argument("--translator", choices=["opus", "gemma"], default="opus", help="翻訳器: opus=軽量CPU(デフォルト, 高速) gemma=TranslateGemma 4B(高品質, GPU)")
+    parser.add_argument("--translator", choices=list(plugins.TRANSLATORS), default="opus", help="翻訳器: opus=軽量CPU(デフォルト, 高速) gemma=TranslateGemma 4B(高品質, GPU)")
     # mainブランチ準拠: backend/model引数のみ差分
-    parser.add_argument("--backend", choices=["mlx", "openai", "stable-ts", "hf"], default="mlx", help="ASRバックエンド: mlx=ローカル(デフォルト) openai=ローカルPyTorch版Whisper stable-ts=Whisper+VAD hf=HuggingFace Whisper+biasing")
+    parser.add_argument("--backend", choices=list(plugins.BACKENDS), default="mlx", help="ASRバックエンド: mlx=ローカル(デフォルト) openai=ローカルPyTorch版Whisper stable-ts=Whisper+VAD hf=HuggingFace Whisper+biasing")
     parser.add_argument("--dict", action="store_true", dest="dict_only", help="辞書登録UIのみ起動（ASRなし）")
     parser.add_argument("--model", type=str, default=None, help="使用するモデル名(mlx: HFリポジトリパス、openai: Whisperモデル名)")
+    parser.add_argument("--asr-draft-model", type=str, default=None, metavar="NAME", help="hf: 小さいWhisperで下書きし本モデルで検証する補助デコード(語彙・mel数が同じモデルのみ。large-v3/turboには distil-whisper/distil-large-v3)。発話ごとに確定トークン数・本モデルの検証回数・採択率・tokens/検証を表示(実際の高速化は benchmarks/bench_assisted_whisper.py)")
+    parser.add_argument("--asr-short-window", type=float, default=None, metavar="SEC", help="hf: 30秒窓の代わりに「セグメント長+SEC秒」(1秒単位に切り上げ)だけをエンコードする。短い発話ほど速いが精度は要確認(benchmarks/bench_short_window.py)")
+    parser.add_argument("--stream", action="store_true", help="ストリーミング認識: 短いチャンクごとにローリングバッファを再デコードし、連続2回の仮説が一致した部分から確定表示する(未確定部分は灰色)。--dynamic-vadは無視")
+    parser.add_argument("--stream-step", type=float, default=1.0, metavar="SEC", help="--stream: 再デコードの間隔=録音チャンク長[秒] (default: 1.0)")
+    parser.add_argument("--stream-buffer", type=float, default=10.0, metavar="SEC", help="--stream: バッファがこの長さを超えたら確定済みセグメントの終端で切り詰める[秒] (default: 10.0)")
     # 動的セグメンテーション関連オプション
     parser.add_argument("--dynamic-vad", action="store_true", help="VADベースの動的セグメンテーションを有効化")
     parser.add_argument("--silence-threshold", type=float, default=0.01, help="無音判定閾値 (default: 0.01)")
@@ -298,8 +729,25 @@ def main():
     parser.add_argument("--min-record", type=float, default=0.5, help="最小録音時間[秒] (default: 0.5)")
     parser.add_argument("--max-record", type=float, default=5.0, help="最大録音時間[秒] (default: 5.0)")
     parser.add_argument("--overlap", type=float, default=0.0, help="オーバーラップ時間[秒] (default: 0.0)")
+    parser.add_argument("--noise-window", type=float, default=3.0, help="ノイズフロア追跡の窓[秒] 0で固定閾値のみ (default: 3.0)")
+    parser.add_argument("--mt-quantize", action="store_true", help="opus: Linear層をint8動的量子化してCPU推論を高速化")
+    parser.add_argument("--mt-threads", type=int, default=None, metavar="N", help="翻訳スレッドが使うtorchのスレッド数(起動時に1回設定。--asr-threadsとコアを分け合う)")
+    parser.add_argument("--asr-threads", type=int, default=None, metavar="N", help="認識スレッドが使うtorchのスレッド数(openai/stable-ts/hf。起動時に1回設定)")
+    parser.add_argument("--no-stream-translation", action="store_true", help="翻訳の途中経過をPiPに表示しない(完了後にまとめて表示)")
+    parser.add_argument("--sentence-wait", type=float, default=1.5, help="翻訳前に文末(。？！ . ? !)まで発話をまとめる最大待ち時間[秒] 0で発話ごとに翻訳 (default: 1.5)")
+    parser.add_argument("--tm-size", type=int, default=4096, help="翻訳メモリ(LRU)の最大件数 0で無効 (default: 4096)")
+    parser.add_argument("--tm-file", type=str, default=None, help="翻訳メモリの保存先JSON(起動時に読み込み、終了時に保存)")
+    parser.add_argument("--input", type=str, default=None, metavar="FILE|-", help="マイクの代わりにWAV/生float32 PCM(16kHz)ファイルを認識し、結果をJSONLで標準出力へ(-で標準入力)")
+    parser.add_argument("--trace", type=str, default=None, metavar="FILE", help="発話ごとの遅延トレースを記録し終了時に書き出す(.jsonならChrome trace形式、それ以外はJSONL)。ステージ別p50/p95/p99も表示")
+    parser.add_argument("--profile-startup", action="store_true", help="モジュールごとのimport時間と起動時間を表示")
     args = parser.parse_args()
-    
+
+    if args.trace:
+        tracing.enable()
+
+    if args.profile_startup:
+        plugins.enable_profiling()
+
     # デフォルトモデル設定
     if args.model is None:
         if args.backend == "mlx":
@@ -310,41 +758,76 @@ def main():
             args.model = "large-v3-turbo"
         elif args.backend == "hf":
             args.model = "openai/whisper-large-v3-turbo"
+
     
-    print(f"ASRバックエンド: {args.backend}")
-    print(f"使用モデル: {args.model}")
+    # --input 時は標準出力をJSONL専用にするためログはstderrへ
+    log = sys.stderr if args.input else sys.stdout
+    print(f"ASRバックエンド: {args.backend}", file=log)
+    print(f"使用モデル: {args.model}", file=log)
+
+    # --input モード: UI・マイクなしでファイルを認識してJSONL出力
+    if args.input:
+        audio2wav = plugins.import_module("audio2wav")
+        if args.stream:
+            segments = audio2wav.iter_file_segments(args.input, mode="fixed", record_seconds=args.stream_step)
+        elif args.dynamic_vad:
+            segments = audio2wav.iter_file_segments(
+                args.input,
+                mode="dynamic",
+                silence_threshold=args.silence_threshold,
+                silence_duration=args.silence_duration,
+                min_record_seconds=args.min_record,
+                max_record_seconds=args.max_record,
+                overlap_seconds=args.overlap,
+                noise_window_seconds=args.noise_window,
+            )
+        else:
+            segments = audio2wav.iter_file_segments(args.input, mode="fixed")
+        run_offline(args, segments)
+        return
 
     root = tk.Tk()
     root.withdraw()
 
     # --dict モード: 辞書UIのみ起動
     if args.dict_only:
-        from asr.biasing import WordRegistry
-        from asr.dict_window import DictWindow
+        WordRegistry = plugins.load("asr.biasing:WordRegistry")
+        DictWindow = plugins.load("asr.dict_window:DictWindow")
         registry = WordRegistry.load("words.json")
         DictWindow(root, registry)
+        if args.profile_startup:
+            plugins.report(time.perf_counter() - t_start)
         root.mainloop()
         return
 
+    audio2wav = plugins.import_module("audio2wav")
+
     audio_q = queue.Queue()
     result_q = queue.Queue()
     stop_ev = threading.Event()
-    oov_queue = queue.Queue() if args.backend == "hf" else None
+    oov_queue = None
+    if args.backend == "hf":
+        from asr.oov import OOVFeed
+        oov_queue = OOVFeed()
 
     # hfバックエンド用: registryとreload_cbを事前準備
     hf_registry = None
     hf_reload_cb = None
 
     # レコーダー初期化
-    if args.dynamic_vad:
-        print(f"[動的VAD] 有効 (無音閾値: {args.silence_threshold}, 無音時間: {args.silence_duration}s, 最小: {args.min_record}s, 最大: {args.max_record}s, オーバーラップ: {args.overlap}s)")
+    if args.stream:
+        print(f"[ストリーミング] 有効 (チャンク: {args.stream_step}s, バッファ: {args.stream_buffer}s, 無音閾値: {args.silence_threshold})")
+        audio2wav.initialize_recorder(mode="fixed", record_seconds=args.stream_step)
+    elif args.dynamic_vad:
+        print(f"[動的VAD] 有効 (無音閾値: {args.silence_threshold}, 無音時間: {args.silence_duration}s, 最小: {args.min_record}s, 最大: {args.max_record}s, オーバーラップ: {args.overlap}s, ノイズ窓: {args.noise_window}s)")
         audio2wav.initialize_recorder(
             mode="dynamic",
             silence_threshold=args.silence_threshold,
             silence_duration=args.silence_duration,
             min_record_seconds=args.min_record,
             max_record_seconds=args.max_record,
-            overlap_seconds=args.overlap
+            overlap_seconds=args.overlap,
+            noise_window_seconds=args.noise_window,
         )
     else:
         audio2wav.initialize_recorder(mode="fixed")
@@ -353,33 +836,65 @@ def main():
     if args.backend == "hf":
         from asr.biasing import WordRegistry
         hf_registry = WordRegistry.load("words.json")
-        # reload_cbはtranscribeスレッド内のbackendに委譲（mtime監視で自動リロード）
-        hf_reload_cb = None  # backend側でmtime監視するため不要
+        # UIの編集は変更ログに追記され、transcribeスレッドのbackendがデコードごとに
+        # WordRegistry.sync で差分だけ取り込む（PrefixTreeも差分更新）
+        hf_reload_cb = None  # 明示的なリロードは不要
 
     translator = None
     if args.translate:
-        if args.translator == "gemma":
-            translator = GemmaTranslator()
-        else:
-            translator = OpusTranslator()
+        translator = create_translator(args)
     translate_q = queue.Queue() if args.translate else None
 
     threading.Thread(target=record_audio_thread, args=(audio_q,), daemon=True).start()
 
-    threading.Thread(
-        target=transcribe_audio_thread,
-        args=(audio_q, result_q, args.language, args.translate, args.backend, args.model, oov_queue, translate_q),
-        daemon=True
-    ).start()
+    # 文単位にまとめる場合、ASRは sentence_q へ入れ、バックプレッシャーは sentence_thread 側でかける
+    asr_translate_q = translate_q
+    asr_translate_queue_max = TRANSLATE_QUEUE_MAX
+    if args.translate and args.sentence_wait > 0:
+        asr_translate_q = queue.Queue()
+        asr_translate_queue_max = None
+        threading.Thread(
+            target=sentence_thread,
+            args=(asr_translate_q, translate_q, args.sentence_wait),
+            daemon=True
+        ).start()
+
+    if args.stream:
+        threading.Thread(
+            target=stream_transcribe_thread,
+            args=(audio_q, result_q, args.language, args.translate, args.backend, args.model, asr_translate_q),
+            kwargs={"translate_queue_max": asr_translate_queue_max, "backend_kwargs": asr_backend_kwargs(args),
+                    "trim_seconds": args.stream_buffer, "silence_threshold": args.silence_threshold,
+                    "num_threads": args.asr_threads},
+            daemon=True
+        ).start()
+    else:
+        threading.Thread(
+            target=transcribe_audio_thread,
+            args=(audio_q, result_q, args.language, args.translate, args.backend, args.model, oov_queue, asr_translate_q),
+            kwargs={"translate_queue_max": asr_translate_queue_max, "backend_kwargs": asr_backend_kwargs(args),
+                    "num_threads": args.asr_threads},
+            daemon=True
+        ).start()
 
     if args.translate:
         threading.Thread(
             target=translate_worker_thread,
             args=(translate_q, result_q, translator),
+            kwargs={"stream": not args.no_stream_translation, "num_threads": args.mt_threads},
             daemon=True
         ).start()
 
-    start_pip_window(result_q, stop_ev, args.backend, hf_registry, hf_reload_cb, oov_queue, translate_enabled=args.translate)
+    if args.profile_startup:
+        plugins.report(time.perf_counter() - t_start)
+
+    try:
+        start_pip_window(result_q, stop_ev, args.backend, hf_registry, hf_reload_cb, oov_queue, translate_enabled=args.translate, streaming=args.stream)
+    finally:
+        # ウィンドウを閉じてもCtrl+Cでも翻訳メモリの保存と遅延トレースの書き出しを行う
+        if translator is not None:
+            close_translator(translator)
+        finish_trace(args)
 
 if __name__ == "__main__":
     main()
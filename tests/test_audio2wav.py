@@ -0,0 +1,82 @@
+import threading
+
+import numpy as np
+
+import audio2wav
+
+RATE = 16000
+
+
+def tone(seconds):
+    t = np.arange(int(seconds * RATE)) / RATE
+    return (0.3 * np.sin(2 * np.pi * 440 * t)).astype(np.float32)
+
+
+def silence(seconds):
+    return np.zeros(int(seconds * RATE), dtype=np.float32)
+
+
+def record(signal, timeout=10.0, **kwargs):
+    """FakeInputStreamで信号を流し、セグメントの(開始, 終了)[サンプル]を返す"""
+    rec = audio2wav.DynamicAudioRecorder(
+        stream_source=audio2wav.FakeInputStream.source(signal, realtime=False), **kwargs)
+    result = []
+
+    def run():
+        rec.start_recording()
+        result.extend((seg.start_sample, seg.start_sample + len(seg)) for seg in rec.segments())
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    thread.join(timeout)
+    rec.stop_recording()
+    assert not thread.is_alive(), "信号が尽きてもsegments()が終わらない"
+    return result
+
+
+def test_fake_stream_segments_end_with_signal():
+    signal = np.concatenate([silence(1.0), tone(1.0), silence(1.5), tone(1.0), silence(0.3)])
+    chunk = audio2wav.CHUNK
+    segments = record(signal, noise_window_seconds=0, silence_duration=0.5)
+
+    # 1つ目の発話はハングオーバー(0.5秒)が切れたチャンクで閉じる
+    first_end = segments[0][1]
+    assert 2.5 * RATE <= first_end <= 2.5 * RATE + 2 * chunk
+    # 区切りは連続し、最後の発話は信号の終わり(最後のチャンクまで)で出力される
+    assert len(segments) == 2
+    assert segments[0][0] == 0 and segments[1][0] == first_end
+    assert len(signal) <= segments[1][1] < len(signal) + chunk
+    assert all(start % chunk == 0 for start, _ in segments)
+
+
+def test_no_silent_segment_after_forced_cut():
+    # 発話が最大長(5秒)の直前で終わり、ハングオーバー中に切れても無音だけのセグメントは作らない
+    signal = np.concatenate([tone(4.9), silence(2.0), tone(1.0), silence(1.0)])
+    chunk = audio2wav.CHUNK
+    segments = record(signal, noise_window_seconds=0, snr_off=3.0, silence_duration=0.5)
+
+    max_len = int(5.0 / (chunk / RATE)) * chunk
+    assert segments[0] == (0, max_len)
+    # 2つ目は無音を越えて次の発話を含み、そのハングオーバー切れまで続く
+    assert segments[1][0] == max_len
+    assert 8.4 * RATE <= segments[1][1] <= 8.4 * RATE + 2 * chunk
+
+
+def test_remove_chunk_listener(monkeypatch):
+    class Frontend:
+        def __init__(self):
+            self.starts = []
+
+        def push(self, start, chunk):
+            self.starts.append(start)
+
+    rec = audio2wav.DynamicAudioRecorder(stream_source=audio2wav.FakeInputStream.source(silence(0.1)))
+    monkeypatch.setattr(audio2wav, "recorder", rec)
+    kept, closed = Frontend(), Frontend()
+    audio2wav.add_chunk_listener(kept.push)
+    audio2wav.add_chunk_listener(closed.push)
+    # バックエンドのclose時と同じく、改めて取り出したbound methodで外す
+    audio2wav.remove_chunk_listener(closed.push)
+    rec._notify(0, silence(0.06))
+    assert kept.starts == [0]
+    assert closed.starts == []
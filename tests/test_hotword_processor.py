@@ -0,0 +1,73 @@
+import random
+
+import torch
+
+from asr.biasing import BiasWord, HotwordLogitsProcessor, PrefixTree
+
+VOCAB = 50
+
+
+class SmallTokenizer:
+    def encode(self, text):
+        rng = random.Random(text)
+        return [rng.randrange(VOCAB) for _ in range(rng.randint(1, 4))]
+
+
+def legacy(tree, input_ids, scores, window_size=10):
+    """以前の実装: ビームごとに直近の窓を照合して1要素ずつ加算する"""
+    for row in range(scores.shape[0]):
+        window = input_ids[row].tolist()[-window_size:]
+        for tid, boost in tree.get_next_boost(window).items():
+            scores[row, tid] += boost
+    return scores
+
+
+def make_tree(seed):
+    rng = random.Random(seed)
+    tok = SmallTokenizer()
+    words = [BiasWord(f"w{i}", boost=rng.choice([1.5, 2.0, 3.0])) for i in range(30)]
+    tree = PrefixTree()
+    tree.build(words, tok)
+    return tree, [tok.encode(w.word) for w in words]
+
+
+def beam_steps(hot, beams, steps, seed):
+    """ビームの並べ替え(親の重複あり)とホットワードを含む input_ids を1ステップずつ返す"""
+    rng = random.Random(seed)
+    ids = torch.full((beams, 3), VOCAB, dtype=torch.long)  # 先頭は語彙外の特殊トークン
+    pending = [[] for _ in range(beams)]
+    for _ in range(steps):
+        yield ids
+        order = [rng.randrange(beams) for _ in range(beams)]
+        ids, pending = ids[order], [list(pending[i]) for i in order]
+        tokens = []
+        for row in range(beams):
+            if not pending[row] and rng.random() < 0.4:
+                pending[row] = list(rng.choice(hot))
+            tokens.append(pending[row].pop(0) if pending[row] else rng.randrange(VOCAB))
+        ids = torch.cat([ids, torch.tensor(tokens)[:, None]], dim=1)
+
+
+def test_matches_legacy_under_beam_reordering():
+    for seed in range(5):
+        tree, hot = make_tree(seed)
+        processor = HotwordLogitsProcessor(tree)
+        for input_ids in beam_steps(hot, beams=4, steps=40, seed=seed):
+            scores = torch.randn(input_ids.shape[0], VOCAB + 1)
+            expected = legacy(tree, input_ids, scores.clone())
+            assert torch.allclose(processor(input_ids, scores), expected, atol=1e-6)
+
+
+def test_matches_legacy_after_rollback():
+    # 補助デコード: 1系列で、棄却されたドラフトトークンの分だけ短くなってから伸び直す
+    tree, hot = make_tree(0)
+    processor = HotwordLogitsProcessor(tree)
+    rng = random.Random(0)
+    ids = [VOCAB] * 3
+    for _ in range(40):
+        ids = ids[:max(3, len(ids) - rng.randrange(3))]
+        ids += rng.choice(hot) if rng.random() < 0.5 else [rng.randrange(VOCAB)]
+        input_ids = torch.tensor([ids])
+        scores = torch.randn(1, VOCAB + 1)
+        expected = legacy(tree, input_ids, scores.clone())
+        assert torch.allclose(processor(input_ids, scores), expected, atol=1e-6)
@@ -0,0 +1,112 @@
+import random
+
+from asr.biasing import BiasWord, PrefixTree
+
+ALPHABET = "abcdefghij"
+
+
+class SmallTokenizer:
+    """1文字1トークン、語彙7個(接尾辞と接頭辞の重なりを多くする)"""
+
+    def encode(self, text):
+        return [ord(c) % 7 for c in text]
+
+
+def random_words(rng, n):
+    words = {}
+    for _ in range(n):
+        word = "".join(rng.choice(ALPHABET) for _ in range(rng.randrange(1, 7)))
+        words[word] = BiasWord(word, boost=rng.choice([1.0, 2.0, 3.5]))
+    return list(words.values())
+
+
+def rescan(words, tokenizer, history):
+    """履歴の全接尾辞を毎回照合する参照実装(Aho-Corasick化する前と同じ照合)"""
+    ends = {}
+    for bw in words:
+        for variant in PrefixTree.variants(bw.word):
+            ids = tuple(tokenizer.encode(variant))
+            ends[ids] = max(ends.get(ids, 0.0), bw.boost / len(ids))
+
+    def hint(prefix):
+        # 語末ならそのブースト、途中なら下にある語(語末で止まる)の最大ブースト
+        if prefix in ends:
+            return ends[prefix]
+        below = {ids[:len(prefix) + 1] for ids in ends if len(ids) > len(prefix) and ids[:len(prefix)] == prefix}
+        return max((hint(p) for p in below), default=0.0)
+
+    result = {}
+    for start in range(len(history) + 1):
+        suffix = tuple(history[start:])
+        for ids in ends:
+            if len(ids) > len(suffix) and ids[:len(suffix)] == suffix:
+                tid = ids[len(suffix)]
+                boost = hint(ids[:len(suffix) + 1])
+                if boost > 0:
+                    result[tid] = max(result.get(tid, 0.0), boost)
+    return result
+
+
+def test_automaton_matches_suffix_rescan():
+    rng = random.Random(0)
+    tok = SmallTokenizer()
+    for _ in range(30):
+        words = random_words(rng, rng.randrange(1, 20))
+        tree = PrefixTree()
+        tree.build(words, tok)
+        history = [rng.randrange(7) for _ in range(60)]
+        state = tree.ROOT
+        for i, tid in enumerate(history):
+            state = tree.step(state, tid)
+            # 語は最長7トークンなので、直近10トークンの窓で照合しても結果は変わらない
+            window = history[max(0, i - 9):i + 1]
+            expected = rescan(words, tok, window)
+            assert tree.boosts(state) == expected
+            assert tree.get_next_boost(window) == expected
+
+
+def paths(tree):
+    """トークン列 -> ノード(状態番号は作り方で変わるので、経路で比べる)"""
+    out, stack = {}, [((), tree._root)]
+    while stack:
+        key, node = stack.pop()
+        out[key] = node
+        stack.extend((key + (tid,), child) for tid, child in node.children.items())
+    return out
+
+
+def snapshot(tree):
+    nodes = paths(tree)
+    by_index = {node.index: key for key, node in nodes.items()}
+    # ルートのhintは使わない(ルートの表は root_boosts)
+    states = {key: (by_index[node.fail], node.hint if key else None, tree.boosts(node.index))
+              for key, node in nodes.items()}
+    return states, dict(tree.root_boosts), len(tree)
+
+
+def test_incremental_edits_match_build():
+    rng = random.Random(1)
+    tok = SmallTokenizer()
+    for _ in range(100):
+        words = {}
+        tree = PrefixTree()
+        for _ in range(rng.randrange(1, 40)):
+            r = rng.random()
+            if r < 0.55 or not words:
+                bw = random_words(rng, 1)[0]
+                words[bw.word] = bw
+                tree.insert(bw, tok)
+            elif r < 0.85:
+                word = rng.choice(list(words))
+                del words[word]
+                tree.remove(word)
+            else:
+                word = rng.choice(list(words))
+                words[word].boost = rng.choice([0.5, 4.0])
+                tree.update_boost(word, words[word].boost)
+            # 編集の合間の参照(状態ごとのテーブルのキャッシュ)も混ぜる
+            tree.boosts(tree.walk(tok.encode(rng.choice(ALPHABET) * 3)))
+
+        fresh = PrefixTree()
+        fresh.build(list(words.values()), tok)
+        assert snapshot(tree) == snapshot(fresh)
@@ -0,0 +1,70 @@
+import json
+
+from asr.biasing import WordRegistry
+
+
+def words(registry):
+    return {bw.word: (bw.boost, bw.note) for bw in registry.all()}
+
+
+def changes(registry):
+    return [(kind, bw.word) for kind, bw in registry.sync()]
+
+
+def test_sync_replays_edits_of_another_instance(tmp_path):
+    path = str(tmp_path / "words.json")
+    WordRegistry().save(path)
+    writer, reader = WordRegistry.load(path), WordRegistry.load(path)
+
+    writer.add("Kubernetes", boost=3.0)
+    writer.add("ゆっくり", note="副詞")
+    writer.update_boost("Kubernetes", 1.5)
+    writer.remove("ゆっくり")
+    assert changes(reader) == [("add", "Kubernetes"), ("add", "ゆっくり"), ("boost", "Kubernetes"),
+                               ("remove", "ゆっくり")]
+    assert words(reader) == words(writer) == {"Kubernetes": (1.5, "")}
+    assert changes(reader) == []
+
+    # 逆向きの編集も拾える(読み手も同じログに追記する)
+    reader.add("PyTorch")
+    assert changes(writer) == [("add", "PyTorch")]
+    assert words(WordRegistry.load(path)) == words(writer)
+
+
+def test_sync_after_compaction(tmp_path):
+    path = str(tmp_path / "words.json")
+    WordRegistry().save(path)
+    writer, reader = WordRegistry.load(path), WordRegistry.load(path)
+    writer.COMPACT_EVERY = 4
+
+    writer.add("a")
+    assert changes(reader) == [("add", "a")]
+    writer.add("b")
+    writer.update_boost("a", 3.0)
+    writer.remove("b")  # 4件目はログに足さずスナップショットを書き直し、ログを空にする
+    assert writer.log_path.read_text(encoding="utf-8").count("\n") == 1  # ヘッダだけ
+    # スナップショットを読み直した差分(途中で消えた b は出てこない)
+    assert changes(reader) == [("boost", "a")]
+    assert words(reader) == words(writer)
+
+    writer.add("c")  # 新しいログへの追記は差分だけ読む
+    assert changes(reader) == [("add", "c")]
+    assert words(reader) == words(writer)
+
+
+def test_hand_edited_snapshot_ignores_stale_log(tmp_path):
+    path = tmp_path / "words.json"
+    WordRegistry().save(str(path))
+    writer, reader = WordRegistry.load(str(path)), WordRegistry.load(str(path))
+    writer.add("old")
+    assert changes(reader) == [("add", "old")]
+
+    # 手でスナップショットを書き換えた: ログ(古いスナップショット宛て)は適用しない
+    path.write_text(json.dumps([{"word": "edited", "boost": 2.5}]), encoding="utf-8")
+    assert sorted(changes(reader)) == [("add", "edited"), ("remove", "old")]
+    assert words(reader) == words(WordRegistry.load(str(path))) == {"edited": (2.5, "")}
+
+    # 次の編集で古いログは書き直され、手編集と新しい編集の両方が残る
+    writer.add("new")
+    assert words(WordRegistry.load(str(path))) == {"edited": (2.5, ""), "new": (2.0, "")}
+    assert sorted(changes(reader)) == [("add", "new")]
@@ -0,0 +1,40 @@
+from asr.sentences import SentenceAccumulator, join_text, split_sentences
+
+
+def test_split_sentences():
+    assert split_sentences("今日は晴れです。明日は「雨」？そう") == (["今日は晴れです。", "明日は「雨」？"], "そう")
+    assert split_sentences("Version 1.5 is out. Really?!") == (["Version 1.5 is out.", "Really?!"], "")
+    assert split_sentences("") == ([], "")
+
+
+def test_join_text():
+    assert join_text("hello", "world") == "hello world"
+    assert join_text("Hi.", "Yes") == "Hi. Yes"
+    assert join_text("今日は", "晴れ") == "今日は晴れ"
+    assert join_text("", "晴れ") == "晴れ"
+
+
+def test_merges_segments_into_sentences():
+    acc = SentenceAccumulator(max_wait=1.5)
+    assert acc.push(1, "今日は", "ja", "en", now=0.0) == []
+    # 前の断片と合わせて完結した文は、新しい方のuidで1つのジョブになる
+    assert acc.push(2, "晴れです。明日は", "ja", "en", now=0.5) == [(2, "今日は晴れです。", "ja", "en")]
+    assert acc.push(3, "雨です。また明日。", "ja", "en", now=1.0) == [(3, "明日は雨です。また明日。", "ja", "en")]
+    assert acc.flush() == []
+
+
+def test_releases_tail_after_max_wait():
+    acc = SentenceAccumulator(max_wait=1.5)
+    acc.push(1, "えーと", "ja", "en", now=10.0)
+    assert acc.timeout(now=11.0) == 0.5
+    assert acc.due(now=11.0) == []
+    # 続きが来ても文が終わらなければ、待ち時間は最初の断片から数える
+    acc.push(2, "その", "ja", "en", now=11.0)
+    assert acc.due(now=11.5) == [(2, "えーとその", "ja", "en")]
+    assert acc.timeout() is None
+
+
+def test_flushes_pending_tail_when_direction_changes():
+    acc = SentenceAccumulator()
+    acc.push(1, "so the", "en", "ja", now=0.0)
+    assert acc.push(2, "はい。", "ja", "en", now=0.1) == [(1, "so the", "en", "ja"), (2, "はい。", "ja", "en")]
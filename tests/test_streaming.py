@@ -0,0 +1,68 @@
+import numpy as np
+from transformers import WhisperFeatureExtractor
+
+import audio2wav
+from asr.features import LogMelFrontend
+from asr.streaming import LocalAgreement, StreamingTranscriber, split_units
+
+RATE = 16000
+
+
+def test_split_units():
+    assert split_units("Hello, world. 今日は") == ["Hello", ",", " world", ".", " 今", "日", "は"]
+    assert split_units(" don't stop 3.5") == [" don't", " stop", " 3.5"]
+
+
+def test_local_agreement_commits_agreed_prefix():
+    agreement = LocalAgreement()
+    assert agreement.insert(split_units("今日は晴")) == []
+    assert agreement.insert(split_units("今日は雨")) == ["今", "日", "は"]
+    assert agreement.tentative == ["雨"]
+    # 確定済みの部分は比較の前に読み飛ばす(大文字小文字・空白の違いは同じとみなす)
+    assert agreement.insert(split_units("今日は雨です")) == ["雨"]
+    assert agreement.insert(split_units("今日は雨ですね")) == ["で", "す"]
+    assert agreement.flush() == ["ね"]
+    assert agreement.committed == split_units("今日は雨ですね")
+
+
+def test_local_agreement_realigns_revised_commit():
+    agreement = LocalAgreement()
+    agreement.insert(split_units("we will meet at ten"))
+    agreement.insert(split_units("we will meet at ten tomorrow"))
+    # 再デコードで確定済みの先頭が変わっても、確定末尾の数単位の後から続ける
+    assert agreement.insert(split_units("We'll meet at ten tomorrow morning")) == [" tomorrow"]
+    assert agreement.drop(2) == ["we", " will"]
+    assert agreement.committed == split_units(" meet at ten tomorrow")
+
+
+class CachedBackend:
+    """セグメント終端を固定秒で返し、フレームキャッシュが使えたかを記録するバックエンド"""
+
+    def __init__(self, segment_end):
+        self.frontend = LogMelFrontend.from_feature_extractor(WhisperFeatureExtractor())
+        self.segment_end = segment_end
+        self.cache_hits = []
+
+    def transcribe(self, audio):
+        self.cache_hits.append(self.frontend.features(audio) is not None)
+        seconds = len(audio) / RATE
+        return {"text": "", "segments": [
+            {"start": 0.0, "end": self.segment_end, "text": " a b"},
+            {"start": self.segment_end, "end": seconds, "text": " c"},
+        ]}
+
+
+def test_trim_keeps_buffer_on_hop_grid():
+    # stable-tsなどの終端は20ms単位とは限らない(Whisperの4.02秒も 4.02 * 16000 = 64319.99...)
+    backend = CachedBackend(segment_end=0.537)
+    streamer = StreamingTranscriber(backend, trim_seconds=1.0, max_seconds=5.0)
+    rng = np.random.default_rng(0)
+    chunk = audio2wav.CHUNK
+    for start in range(0, 6 * RATE, chunk):
+        samples = (0.1 * rng.standard_normal(chunk)).astype(np.float32)
+        backend.frontend.push(start, samples)
+        streamer.push(audio2wav.AudioSegment(samples, start))
+        assert streamer.offset % backend.frontend.hop_length == 0
+
+    assert streamer.offset > 0  # 切り詰めが起きている
+    assert all(backend.cache_hits)
@@ -0,0 +1,93 @@
+import copy
+import json
+
+import pytest
+import torch
+
+spm = pytest.importorskip("sentencepiece")
+from transformers import MarianConfig, MarianMTModel, MarianTokenizer  # noqa: E402
+
+from asr.translator_opus import OpusSession, OpusTranslator  # noqa: E402
+
+CORPUS = ["今日は いい 天気 です", "会議は 十時に 始まります", "こんにちは 世界",
+          "hello world how are you", "the meeting starts at ten"]
+
+
+@pytest.fixture(scope="module")
+def model_dir(tmp_path_factory):
+    """ランダム初期化した小さいMarianモデルと、コーパスから学習したトークナイザ"""
+    path = tmp_path_factory.mktemp("opus")
+    corpus = path / "corpus.txt"
+    corpus.write_text("\n".join(CORPUS * 20), encoding="utf-8")
+    spm.SentencePieceTrainer.train(input=str(corpus), model_prefix=str(path / "sp"), vocab_size=60,
+                                   hard_vocab_limit=False, character_coverage=1.0, model_type="unigram",
+                                   minloglevel=2)
+    processor = spm.SentencePieceProcessor(model_file=str(path / "sp.model"))
+    vocab = {"</s>": 0, "<unk>": 1, "<pad>": 2}
+    for i in range(processor.get_piece_size()):
+        vocab.setdefault(processor.id_to_piece(i), len(vocab))
+    (path / "vocab.json").write_text(json.dumps(vocab, ensure_ascii=False), encoding="utf-8")
+    MarianTokenizer(str(path / "sp.model"), str(path / "sp.model"), str(path / "vocab.json")).save_pretrained(path)
+
+    # 初期値の分散を大きめにして、訳が入力によって変わるようにする(既定値だと入力によらず同じ訳になる)
+    config = MarianConfig(vocab_size=len(vocab), d_model=64, encoder_layers=2, decoder_layers=2,
+                          encoder_attention_heads=2, decoder_attention_heads=2,
+                          encoder_ffn_dim=128, decoder_ffn_dim=128, max_position_embeddings=128, init_std=0.2,
+                          pad_token_id=2, eos_token_id=0, decoder_start_token_id=2, forced_eos_token_id=0)
+    torch.manual_seed(0)
+    MarianMTModel(config).save_pretrained(path)
+    return str(path)
+
+
+def make_translator(model_dir, **kwargs):
+    pairs = {pair: model_dir for pair in OpusTranslator.PAIRS}
+    cls = type("TinyOpusTranslator", (OpusTranslator,), {"PAIRS": pairs})
+    return cls(max_new_tokens=12, **kwargs)
+
+
+def test_stream_ends_with_translate(model_dir):
+    streaming, reference = make_translator(model_dir), make_translator(model_dir)
+    for text in CORPUS:
+        partials = list(streaming.translate_stream(text, "ja", "en"))
+        assert partials[-1] == reference.translate(text, "ja", "en")
+    assert len(partials) > 1  # 途中経過も返している
+
+
+def test_session_reuses_prefix_when_input_extends(model_dir):
+    translator = make_translator(model_dir)
+    pair = ("ja", "en")
+    session = OpusSession(translator, pair)
+    words = "会議は 十時に 始まります 今日は いい 天気 です".split()
+    results = []
+    for n in range(2, len(words) + 1):
+        text = " ".join(words[:n])
+        results.append(list(session.stream(text, chunk_tokens=3))[-1])
+        # 前回の訳を再利用しても、毎回最初から翻訳した結果と同じ
+        assert results[-1] == list(OpusSession(translator, pair).stream(text))[-1]
+    assert len(set(results)) > 1  # 入力が伸びると訳の先頭も変わる(一致部分だけを再利用している)
+    assert session.reused_tokens > 0
+
+    # 続きでない入力では再利用しない
+    fresh = OpusSession(translator, pair)
+    list(fresh.stream("hello world"))
+    list(fresh.stream("the meeting starts at ten"))
+    assert fresh.reused_tokens == 0
+
+
+def test_quantize_stays_close_to_fp32(model_dir):
+    tok = MarianTokenizer.from_pretrained(model_dir)
+    # 実際のモデルに近い重みの大きさ(MarianConfigの既定の初期値)で比べる
+    config = MarianConfig.from_pretrained(model_dir)
+    config.init_std = MarianConfig().init_std
+    torch.manual_seed(0)
+    fp32 = MarianMTModel(config).eval()
+    int8 = OpusTranslator._quantize(copy.deepcopy(fp32))
+    assert any(type(m).__module__.startswith("torch.ao.nn.quantized") for m in int8.modules())
+
+    inputs = tok(CORPUS, return_tensors="pt", padding=True)
+    decoder_input_ids = torch.full((len(CORPUS), 4), fp32.config.decoder_start_token_id)
+    with torch.no_grad():
+        expected = fp32(**inputs, decoder_input_ids=decoder_input_ids).logits
+        actual = int8(**inputs, decoder_input_ids=decoder_input_ids).logits
+    error = (actual - expected).abs().max() / expected.abs().max()
+    assert error < 0.05